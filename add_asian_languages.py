@@ -3,44 +3,18 @@
 Script to add Vietnamese, Japanese, and Chinese exercises to the database.
 """
 
-import sqlite3
 import json
 
+from database import init_database_schema, execute_query
+from exercise_import import ExerciseImporter
+
 def init_database():
-    """Initialize the SQLite database with exercises table"""
-    conn = sqlite3.connect('exercises.db')
-    cursor = conn.cursor()
-    
-    # Create exercises table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS exercises (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            text TEXT NOT NULL,
-            language TEXT DEFAULT 'en',
-            difficulty TEXT DEFAULT 'intermediate',
-            topic TEXT DEFAULT 'general',
-            questions TEXT NOT NULL,  -- JSON string of questions
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # Create indexes for better performance
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_language ON exercises(language)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_difficulty ON exercises(difficulty)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_topic ON exercises(topic)')
-    
-    conn.commit()
-    conn.close()
+    """Initialize the PostgreSQL schema (exercises table, lookups and indexes)"""
+    init_database_schema()
 
 def add_asian_language_exercises():
     """Add Vietnamese, Japanese, and Chinese exercises"""
     
-    # Connect to database
-    conn = sqlite3.connect('exercises.db')
-    cursor = conn.cursor()
-    
     # Sample exercises in Asian languages
     exercises = [
         # Vietnamese exercises
@@ -208,33 +182,21 @@ def add_asian_language_exercises():
         }
     ]
     
-    # Insert exercises
-    for exercise in exercises:
-        try:
-            cursor.execute('''
-                INSERT INTO exercises (title, text, language, difficulty, topic, questions)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                exercise['title'],
-                exercise['text'],
-                exercise['language'],
-                exercise['difficulty'],
-                exercise['topic'],
-                exercise['questions']
-            ))
-            print(f"✅ Added {exercise['language']} exercise: {exercise['title']}")
-        except Exception as e:
-            print(f"❌ Error adding {exercise['title']}: {e}")
-    
-    # Commit changes
-    conn.commit()
+    # Bulk-load exercises (passages already in the database are skipped)
+    summary = ExerciseImporter().run(enumerate(exercises, 1))
+    print(f"✅ Added {summary['inserted']} exercises ({summary['duplicates']} already present)")
+    for error in summary['errors']:
+        print(f"❌ Error adding exercise {error['record']}: {error['error']}")
     
     # Show statistics
-    cursor.execute("SELECT language, COUNT(*) FROM exercises GROUP BY language ORDER BY language")
-    stats = cursor.fetchall()
+    stats = execute_query(
+        "SELECT language, COUNT(*) AS count FROM exercise_details GROUP BY language ORDER BY language",
+        fetch=True
+    )
     
     print("\n📊 Database Statistics:")
-    for lang, count in stats:
+    for row in stats:
+        lang, count = row['language'], row['count']
         language_names = {
             'de': 'German',
             'en': 'English', 
@@ -249,11 +211,8 @@ def add_asian_language_exercises():
         lang_name = language_names.get(lang, lang.upper())
         print(f"  {lang_name}: {count} exercises")
     
-    cursor.execute("SELECT COUNT(*) FROM exercises")
-    total = cursor.fetchone()[0]
+    total = execute_query("SELECT COUNT(*) AS count FROM exercises", fetch=True)[0]['count']
     print(f"\n📚 Total exercises: {total}")
-    
-    conn.close()
 
 if __name__ == "__main__":
     print("🌏 Adding Vietnamese, Japanese, and Chinese exercises to database...")
@@ -0,0 +1,181 @@
+"""
+Apple Sign In client secret management for NoSubvo
+Signs the ES256 client secret JWT once and reuses it until shortly before expiry
+"""
+
+import os
+import threading
+import time
+import logging
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Tuple
+
+import jwt
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+
+logger = logging.getLogger(__name__)
+
+# Apple accepts client secrets valid for at most 6 months
+APPLE_SECRET_LIFETIME_SECONDS = 86400 * 180
+
+# Re-sign this long before the current secret expires
+APPLE_SECRET_REFRESH_MARGIN_SECONDS = 86400 * 7
+
+# Delay before retrying a failed background refresh
+APPLE_SECRET_RETRY_SECONDS = 300
+
+
+class AppleClientSecretSigner:
+    """
+    Caches the Apple client secret JWT and refreshes it in the background
+
+    The private key is read and parsed once. The signed secret and its expiry
+    are stored together in a single tuple so readers never see a secret paired
+    with the wrong expiry while a refresh swaps in a new one.
+    """
+
+    def __init__(self, team_id: str, key_id: str, client_id: str, private_key_path: str,
+                 lifetime_seconds: int = APPLE_SECRET_LIFETIME_SECONDS,
+                 refresh_margin_seconds: int = APPLE_SECRET_REFRESH_MARGIN_SECONDS):
+        self.team_id = team_id
+        self.key_id = key_id
+        self.client_id = client_id
+        self.private_key_path = private_key_path
+        self.lifetime_seconds = lifetime_seconds
+        self.refresh_margin_seconds = refresh_margin_seconds
+
+        self._private_key = None
+        self._current: Tuple[Optional[str], float] = (None, 0.0)
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._last_error: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> Optional['AppleClientSecretSigner']:
+        """
+        Build a signer from the APPLE_* environment variables
+
+        Returns:
+            A signer, or None if Apple Sign In is not fully configured
+        """
+        team_id = os.getenv('APPLE_TEAM_ID')
+        key_id = os.getenv('APPLE_KEY_ID')
+        client_id = os.getenv('APPLE_CLIENT_ID')
+        private_key_path = os.getenv('APPLE_PRIVATE_KEY_PATH')
+
+        if not all([team_id, key_id, client_id, private_key_path]):
+            return None
+
+        return cls(team_id, key_id, client_id, private_key_path)
+
+    def _load_private_key(self):
+        """Read and parse the .p8 private key (only on first use)"""
+        if self._private_key is None:
+            with open(self.private_key_path, 'rb') as key_file:
+                self._private_key = load_pem_private_key(key_file.read(), password=None)
+        return self._private_key
+
+    def _sign(self) -> Tuple[str, float]:
+        """Sign a fresh client secret and return it with its expiry timestamp"""
+        issued_at = int(time.time())
+        expires_at = issued_at + self.lifetime_seconds
+
+        headers = {
+            'kid': self.key_id,
+            'alg': 'ES256'
+        }
+
+        payload = {
+            'iss': self.team_id,
+            'iat': issued_at,
+            'exp': expires_at,
+            'aud': 'https://appleid.apple.com',
+            'sub': self.client_id
+        }
+
+        secret = jwt.encode(payload, self._load_private_key(), algorithm='ES256', headers=headers)
+        return secret, float(expires_at)
+
+    def _is_fresh(self, expires_at: float) -> bool:
+        return time.time() < expires_at - self.refresh_margin_seconds
+
+    def refresh(self) -> Optional[str]:
+        """
+        Sign a new client secret and atomically replace the cached one
+
+        Returns:
+            The current secret. If signing fails, the previous secret is
+            returned while it is still valid, otherwise None.
+        """
+        with self._lock:
+            return self._refresh_locked()
+
+    def _refresh_locked(self) -> Optional[str]:
+        try:
+            self._current = self._sign()
+            self._last_error = None
+            logger.info(f"Apple client secret signed, expires at {self._format_expiry(self._current[1])}")
+            self._schedule_refresh(self._current[1] - self.refresh_margin_seconds - time.time())
+        except Exception as e:
+            self._last_error = str(e)
+            logger.error(f"Error creating Apple client secret: {e}")
+            self._schedule_refresh(APPLE_SECRET_RETRY_SECONDS)
+
+        secret, expires_at = self._current
+        return secret if secret and time.time() < expires_at else None
+
+    def get_secret(self) -> Optional[str]:
+        """
+        Get the cached client secret, signing a new one only when it is
+        missing or about to expire
+
+        Returns:
+            Client secret JWT, or None if it could not be created
+        """
+        secret, expires_at = self._current
+        if secret and self._is_fresh(expires_at):
+            return secret
+
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            secret, expires_at = self._current
+            if secret and self._is_fresh(expires_at):
+                return secret
+
+            return self._refresh_locked()
+
+    def _schedule_refresh(self, delay: float) -> None:
+        """Schedule a background refresh, replacing any pending one"""
+        if self._timer:
+            self._timer.cancel()
+
+        delay = min(max(delay, 0), threading.TIMEOUT_MAX)
+        self._timer = threading.Timer(delay, self.refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def stop(self) -> None:
+        """Cancel the pending background refresh"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    @staticmethod
+    def _format_expiry(expires_at: float) -> str:
+        return datetime.fromtimestamp(expires_at, tz=timezone.utc).isoformat()
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Describe the cached secret for health output
+
+        Returns:
+            Dictionary with expiry information (never the secret itself)
+        """
+        secret, expires_at = self._current
+        return {
+            'configured': True,
+            'signed': secret is not None,
+            'expires_at': self._format_expiry(expires_at) if secret else None,
+            'seconds_remaining': max(int(expires_at - time.time()), 0) if secret else 0,
+            'last_error': self._last_error
+        }
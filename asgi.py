@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+ASGI serving mode for NoSubvo
+Serves the API from an event loop so slow OpenAI/PostgreSQL calls do not hold a thread each
+
+The routes that wait on I/O on every call (/questions, /exercises/user,
+/progress, /auth/login) have async handlers built on asyncpg and the
+async OpenAI client. CPU-bound work (spaCy chunking, PBKDF2) runs in a
+CPU thread pool. Every other route is served by the Flask app itself on
+a bridge thread pool. All requests go through the Flask request hooks
+(CORS, compression, caching, read-your-writes), so responses are the
+same as from backend.py.
+
+Usage:
+    python asgi.py                       # uvicorn on port 5001
+    uvicorn asgi:app --port 5001 --workers 4
+"""
+
+import os
+import sys
+import json
+import math
+import asyncio
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from typing import Any, Callable, Dict, Optional
+
+import asyncpg
+import openai
+from flask import Response, g, jsonify, request
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import Map, Rule
+
+import backend
+import async_database
+from backend import (app as flask_app, request_session_token, verify_password, exercise_payload, progress_status,
+                     question_prompt, QUESTION_MODEL, FALLBACK_QUESTIONS)
+from session_store import sessions, token_digest
+from reading_pace import reading_paces
+
+logger = logging.getLogger(__name__)
+
+# Threads serving routes that have no async handler through Flask
+ASGI_WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', 32))
+
+# Threads for CPU-bound work (spaCy parsing, password hashing)
+ASGI_CPU_THREADS = int(os.getenv('ASGI_CPU_THREADS', os.cpu_count() or 2))
+
+# Request bodies above this size are spooled to a temporary file
+MAX_IN_MEMORY_BODY = 1024 * 1024
+
+wsgi_executor = ThreadPoolExecutor(ASGI_WSGI_THREADS, thread_name_prefix='asgi-wsgi')
+cpu_executor = ThreadPoolExecutor(ASGI_CPU_THREADS, thread_name_prefix='asgi-cpu')
+
+async_openai_client = openai.AsyncOpenAI(api_key=backend.openai_api_key) if backend.openai_api_key else None
+
+# Routes with async handlers; everything else falls through to Flask
+url_map = Map()
+_handlers: Dict[str, Callable] = {}
+
+
+def async_route(rule: str, methods):
+    """Register an async handler, taking precedence over the Flask view for the same rule"""
+    def decorator(func):
+        url_map.add(Rule(rule, methods=methods, endpoint=func.__name__))
+        _handlers[func.__name__] = func
+        return func
+    return decorator
+
+
+async def run_in(executor: ThreadPoolExecutor, func: Callable, *args, context: Optional[contextvars.Context] = None):
+    """Run a blocking call in an executor, within the caller's context (Flask request, read consistency)"""
+    if context is None:
+        context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(executor, context.run, func, *args)
+
+
+async def generate_comprehension_questions(text: str, num_questions: int = 3):
+    """Async twin of backend.generate_comprehension_questions"""
+    if not async_openai_client:
+        return FALLBACK_QUESTIONS
+
+    try:
+        response = await async_openai_client.chat.completions.create(
+            model=QUESTION_MODEL,
+            messages=[{"role": "user", "content": question_prompt(text, num_questions)}],
+            temperature=0.7
+        )
+        return json.loads(response.choices[0].message.content)
+
+    except Exception as e:
+        print(f"Error generating questions: {e}")
+        return FALLBACK_QUESTIONS
+
+
+async def get_current_user():
+    """Async twin of backend.get_current_user (see session_store.SessionStore.get)"""
+    token = request_session_token()
+    if not token:
+        return None
+
+    rows = await async_database.execute_prepared('user_by_session', (token_digest(token),), fetch=True, primary=True)
+    return sessions.session_user(rows)
+
+
+async def record_session_write() -> None:
+    """Async twin of backend.record_session_write, run before the Flask hooks so they don't block the loop"""
+    state = g.get('read_consistency')
+    token = request_session_token()
+    if state is not None and sessions.needs_write_recorded(token) and state.take_write():
+        try:
+            await async_database.execute_prepared('record_session_write', (token_digest(token),))
+        except (asyncpg.PostgresError, *async_database.CONNECTION_ERRORS) as e:
+            logger.warning(f"Could not record the session's write, its next reads may lag: {e}")
+
+
+async def get_next_exercise_for_user(user_id: int):
+    """Async twin of backend.get_next_exercise_for_user"""
+    exercise_result = await async_database.execute_prepared('next_exercise_for_user', (user_id,), fetch=True)
+    return exercise_payload(exercise_result[0]) if exercise_result else None
+
+
+async def update_user_progress(user_id: int, exercise_id: int, comprehension_score: float,
+                               questions_answered: int, questions_correct: int,
+                               reading_speed_wpm: float, session_duration_seconds: int):
+    """Async twin of backend.update_user_progress"""
+    status = progress_status(comprehension_score)
+
+    await async_database.execute_prepared('upsert_user_progress', (
+        user_id, exercise_id, status, comprehension_score, questions_answered,
+        questions_correct, reading_speed_wpm, session_duration_seconds
+    ))
+    reading_paces.invalidate(user_id)
+
+    if status == 'completed':
+        await async_database.execute_prepared('dequeue_exercise', (user_id, exercise_id))
+        await async_database.execute_prepared('advance_queue', (user_id,))
+    else:
+        await async_database.execute_prepared('requeue_exercise', (user_id, exercise_id))
+
+    return status
+
+
+@async_route("/chunk", methods=["POST"])
+async def chunk():
+    # Pure CPU work: run the Flask view itself off the event loop
+    return await run_in(cpu_executor, backend.chunk)
+
+
+@async_route("/questions", methods=["POST"])
+async def generate_questions():
+    try:
+        if request.content_type and 'application/json' in request.content_type:
+            data = request.json
+            text = data.get("text", "")
+            num_questions = data.get("num_questions", 3)
+        else:
+            return jsonify({
+                "error": "Send JSON with 'text' field"
+            }), 400
+
+        if not text or not text.strip():
+            return jsonify({"error": "Text cannot be empty"}), 400
+
+        questions = await generate_comprehension_questions(text, num_questions)
+
+        return jsonify({
+            "success": True,
+            "questions": questions,
+            "question_count": len(questions)
+        })
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@async_route("/exercises/user", methods=["GET"])
+async def get_user_exercise():
+    try:
+        user = await get_current_user()
+        if not user:
+            return jsonify({
+                "success": False,
+                "error": "Authentication required"
+            }), 401
+
+        exercise = await get_next_exercise_for_user(user["user_id"])
+
+        if exercise:
+            return jsonify({
+                "success": True,
+                "exercise": exercise
+            })
+        return jsonify({
+            "success": False,
+            "error": "No more exercises in queue. All exercises completed!"
+        }), 404
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@async_route("/progress", methods=["POST"])
+async def submit_progress():
+    try:
+        user = await get_current_user()
+        if not user:
+            return jsonify({
+                "success": False,
+                "error": "Authentication required"
+            }), 401
+
+        data = request.json
+        for field in ['exercise_id', 'comprehension_score', 'questions_answered', 'questions_correct']:
+            if field not in data:
+                return jsonify({
+                    "success": False,
+                    "error": f"Missing required field: {field}"
+                }), 400
+
+        # asyncpg does not cast parameters, so coerce them like PostgreSQL would
+        exercise_id = int(data['exercise_id'])
+        comprehension_score = float(data['comprehension_score'])
+        questions_answered = int(data['questions_answered'])
+        questions_correct = int(data['questions_correct'])
+        reading_speed_wpm = float(data.get('reading_speed_wpm', 0))
+        session_duration_seconds = int(data.get('session_duration_seconds', 0))
+
+        if not 0.0 <= comprehension_score <= 1.0:
+            return jsonify({
+                "success": False,
+                "error": "Comprehension score must be between 0.0 and 1.0"
+            }), 400
+
+        if not math.isfinite(reading_speed_wpm) or reading_speed_wpm < 0:
+            return jsonify({
+                "success": False,
+                "error": "reading_speed_wpm must be a non-negative number"
+            }), 400
+
+        status = await update_user_progress(
+            user["user_id"], exercise_id, comprehension_score,
+            questions_answered, questions_correct,
+            reading_speed_wpm, session_duration_seconds
+        )
+        next_exercise = await get_next_exercise_for_user(user["user_id"])
+
+        return jsonify({
+            "success": True,
+            "status": status,
+            "comprehension_score": comprehension_score,
+            "next_exercise": next_exercise,
+            "message": "Progress updated successfully"
+        })
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@async_route("/auth/login", methods=["POST"])
+async def login():
+    try:
+        data = request.json
+        for field in ['username', 'password']:
+            if field not in data:
+                return jsonify({
+                    "success": False,
+                    "error": f"Missing required field: {field}"
+                }), 400
+
+        username = data['username'].strip()
+        password = data['password']
+
+        user_result = await async_database.execute_prepared('user_by_login', (username, username.lower()), fetch=True)
+        if not user_result:
+            return jsonify({
+                "success": False,
+                "error": "Invalid username or password"
+            }), 401
+
+        user = user_result[0]
+
+        # PBKDF2 takes tens of milliseconds of CPU
+        if not await run_in(cpu_executor, verify_password, password, user['password_hash']):
+            return jsonify({
+                "success": False,
+                "error": "Invalid username or password"
+            }), 401
+
+        session_token = sessions.new_token()
+        await async_database.execute_prepared('create_session', (token_digest(session_token), user['id'],
+                                                                 sessions.lifetime_seconds))
+
+        await async_database.execute_prepared('touch_last_login', (user['id'],))
+
+        return jsonify({
+            "success": True,
+            "message": "Login successful",
+            "session_token": session_token,
+            "user": {
+                "id": user['id'],
+                "username": user['username'],
+                "email": user['email'],
+                "preferred_language": user['preferred_language']
+            }
+        })
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+def build_environ(scope: Dict[str, Any], body) -> Dict[str, Any]:
+    """WSGI environ for an ASGI HTTP scope"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+
+    for raw_name, raw_value in scope['headers']:
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+
+    return environ
+
+
+async def read_body(receive) -> Optional[SpooledTemporaryFile]:
+    """Receive the whole request body; None if the client disconnected"""
+    body = SpooledTemporaryFile(max_size=MAX_IN_MEMORY_BODY)
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            body.close()
+            return None
+        body.write(message.get('body', b''))
+        more_body = message.get('more_body', False)
+    body.seek(0)
+    return body
+
+
+async def send_start(send, status: str, headers) -> None:
+    await send({
+        'type': 'http.response.start',
+        'status': int(status.split(' ', 1)[0]),
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers],
+    })
+
+
+async def serve_async(handler: Callable, view_args: Dict[str, Any], environ: Dict[str, Any]) -> Response:
+    """Run an async handler inside a Flask request context, with the app's request hooks"""
+    ctx = flask_app.request_context(environ)
+    ctx.push()
+    error = None
+    try:
+        try:
+            rv = flask_app.preprocess_request()
+            if rv is None:
+                rv = await handler(**view_args)
+        except Exception as e:
+            rv = flask_app.handle_user_exception(e)
+        await record_session_write()
+        return flask_app.finalize_request(rv)
+    except Exception as e:
+        error = e
+        return flask_app.handle_exception(e)
+    finally:
+        ctx.pop(error)
+
+
+async def serve_wsgi(environ: Dict[str, Any], send) -> None:
+    """Serve a request with the Flask app on the bridge pool, streaming its response"""
+    # One context for the whole request: streamed responses re-enter it chunk by chunk
+    context = contextvars.copy_context()
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started['status'], started['headers'] = status, headers
+        return lambda data: None
+
+    iterable = await run_in(wsgi_executor, flask_app.wsgi_app, environ, start_response, context=context)
+    try:
+        iterator = iter(iterable)
+        chunk = await run_in(wsgi_executor, next, iterator, None, context=context)
+        await send_start(send, started['status'], started['headers'])
+        while chunk is not None:
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            chunk = await run_in(wsgi_executor, next, iterator, None, context=context)
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        if hasattr(iterable, 'close'):
+            await run_in(wsgi_executor, iterable.close, context=context)
+
+
+async def shutdown() -> None:
+    await async_database.close_pools()
+    if async_openai_client:
+        await async_openai_client.close()
+    backend.nlp_workers.shutdown()
+    wsgi_executor.shutdown(wait=False)
+    cpu_executor.shutdown(wait=False)
+
+
+async def app(scope, receive, send):
+    """ASGI application"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                # Accept connections right away; GET /ready turns 200 once warm
+                backend.start_warm_up()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    if scope['type'] != 'http':
+        return
+
+    body = await read_body(receive)
+    if body is None:
+        return
+
+    try:
+        environ = build_environ(scope, body)
+        try:
+            endpoint, view_args = url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            # Not an async route (or another method, e.g. a CORS preflight): Flask answers
+            await serve_wsgi(environ, send)
+            return
+
+        response = await serve_async(_handlers[endpoint], view_args, environ)
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'], started['headers'] = status, headers
+
+        chunks = response(environ, start_response)
+        try:
+            await send_start(send, started['status'], started['headers'])
+            await send({'type': 'http.response.body', 'body': b''.join(chunks)})
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+    finally:
+        body.close()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    print("🚀 NoSubvo Backend API starting (ASGI)...")
+    uvicorn.run(app, host='0.0.0.0', port=5001)
@@ -0,0 +1,132 @@
+"""
+Async PostgreSQL access for NoSubvo
+asyncpg pools for the ASGI server, routed like database.py (primary, read replicas, read-your-writes)
+"""
+
+import json
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import asyncpg
+
+from database import db_config, db_router, is_read_query, registered_statements
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # pragma: no cover - optional dependency
+    _json_loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+# Connection-level failures: the server (or the network to it) is unavailable
+CONNECTION_ERRORS = (OSError, asyncio.TimeoutError, asyncpg.PostgresConnectionError, asyncpg.InterfaceError)
+
+_pools: Dict[str, asyncpg.Pool] = {}
+_pools_lock = asyncio.Lock()
+
+
+async def _init_connection(connection: asyncpg.Connection) -> None:
+    """Decode JSON/JSONB columns (exercises.questions) like the psycopg2 connections do"""
+    for type_name in ('json', 'jsonb'):
+        await connection.set_type_codec(type_name, encoder=json.dumps, decoder=_json_loads, schema='pg_catalog')
+
+
+async def get_pool(name: str, connection_params: Dict[str, Any]) -> asyncpg.Pool:
+    """
+    Pool for a server, created on first use
+
+    Args:
+        name: 'primary' or a replica name from db_router.read_targets()
+        connection_params: DatabaseConfig connection parameters ('dsn' or host/port/database/user/password)
+    """
+    pool = _pools.get(name)
+    if pool is None:
+        async with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                pool = await asyncpg.create_pool(
+                    **connection_params,
+                    min_size=min(db_config.pool_min_size, db_config.pool_max_size),
+                    max_size=db_config.pool_max_size,
+                    init=_init_connection
+                )
+                _pools[name] = pool
+    return pool
+
+
+async def close_pools() -> None:
+    """Close all pools (ASGI shutdown); they are recreated on next use"""
+    async with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        await pool.close()
+
+
+async def _route(read_only: bool, run: Callable[[asyncpg.Connection], Awaitable[Any]], primary: bool = False) -> Any:
+    """
+    Await run(connection) on the primary, or for reads on the first server
+    in routing order that responds (the primary last)
+
+    primary: Run reads on the primary too, without counting them as writes
+    """
+    if read_only and not primary:
+        targets = db_router.read_targets()
+    else:
+        targets = [('primary', db_config.get_connection_params())]
+
+    for position, (name, connection_params) in enumerate(targets):
+        try:
+            pool = await get_pool(name, connection_params)
+            async with pool.acquire(timeout=db_config.pool_timeout) as connection:
+                result = await run(connection)
+            break
+        except CONNECTION_ERRORS as e:
+            # Stale or unreachable server: try the next one
+            if position == len(targets) - 1:
+                logger.error(f"Database connection error ({name}): {e}")
+                raise
+            db_router.eject(name, e)
+
+    if not read_only:
+        db_router.record_write()
+    return result
+
+
+async def execute_prepared(name: str, params: Tuple = (), fetch: bool = False,
+                           primary: bool = False) -> Optional[List[Dict[str, Any]]]:
+    """
+    Execute a statement registered with database.register_statement
+
+    asyncpg prepares statements once per connection by itself (its
+    statement cache is keyed by the SQL), so the registered $1, $2, ...
+    SQL is used as is.
+
+    Args:
+        name: Registered statement name
+        params: Values for $1, $2, ...
+        fetch: Whether to fetch results
+        primary: Read from the primary even with replicas (see database.execute_prepared)
+
+    Returns:
+        Query results if fetch=True, otherwise None
+    """
+    query = registered_statements().get(name)
+    if query is None:
+        raise ValueError(f"Unknown prepared statement: {name}")
+
+    async def run(connection: asyncpg.Connection):
+        try:
+            if fetch:
+                return [dict(row) for row in await connection.fetch(query, *params)]
+            await connection.execute(query, *params)
+            return None
+        except asyncpg.PostgresError as e:
+            logger.error(f"Query execution error: {e}")
+            logger.error(f"Statement: {name}")
+            logger.error(f"Params: {params}")
+            raise
+
+    return await _route(fetch and is_read_query(query), run, primary)
@@ -1,25 +1,42 @@
-from flask import Flask, request, jsonify, redirect, url_for, session
+from flask import Flask, Blueprint, Response, g, request, jsonify, redirect, url_for, session, stream_with_context
 from flask_cors import CORS
-import spacy
 import openai
 import os
 from dotenv import load_dotenv
 import json
-import random
-from datetime import datetime
 import hashlib
 import secrets
 import uuid
-import jwt
 from authlib.integrations.flask_client import OAuth
 from authlib.common.security import generate_token
+import io
+import base64
+import math
+import time
+import argparse
+import threading
 import requests
+import psycopg2
 from pathlib import Path
-from database import get_db_connection, execute_query, execute_many, db_config, init_database_schema
+from database import (get_db_connection, execute_query, execute_many, db_config, init_database_schema,
+                      ReadConsistency, set_read_consistency, reset_read_consistency, register_statement, execute_prepared)
 from logging_config import setup_logging, get_logger, log_exception
+from apple_auth import AppleClientSecretSigner
+from catalog_stats import catalog_stats
+from http_cache import init_http_cache, cache_policy, not_modified, validators_from_timestamp
+from serialization import init_serialization, json_response, dumps
+from exercise_store import questions_param, exercise_filter_conditions, list_exercises, search_exercises, DEFAULT_PAGE_SIZE
+from exercise_import import ExerciseImporter, read_records, IMPORT_FORMATS, IMPORT_BATCH_SIZE
+from chunker import (get_nlp, get_tokenizer, chunk_offsets as parse_chunk_offsets, offsets_to_chunks, pack_offsets,
+                     unpack_offsets, word_offsets, get_profile, chunking_profiles, supported_languages, base_language,
+                     DEFAULT_CHUNKING_PROFILE)
+from chunk_cache import chunk_cache, text_key
+from session_store import sessions
+from reading_pace import ReadingPace, reading_pace, reading_paces, chunk_durations, rsvp_schedule, pack_durations
+from nlp_pool import nlp_workers, NLPOverloaded, NLPDeadlineExceeded
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for frontend
+# All routes; create_app() registers them on the Flask app
+api = Blueprint('api', __name__)
 
 # Setup logging
 setup_logging('nosuvo_backend', log_level='DEBUG')
@@ -40,11 +57,10 @@ else:
     load_dotenv()  # Try default locations
     print("⚠️  No .env or .env.local file found, using system environment variables")
 
-# Set up session secret for OAuth
-app.secret_key = os.getenv('FLASK_SECRET_KEY', secrets.token_hex(32))
-
-# Initialize OAuth
-oauth = OAuth(app)
+# OAuth registry (providers are registered on first use, see get_oauth)
+oauth = OAuth()
+_oauth_lock = threading.Lock()
+_oauth_configured = False
 
 # Configure OAuth providers
 def configure_oauth_providers():
@@ -87,14 +103,19 @@ def configure_oauth_providers():
             client_kwargs={'scope': 'openid email name'}
         )
 
-# Load English model
-nlp = spacy.load("en_core_web_sm")
+def get_oauth() -> OAuth:
+    """OAuth registry with the configured providers registered"""
+    global _oauth_configured
+    if not _oauth_configured:
+        with _oauth_lock:
+            if not _oauth_configured:
+                configure_oauth_providers()
+                _oauth_configured = True
+    return oauth
 
-# Configure OAuth providers
-configure_oauth_providers()
+# Apple client secret signer (None when Apple Sign In is not configured)
+apple_secret_signer = AppleClientSecretSigner.from_env()
 
-# Simple session storage (in production, use Redis or database sessions)
-user_sessions = {}
 
 def hash_password(password: str) -> str:
     """Hash password with salt"""
@@ -111,49 +132,58 @@ def verify_password(password: str, stored_hash: str) -> bool:
     except:
         return False
 
-def generate_session_token() -> str:
-    """Generate a secure session token"""
-    return secrets.token_urlsafe(32)
+def request_session_token() -> str:
+    """The session token of the current request (Authorization: Bearer)"""
+    return request.headers.get('Authorization', '').replace('Bearer ', '')
 
-def get_current_user():
-    """Get current user from session token"""
-    token = request.headers.get('Authorization', '').replace('Bearer ', '')
-    if token in user_sessions:
-        return user_sessions[token]
-    return None
+def get_current_user(optional: bool = False):
+    """
+    Get current user from session token (see session_store)
 
-def create_apple_client_secret():
-    """Create Apple client secret JWT"""
-    team_id = os.getenv('APPLE_TEAM_ID')
-    key_id = os.getenv('APPLE_KEY_ID')
-    client_id = os.getenv('APPLE_CLIENT_ID')
-    private_key_path = os.getenv('APPLE_PRIVATE_KEY_PATH')
-    
-    if not all([team_id, key_id, client_id, private_key_path]):
-        return None
-    
+    Args:
+        optional: The route also serves anonymous requests: when sessions
+            can't be read (database unavailable) the request is anonymous
+            instead of failing
+    """
     try:
-        with open(private_key_path, 'r') as key_file:
-            private_key = key_file.read()
-        
-        headers = {
-            'kid': key_id,
-            'alg': 'ES256'
-        }
-        
-        payload = {
-            'iss': team_id,
-            'iat': datetime.utcnow().timestamp(),
-            'exp': datetime.utcnow().timestamp() + 86400 * 180,  # 6 months
-            'aud': 'https://appleid.apple.com',
-            'sub': client_id
-        }
-        
-        return jwt.encode(payload, private_key, algorithm='ES256', headers=headers)
-    except Exception as e:
-        print(f"Error creating Apple client secret: {e}")
+        return sessions.get(request_session_token())
+    except psycopg2.Error as e:
+        if not optional:
+            raise
+        logger.warning(f"Session lookup failed, serving the request anonymously: {e}")
         return None
 
+@api.before_app_request
+def bind_read_consistency():
+    """Track this request's writes, so its reads (and its client's next requests) follow them to the primary"""
+    g.read_consistency = ReadConsistency()
+    g.read_consistency_token = set_read_consistency(g.read_consistency)
+
+@api.after_app_request
+def record_session_write(response):
+    """Record a write on the client's session before it gets the response (see session_store)"""
+    state = g.get('read_consistency')
+    token = request_session_token()
+    if state is not None and sessions.needs_write_recorded(token) and state.take_write():
+        try:
+            sessions.record_write(token)
+        except psycopg2.Error as e:
+            logger.warning(f"Could not record the session's write, its next reads may lag: {e}")
+    return response
+
+@api.teardown_app_request
+def release_read_consistency(exc=None):
+    g.pop('read_consistency', None)
+    token = g.pop('read_consistency_token', None)
+    if token is not None:
+        reset_read_consistency(token)
+
+def create_apple_client_secret():
+    """Get the Apple client secret JWT (signed once, cached until shortly before expiry)"""
+    if not apple_secret_signer:
+        return None
+    return apple_secret_signer.get_secret()
+
 def create_or_get_oauth_user(provider: str, user_info: dict, preferred_language: str = 'en'):
     """Create or get user from OAuth provider info"""
     # Extract user information based on provider
@@ -176,12 +206,12 @@ def create_or_get_oauth_user(provider: str, user_info: dict, preferred_language:
         raise ValueError("Email is required for OAuth authentication")
     
     # Check if user already exists
-    existing_user = execute_query('SELECT id FROM users WHERE email = %s', (email,), fetch=True)
+    existing_user = execute_prepared('user_id_by_email', (email,), fetch=True)
     
     if existing_user:
         user_id = existing_user[0]['id']
         # Update last login
-        execute_query('UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = %s', (user_id,))
+        execute_prepared('touch_last_login', (user_id,))
     else:
         # Create new user
         execute_query('''
@@ -190,7 +220,7 @@ def create_or_get_oauth_user(provider: str, user_info: dict, preferred_language:
         ''', (username, email, f"oauth_{provider}", preferred_language))
         
         # Get the new user ID
-        new_user = execute_query('SELECT id FROM users WHERE email = %s', (email,), fetch=True)
+        new_user = execute_prepared('user_id_by_email', (email,), fetch=True)
         user_id = new_user[0]['id'] if new_user else None
         
         if user_id:
@@ -210,14 +240,63 @@ def create_or_get_oauth_user(provider: str, user_info: dict, preferred_language:
         "preferred_language": user_data[0]['preferred_language']
     }
 
+# Hot statements, PREPAREd once per pooled connection instead of planned on every call
+register_statement('user_id_by_email', 'SELECT id FROM users WHERE email = $1')
+
+register_statement('user_by_login', '''
+    SELECT id, username, email, password_hash, preferred_language
+    FROM users
+    WHERE username = $1 OR email = $2
+''')
+
+register_statement('next_exercise_for_user', '''
+    SELECT e.id, e.title, e.text, e.language, e.difficulty, e.topic, e.questions
+    FROM exercise_details e
+    JOIN user_queue uq ON e.id = uq.exercise_id
+    WHERE uq.user_id = $1 AND uq.queue_position = 1
+''')
+
+register_statement('upsert_user_progress', '''
+    INSERT INTO user_progress
+    (user_id, exercise_id, status, comprehension_score, questions_answered,
+     questions_correct, reading_speed_wpm, session_duration_seconds, completed_at)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, CURRENT_TIMESTAMP)
+    ON CONFLICT (user_id, exercise_id)
+    DO UPDATE SET
+        status = EXCLUDED.status,
+        comprehension_score = EXCLUDED.comprehension_score,
+        questions_answered = EXCLUDED.questions_answered,
+        questions_correct = EXCLUDED.questions_correct,
+        reading_speed_wpm = EXCLUDED.reading_speed_wpm,
+        session_duration_seconds = EXCLUDED.session_duration_seconds,
+        completed_at = EXCLUDED.completed_at
+''')
+
+register_statement('dequeue_exercise', 'DELETE FROM user_queue WHERE user_id = $1 AND exercise_id = $2')
+
+register_statement('advance_queue', '''
+    UPDATE user_queue
+    SET queue_position = queue_position - 1
+    WHERE user_id = $1 AND queue_position > 1
+''')
+
+register_statement('requeue_exercise', '''
+    UPDATE user_queue
+    SET queue_position = (SELECT MAX(queue_position) + 1 FROM user_queue WHERE user_id = $1)
+    WHERE user_id = $1 AND exercise_id = $2
+''')
+
+register_statement('touch_last_login', 'UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = $1')
+
 def initialize_user_queue(user_id: int, preferred_language: str = 'en'):
     """Initialize user queue with all available exercises in their preferred language"""
     # Get all exercises in user's preferred language
     exercises = execute_query('''
-        SELECT id FROM exercises 
-        WHERE language = %s 
-        AND id NOT IN (SELECT exercise_id FROM user_progress WHERE user_id = %s AND status = 'completed')
-        ORDER BY difficulty, RANDOM()
+        SELECT e.id FROM exercises e
+        JOIN exercise_difficulties d ON d.id = e.difficulty_id
+        WHERE e.language_id = (SELECT id FROM exercise_languages WHERE code = %s)
+        AND e.id NOT IN (SELECT exercise_id FROM user_progress WHERE user_id = %s AND status = 'completed')
+        ORDER BY d.code, RANDOM()
     ''', (preferred_language, user_id), fetch=True)
     
     # Add exercises to user queue
@@ -231,69 +310,47 @@ def initialize_user_queue(user_id: int, preferred_language: str = 'en'):
 def get_next_exercise_for_user(user_id: int):
     """Get the next exercise in user's queue"""
     # Get the first exercise in queue
-    exercise_result = execute_query('''
-        SELECT e.id, e.title, e.text, e.language, e.difficulty, e.topic, e.questions
-        FROM exercises e
-        JOIN user_queue uq ON e.id = uq.exercise_id
-        WHERE uq.user_id = %s AND uq.queue_position = 1
-    ''', (user_id,), fetch=True)
+    exercise_result = execute_prepared('next_exercise_for_user', (user_id,), fetch=True)
     
-    if exercise_result:
-        exercise = exercise_result[0]
-        return {
-            "id": exercise['id'],
-            "title": exercise['title'],
-            "text": exercise['text'],
-            "language": exercise['language'],
-            "difficulty": exercise['difficulty'],
-            "topic": exercise['topic'],
-            "questions": json.loads(exercise['questions'])
-        }
-    return None
+    return exercise_payload(exercise_result[0]) if exercise_result else None
+
+def exercise_payload(exercise: dict) -> dict:
+    """Exercise fields returned to clients"""
+    return {
+        "id": exercise['id'],
+        "title": exercise['title'],
+        "text": exercise['text'],
+        "language": exercise['language'],
+        "difficulty": exercise['difficulty'],
+        "topic": exercise['topic'],
+        "questions": exercise['questions']
+    }
+
+def progress_status(comprehension_score: float) -> str:
+    """Completed when enough questions were understood, otherwise failed (re-queued)"""
+    return 'completed' if comprehension_score >= 0.7 else 'failed'
 
 def update_user_progress(user_id: int, exercise_id: int, comprehension_score: float, 
                         questions_answered: int, questions_correct: int, 
                         reading_speed_wpm: float, session_duration_seconds: int):
     """Update user progress and manage queue based on comprehension score"""
     # Determine status based on comprehension score
-    status = 'completed' if comprehension_score >= 0.7 else 'failed'
+    status = progress_status(comprehension_score)
     
     # Update or insert progress
-    execute_query('''
-        INSERT INTO user_progress 
-        (user_id, exercise_id, status, comprehension_score, questions_answered, 
-         questions_correct, reading_speed_wpm, session_duration_seconds, completed_at)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-        ON CONFLICT (user_id, exercise_id) 
-        DO UPDATE SET 
-            status = EXCLUDED.status,
-            comprehension_score = EXCLUDED.comprehension_score,
-            questions_answered = EXCLUDED.questions_answered,
-            questions_correct = EXCLUDED.questions_correct,
-            reading_speed_wpm = EXCLUDED.reading_speed_wpm,
-            session_duration_seconds = EXCLUDED.session_duration_seconds,
-            completed_at = EXCLUDED.completed_at
-    ''', (user_id, exercise_id, status, comprehension_score, questions_answered, 
-          questions_correct, reading_speed_wpm, session_duration_seconds))
+    execute_prepared('upsert_user_progress', (user_id, exercise_id, status, comprehension_score, questions_answered,
+                                              questions_correct, reading_speed_wpm, session_duration_seconds))
+    reading_paces.invalidate(user_id)
     
     # Remove from queue if completed successfully
     if status == 'completed':
-        execute_query('DELETE FROM user_queue WHERE user_id = %s AND exercise_id = %s', 
-                      (user_id, exercise_id))
+        execute_prepared('dequeue_exercise', (user_id, exercise_id))
         
         # Reorder remaining queue items
-        execute_query('''
-            UPDATE user_queue 
-            SET queue_position = queue_position - 1 
-            WHERE user_id = %s AND queue_position > 1
-        ''', (user_id,))
+        execute_prepared('advance_queue', (user_id,))
     else:
         # Move failed exercise to bottom of queue
-        execute_query('''
-            UPDATE user_queue 
-            SET queue_position = (SELECT MAX(queue_position) + 1 FROM user_queue WHERE user_id = %s)
-            WHERE user_id = %s AND exercise_id = %s
-        ''', (user_id, user_id, exercise_id))
+        execute_prepared('requeue_exercise', (user_id, exercise_id))
     
     return status
 
@@ -316,7 +373,10 @@ def insert_sample_exercises():
     count = count_result[0]['count'] if count_result else 0
     
     # Always add English exercises if they don't exist
-    en_result = execute_query('SELECT COUNT(*) as count FROM exercises WHERE language = %s', ('en',), fetch=True)
+    en_result = execute_query('''
+        SELECT COUNT(*) as count FROM exercises
+        WHERE language_id = (SELECT id FROM exercise_languages WHERE code = %s)
+    ''', ('en',), fetch=True)
     en_count = en_result[0]['count'] if en_result else 0
     
     if en_count == 0:
@@ -327,7 +387,7 @@ def insert_sample_exercises():
                 'language': 'en',
                 'difficulty': 'intermediate',
                 'topic': 'science',
-                'questions': json.dumps([
+                'questions': [
                     {
                         "question": "What is the main biological phenomenon that allows fish to navigate in deep sea habitats?",
                         "options": {
@@ -358,22 +418,23 @@ def insert_sample_exercises():
                         },
                         "answer": "B"
                     }
-                ])
+                ]
             }
         ]
         
         # Insert English exercises
         for exercise in english_exercises:
             execute_query('''
-                INSERT INTO exercises (title, text, language, difficulty, topic, questions)
-                VALUES (%s, %s, %s, %s, %s, %s)
+                INSERT INTO exercises (title, text, language_id, difficulty_id, topic_id, questions)
+                VALUES (%s, %s, exercise_language_id(%s), exercise_difficulty_id(%s), exercise_topic_id(%s), %s)
+                ON CONFLICT (content_hash) DO NOTHING
             ''', (
                 exercise['title'],
                 exercise['text'],
                 exercise['language'],
                 exercise['difficulty'],
                 exercise['topic'],
-                exercise['questions']
+                questions_param(exercise['questions'])
             ))
         
         print(f"✅ Added {len(english_exercises)} English exercises")
@@ -383,118 +444,233 @@ def insert_sample_exercises():
         # Add exercises for other languages here if needed
         print("📚 Database initialized with sample exercises")
 
-# Initialize database on startup
-init_database()
-insert_sample_exercises()
+# Representative texts chunked before the worker reports ready: file paths
+# (relative to this directory) and/or "catalog" for English exercises
+WARMUP_SOURCES = [source.strip() for source in os.getenv('WARMUP_SOURCES', 'reading1.txt,catalog').split(',') if source.strip()]
+WARMUP_CATALOG_SAMPLES = int(os.getenv('WARMUP_CATALOG_SAMPLES', 3))
+WARMUP_MAX_CHARS = int(os.getenv('WARMUP_MAX_CHARS', 20000))
+
+# Subsystems brought up by warm_up(); /health and /ready report them
+readiness = {
+    "model": False,      # spaCy pipeline loaded (in the NLP worker processes with NLP_WORKERS)
+    "database": False,   # PostgreSQL reachable and schema migrated
+    "warmed_up": False,  # warm-up texts chunked (first-call costs paid)
+}
+_warm_up_lock = threading.Lock()
+
+def check_database() -> bool:
+    """Check that PostgreSQL is reachable and migrated, updating readiness"""
+    try:
+        result = execute_query("SELECT to_regclass('exercise_details') IS NOT NULL AS migrated", fetch=True)
+        if not result[0]['migrated']:
+            logger.warning("Database schema missing; run: python backend.py migrate")
+            return False
+        catalog_stats.get()
+        readiness["database"] = True
+    except Exception as e:
+        logger.warning(f"Database not ready: {e}")
+    return readiness["database"]
+
+def warm_up_texts() -> list:
+    """Load the WARMUP_SOURCES texts, skipping sources that are unavailable"""
+    texts = []
+    for source in WARMUP_SOURCES:
+        try:
+            if source == 'catalog':
+                rows = execute_query(
+                    "SELECT text FROM exercise_details WHERE language = %s ORDER BY id LIMIT %s",
+                    ('en', WARMUP_CATALOG_SAMPLES), fetch=True
+                )
+                texts.extend(row['text'] for row in rows)
+            else:
+                path = Path(source) if Path(source).is_absolute() else Path(__file__).parent / source
+                texts.append(path.read_text(encoding='utf-8'))
+        except Exception as e:
+            logger.warning(f"Warm-up source {source} unavailable: {e}")
+    return [text[:WARMUP_MAX_CHARS] for text in texts if text.strip()]
 
-def chunk_text_smart(text: str):
+def warm_up(start_nlp_workers: bool = True) -> bool:
     """
-    Intelligently chunk text into meaningful phrase-level units
-    optimized for reducing subvocalization.
+    Bring up the lazily initialized subsystems ahead of traffic
+
+    Loads the spaCy model, checks the database (filling the catalog
+    statistics cache) and chunks the warm-up texts, so spaCy's first-call
+    costs (vocabulary, lazily built tables) are paid before /health turns
+    ready. Runs in the gunicorn master before it forks, or in the
+    background when serving with python backend.py / asgi.py; requests
+    arriving earlier initialize what they need on first use.
+
+    With NLP_WORKERS set, the model is loaded and the texts chunked in each
+    NLP worker process as it starts instead.
+
+    Args:
+        start_nlp_workers: False in the gunicorn master: worker processes do
+            not survive fork, so each web worker starts its own
+
+    Returns:
+        True when every subsystem is ready
     """
-    doc = nlp(text)
-    chunks = []
-    
-    for sent in doc.sents:
-        # Process sentence into meaningful chunks
-        sent_chunks = []
-        i = 0
-        sent_tokens = list(sent)
-        
-        while i < len(sent_tokens):
-            token = sent_tokens[i]
-            chunk_tokens = []
-            
-            # Strategy 1: Capture noun chunks (noun phrases)
-            if token.pos_ in ("NOUN", "PROPN", "PRON"):
-                # Get full noun phrase
-                for np in doc.noun_chunks:
-                    if token in np:
-                        chunk_tokens = [t.text for t in np]
-                        i += len(chunk_tokens)
-                        break
-                
-                if not chunk_tokens:
-                    chunk_tokens = [token.text]
-                    i += 1
-            
-            # Strategy 2: Capture verb phrases
-            elif token.pos_ == "VERB":
-                # Include auxiliaries and the main verb
-                chunk_tokens = []
-                
-                # Add preceding auxiliaries
-                for child in token.lefts:
-                    if child.dep_ in ("aux", "auxpass", "neg"):
-                        chunk_tokens.append(child.text)
-                
-                chunk_tokens.append(token.text)
-                
-                # Add direct objects or complements
-                for child in token.rights:
-                    if child.dep_ in ("dobj", "prt", "advmod") and len(chunk_tokens) < 4:
-                        chunk_tokens.append(child.text)
-                
-                i += 1
-            
-            # Strategy 3: Capture prepositional phrases
-            elif token.pos_ == "ADP":
-                chunk_tokens = [token.text]
-                
-                # Add the object of preposition
-                for child in token.children:
-                    if child.dep_ == "pobj":
-                        # Get the full noun phrase if it's part of one
-                        for np in doc.noun_chunks:
-                            if child in np:
-                                chunk_tokens.extend([t.text for t in np])
-                                break
-                        else:
-                            chunk_tokens.append(child.text)
-                        break
-                
-                i += 1
-            
-            # Default: single token
+    with _warm_up_lock:
+        check_database()
+
+        if nlp_workers.enabled and not start_nlp_workers:
+            return False
+
+        if not readiness["warmed_up"]:
+            started = time.monotonic()
+            texts = warm_up_texts()
+            if nlp_workers.enabled:
+                nlp_workers.start(texts)
             else:
-                chunk_tokens = [token.text]
-                i += 1
-            
-            if chunk_tokens:
-                chunk = " ".join(chunk_tokens).strip()
-                if chunk and not all(c in ".,!?;:" for c in chunk):
-                    sent_chunks.append(chunk)
-        
-        chunks.extend(sent_chunks)
-    
-    # Clean up chunks
-    cleaned_chunks = []
-    for chunk in chunks:
-        chunk = chunk.strip()
-        if chunk and len(chunk) > 0:
-            cleaned_chunks.append(chunk)
-    
-    return cleaned_chunks
+                get_nlp()
+                for text in texts:
+                    chunk_packed(text)
+            readiness["model"] = readiness["warmed_up"] = True
+            logger.info(f"Warm-up chunked {len(texts)} texts in {time.monotonic() - started:.2f}s")
 
+    return all(readiness.values())
 
-def generate_comprehension_questions(text: str, num_questions: int = 3):
+def readiness_status() -> bool:
+    """Whether the worker should receive traffic (re-checks a database that was down)"""
+    if not readiness["database"]:
+        check_database()
+    return all(readiness.values())
+
+def start_warm_up() -> threading.Thread:
+    """Run warm_up() in a background thread so the server accepts connections right away"""
+    thread = threading.Thread(target=warm_up, name='warm-up', daemon=True)
+    thread.start()
+    return thread
+
+# /chunk representations (see chunk())
+CHUNK_FORMATS = ("strings", "offsets", "base64", "binary")
+# /rsvp representations (see rsvp())
+RSVP_FORMATS = ("strings", "offsets", "base64")
+
+# A/B test of chunking profiles: signed-in users are assigned one by weight,
+# e.g. "phrases:50,compact:50" (empty: CHUNKING_PROFILE for everyone)
+CHUNKING_EXPERIMENT = [
+    (name.strip(), int(weight)) for name, weight in
+    (entry.split(':', 1) for entry in os.getenv('CHUNKING_EXPERIMENT', '').split(',') if ':' in entry)
+]
+for _name, _ in CHUNKING_EXPERIMENT:
+    get_profile(_name)
+
+def chunking_profile_for(user) -> str:
+    """Chunking profile for a user's requests: their CHUNKING_EXPERIMENT group, stable across sessions"""
+    total = sum(weight for _, weight in CHUNKING_EXPERIMENT)
+    if not user or not total:
+        return DEFAULT_CHUNKING_PROFILE
+
+    digest = hashlib.sha256(f"chunking:{user['user_id']}".encode()).digest()
+    bucket = int.from_bytes(digest[:4], 'big') % total
+    for name, weight in CHUNKING_EXPERIMENT:
+        if bucket < weight:
+            return name
+        bucket -= weight
+    return DEFAULT_CHUNKING_PROFILE
+
+def chunk_packed(text: str, profile: str = None, language: str = 'en', pace: ReadingPace = None):
     """
-    Generate comprehension questions from the given text using OpenAI.
-    Returns questions with multiple choice answers.
+    Packed chunk offsets for text (see chunker.chunk_offsets), from the
+    chunk cache or computed: in the NLP worker processes when NLP_WORKERS
+    is set, otherwise in this thread
+
+    Args:
+        text: Text to chunk
+        profile: Chunking profile (default CHUNKING_PROFILE)
+        language: Language of the text
+        pace: Reader's pace, whose chunk sizes replace the profile's (adaptive profiles)
+
+    Returns:
+        (packed offsets, stage timings in ms); timings are None for cached texts
+
+    Raises:
+        ValueError: Unknown profile
+        NLPOverloaded: The NLP queue is full
+        NLPDeadlineExceeded: The workers did not finish within NLP_DEADLINE_SECONDS
     """
-    if not openai_client:
-        # Return fallback questions if OpenAI is not available
-        return [
-            {
-                "question": "What is the main topic discussed in this text?",
-                "options": ["The main topic", "A different topic", "Another topic", "Not mentioned"],
-                "correct_answer": 0,
-                "explanation": "This is a fallback question for testing purposes."
-            }
-        ]
-    
-    try:
-        prompt = f"""
+    profile = profile or DEFAULT_CHUNKING_PROFILE
+    chunking = get_profile(profile)
+    variant = f"{profile}/{base_language(language)}"
+    if pace is not None and chunking.adaptive:
+        chunking = chunking.sized(pace.target_words, pace.max_words)
+        variant += f"/{pace.target_words:g}-{pace.max_words:g}"
+
+    key = text_key(text, variant)
+    packed = chunk_cache.get(key)
+    if packed is not None:
+        return packed, None
+
+    if nlp_workers.enabled:
+        packed, timings = nlp_workers.chunk_packed(text, chunking, language)
+    else:
+        started = time.perf_counter()
+        doc = get_nlp(language)(text)
+        timings = {"parse": round((time.perf_counter() - started) * 1000, 3)}
+        packed = pack_offsets(parse_chunk_offsets(doc, chunking, language, timings))
+
+    chunk_cache.put(key, packed)
+    return packed, timings
+
+def rsvp_word_offsets(text: str, language: str = 'en'):
+    """Word (start, end) character offsets for RSVP display, flattened (see chunker.word_offsets), from the chunk cache or the tokenizer"""
+    key = text_key(text, f"rsvp/{base_language(language)}")
+    packed = chunk_cache.get(key)
+    if packed is None:
+        packed = pack_offsets(word_offsets(get_tokenizer(language)(text), language))
+        chunk_cache.put(key, packed)
+    return unpack_offsets(packed)
+
+def request_reading_pace(data, user) -> ReadingPace:
+    """
+    Reading pace for a request: its 'wpm' (query or body), else the user's
+    measured pace, else the default
+
+    Raises:
+        ValueError: wpm is not a positive, finite number
+    """
+    wpm = request.args.get("wpm") or data.get("wpm")
+    if wpm:
+        try:
+            wpm = float(wpm)
+        except (TypeError, ValueError):
+            wpm = 0
+        if not math.isfinite(wpm) or wpm <= 0:
+            raise ValueError("wpm must be a positive number")
+        return reading_pace(wpm, source="request")
+    if user:
+        return reading_paces.get(user["user_id"])
+    return reading_pace()
+
+def chunk_offsets(text: str, profile: str = None, language: str = 'en'):
+    """Chunk (start, end) character offsets for text, flattened (see chunk_packed)"""
+    return unpack_offsets(chunk_packed(text, profile, language)[0])
+
+def chunk_text_smart(text: str, profile: str = None, language: str = 'en'):
+    """
+    Intelligently chunk text into meaningful phrase-level units
+    optimized for reducing subvocalization (see chunk_packed).
+    """
+    return offsets_to_chunks(text, chunk_offsets(text, profile, language))
+
+
+# Model used for question generation
+QUESTION_MODEL = "gpt-4o-mini"
+
+# Returned when OpenAI is not configured or fails
+FALLBACK_QUESTIONS = [
+    {
+        "question": "What is the main topic discussed in this text?",
+        "options": ["The main topic", "A different topic", "Another topic", "Not mentioned"],
+        "correct_answer": 0,
+        "explanation": "This is a fallback question for testing purposes."
+    }
+]
+
+def question_prompt(text: str, num_questions: int) -> str:
+    """Chat prompt asking for multiple choice questions as a JSON array"""
+    return f"""
         Generate {num_questions} comprehension questions based on the following text. 
         Each question should test understanding of key concepts, facts, or details from the text.
         
@@ -516,10 +692,20 @@ def generate_comprehension_questions(text: str, num_questions: int = 3):
         - correct_answer is the index (0-3) of the correct option
         - Include explanations for learning
         """
-        
+
+def generate_comprehension_questions(text: str, num_questions: int = 3):
+    """
+    Generate comprehension questions from the given text using OpenAI.
+    Returns questions with multiple choice answers.
+    """
+    if not openai_client:
+        # Return fallback questions if OpenAI is not available
+        return FALLBACK_QUESTIONS
+    
+    try:
         response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
+            model=QUESTION_MODEL,
+            messages=[{"role": "user", "content": question_prompt(text, num_questions)}],
             temperature=0.7
         )
         
@@ -530,19 +716,12 @@ def generate_comprehension_questions(text: str, num_questions: int = 3):
     except Exception as e:
         print(f"Error generating questions: {e}")
         # Return fallback questions if AI fails
-        return [
-            {
-                "question": "What is the main topic discussed in this text?",
-                "options": ["The main topic", "A different topic", "Another topic", "Not mentioned"],
-                "correct_answer": 0,
-                "explanation": "This is a fallback question for testing purposes."
-            }
-        ]
+        return FALLBACK_QUESTIONS
 
 
 
 
-@app.route("/exercises", methods=["GET"])
+@api.route("/exercises", methods=["GET"])
 def get_exercises():
     """
     Endpoint to get a random exercise with text and questions for reading comprehension.
@@ -554,27 +733,27 @@ def get_exercises():
         difficulty = request.args.get('difficulty')
         topic = request.args.get('topic')
         
-        # Build query with optional filters
-        query = "SELECT id, title, text, language, difficulty, topic, questions FROM exercises WHERE language = ?"
-        params = [language]
-        
-        if difficulty:
-            query += " AND difficulty = ?"
-            params.append(difficulty)
-        
-        if topic:
-            query += " AND topic = ?"
-            params.append(topic)
+        # Pick a random matching id from the (language_id, difficulty_id, topic_id, id)
+        # index, then read only that row
+        conditions, params = exercise_filter_conditions(language, difficulty, topic)
         
+        query = f'''
+            SELECT id, title, text, language, difficulty, topic, questions
+            FROM exercise_details
+            WHERE id = (SELECT id FROM exercises WHERE {' AND '.join(conditions)} ORDER BY RANDOM() LIMIT 1)
+        '''
         exercises = execute_query(query, tuple(params), fetch=True)
         
         if not exercises:
             # Fallback to any language if no exercises found
-            exercises = execute_query("SELECT id, title, text, language, difficulty, topic, questions FROM exercises", fetch=True)
+            exercises = execute_query('''
+                SELECT id, title, text, language, difficulty, topic, questions
+                FROM exercise_details
+                WHERE id = (SELECT id FROM exercises ORDER BY RANDOM() LIMIT 1)
+            ''', fetch=True)
         
         if exercises:
-            # Select random exercise
-            selected_exercise = random.choice(exercises)
+            selected_exercise = exercises[0]
             
             return jsonify({
                 "success": True,
@@ -585,7 +764,7 @@ def get_exercises():
                     "language": selected_exercise['language'],
                     "difficulty": selected_exercise['difficulty'],
                     "topic": selected_exercise['topic'],
-                    "questions": json.loads(selected_exercise['questions'])
+                    "questions": selected_exercise['questions']
                 }
             })
         else:
@@ -601,7 +780,84 @@ def get_exercises():
             "error": str(e)
         }), 500
 
-@app.route("/exercises/user", methods=["GET"])
+@api.route("/exercises/list", methods=["GET"])
+@cache_policy(max_age=60)
+def get_exercise_list():
+    """
+    Browse the exercise catalog with cursor (keyset) pagination.
+    Supports ?language=, ?difficulty=, ?topic=, ?limit=, ?cursor= and
+    ?fields=text,questions to include the large fields.
+    """
+    try:
+        fields = tuple(field.strip() for field in request.args.get('fields', '').split(',') if field.strip())
+        
+        try:
+            page = list_exercises(
+                language=request.args.get('language'),
+                difficulty=request.args.get('difficulty'),
+                topic=request.args.get('topic'),
+                cursor=request.args.get('cursor'),
+                limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+                fields=fields
+            )
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
+        
+        return jsonify({
+            "success": True,
+            "exercises": page['exercises'],
+            "count": len(page['exercises']),
+            "next_cursor": page['next_cursor']
+        })
+    
+    except Exception as e:
+        log_exception(logger, f"Error in get_exercise_list endpoint: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@api.route("/exercises/search", methods=["GET"])
+@cache_policy(max_age=60)
+def search_exercise_catalog():
+    """
+    Full-text search over exercise titles and text, best matches first.
+    Requires ?q=; supports ?language=, ?difficulty=, ?topic=, ?limit= and ?cursor=.
+    """
+    try:
+        try:
+            page = search_exercises(
+                request.args.get('q', ''),
+                language=request.args.get('language'),
+                difficulty=request.args.get('difficulty'),
+                topic=request.args.get('topic'),
+                cursor=request.args.get('cursor'),
+                limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+            )
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
+        
+        return jsonify({
+            "success": True,
+            "exercises": page['exercises'],
+            "count": len(page['exercises']),
+            "next_cursor": page['next_cursor']
+        })
+    
+    except Exception as e:
+        log_exception(logger, f"Error in search_exercise_catalog endpoint: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+@api.route("/exercises/user", methods=["GET"])
 def get_user_exercise():
     """
     Get the next exercise in the user's queue based on their progress.
@@ -634,7 +890,7 @@ def get_user_exercise():
             "error": str(e)
         }), 500
 
-@app.route("/progress", methods=["POST"])
+@api.route("/progress", methods=["POST"])
 def submit_progress():
     """
     Submit reading progress and comprehension results.
@@ -672,6 +928,13 @@ def submit_progress():
                 "error": "Comprehension score must be between 0.0 and 1.0"
             }), 400
         
+        # Validate reading speed (float() accepts 'nan' and 'inf')
+        if not math.isfinite(reading_speed_wpm) or reading_speed_wpm < 0:
+            return jsonify({
+                "success": False,
+                "error": "reading_speed_wpm must be a non-negative number"
+            }), 400
+        
         # Update progress and manage queue
         status = update_user_progress(
             user["user_id"], exercise_id, comprehension_score,
@@ -696,7 +959,7 @@ def submit_progress():
             "error": str(e)
         }), 500
 
-@app.route("/user/progress", methods=["GET"])
+@api.route("/user/progress", methods=["GET"])
 def get_user_progress():
     """
     Get user's reading progress and statistics.
@@ -709,33 +972,23 @@ def get_user_progress():
                 "error": "Authentication required"
             }), 401
         
-        # Get user's progress statistics
+        # Get user's progress statistics (maintained incrementally by triggers)
         stats_result = execute_query('''
-            SELECT 
-                COUNT(*) as total_exercises,
-                SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) as completed_exercises,
-                SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) as failed_exercises,
-                AVG(CASE WHEN status = 'completed' THEN comprehension_score ELSE NULL END) as avg_comprehension,
-                AVG(reading_speed_wpm) as avg_reading_speed,
-                SUM(session_duration_seconds) as total_reading_time
-            FROM user_progress 
-            WHERE user_id = ?
+            SELECT total_exercises, completed_exercises, failed_exercises,
+                   completed_comprehension_sum, reading_speed_sum,
+                   total_reading_time, queue_count, recent_wpm, recent_comprehension
+            FROM user_stats
+            WHERE user_id = %s
         ''', (user["user_id"],), fetch=True)
         
         stats = stats_result[0] if stats_result else {}
         
-        # Get queue information
-        queue_result = execute_query('''
-            SELECT COUNT(*) as count FROM user_queue WHERE user_id = %s
-        ''', (user["user_id"],), fetch=True)
-        
-        queue_count = queue_result[0]['count'] if queue_result else 0
-        
         total_exercises = stats.get('total_exercises', 0)
         completed_exercises = stats.get('completed_exercises', 0)
         failed_exercises = stats.get('failed_exercises', 0)
-        avg_comprehension = stats.get('avg_comprehension', 0.0)
-        avg_reading_speed = stats.get('avg_reading_speed', 0.0)
+        queue_count = stats.get('queue_count', 0)
+        avg_comprehension = (stats.get('completed_comprehension_sum') or 0) / max(completed_exercises or 0, 1)
+        avg_reading_speed = (stats.get('reading_speed_sum') or 0) / max(total_exercises or 0, 1)
         total_reading_time = stats.get('total_reading_time', 0)
         
         return jsonify({
@@ -748,6 +1001,9 @@ def get_user_progress():
                 "avg_comprehension": round(avg_comprehension or 0, 2),
                 "avg_reading_speed": round(avg_reading_speed or 0, 1),
                 "total_reading_time_seconds": total_reading_time or 0,
+                "recent_reading_speed": round(stats['recent_wpm'], 1) if stats.get('recent_wpm') else None,
+                "recent_comprehension": round(stats['recent_comprehension'], 2) if stats.get('recent_comprehension') is not None else None,
+                "reading_pace": reading_pace(stats.get('recent_wpm'), stats.get('recent_comprehension')).to_dict(),
                 "completion_rate": round((completed_exercises or 0) / max(total_exercises or 1, 1) * 100, 1)
             }
         })
@@ -759,44 +1015,89 @@ def get_user_progress():
         }), 500
 
 
-@app.route("/exercises/stats", methods=["GET"])
+@api.route("/exercises/stats", methods=["GET"])
+@cache_policy(max_age=catalog_stats.ttl_seconds)
 def get_exercise_stats():
-    """Get statistics about available exercises"""
+    """Get statistics about available exercises (served from an in-memory snapshot)"""
     try:
-        # Get total count
-        total_result = execute_query("SELECT COUNT(*) as count FROM exercises", fetch=True)
-        total_count = total_result[0]['count'] if total_result else 0
-        
-        # Get count by language
-        language_result = execute_query("SELECT language, COUNT(*) as count FROM exercises GROUP BY language", fetch=True)
-        by_language = {row['language']: row['count'] for row in language_result} if language_result else {}
+        snapshot = catalog_stats.get()
         
-        # Get count by difficulty
-        difficulty_result = execute_query("SELECT difficulty, COUNT(*) as count FROM exercises GROUP BY difficulty", fetch=True)
-        by_difficulty = {row['difficulty']: row['count'] for row in difficulty_result} if difficulty_result else {}
-        
-        # Get count by topic
-        topic_result = execute_query("SELECT topic, COUNT(*) as count FROM exercises GROUP BY topic", fetch=True)
-        by_topic = {row['topic']: row['count'] for row in topic_result} if topic_result else {}
+        cached = not_modified(etag=snapshot.etag)
+        if cached:
+            return cached
         
+        response = json_response(snapshot.body)
+        response.set_etag(snapshot.etag)
+        return response
+    
+    except Exception as e:
         return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@api.route("/exercises/<int:exercise_id>", methods=["GET"])
+@cache_policy(max_age=300)
+def get_exercise(exercise_id):
+    """
+    Get a single exercise by id.
+    Supports ETag/Last-Modified revalidation based on the exercise's updated_at.
+    """
+    try:
+        # Revalidation only needs the timestamp, not the passage and questions
+        if request.if_none_match or request.if_modified_since:
+            # updated_at is a TIMESTAMP in the session's time zone: make it aware for the validators
+            validator_result = execute_query('''
+                SELECT id, updated_at AT TIME ZONE current_setting('TimeZone') AS updated_at
+                FROM exercises WHERE id = %s
+            ''', (exercise_id,), fetch=True)
+            if validator_result:
+                cached = not_modified(*validators_from_timestamp(exercise_id, validator_result[0]['updated_at']))
+                if cached:
+                    return cached
+        
+        exercise_result = execute_query('''
+            SELECT id, title, text, language, difficulty, topic, questions,
+                   updated_at AT TIME ZONE current_setting('TimeZone') AS updated_at
+            FROM exercise_details
+            WHERE id = %s
+        ''', (exercise_id,), fetch=True)
+        
+        if not exercise_result:
+            return jsonify({
+                "success": False,
+                "error": "Exercise not found"
+            }), 404
+        
+        exercise = exercise_result[0]
+        response = jsonify({
             "success": True,
-            "stats": {
-                "total": total_count,
-                "by_language": by_language,
-                "by_difficulty": by_difficulty,
-                "by_topic": by_topic
+            "exercise": {
+                "id": exercise['id'],
+                "title": exercise['title'],
+                "text": exercise['text'],
+                "language": exercise['language'],
+                "difficulty": exercise['difficulty'],
+                "topic": exercise['topic'],
+                "questions": exercise['questions']
             }
         })
+        
+        etag, last_modified = validators_from_timestamp(exercise_id, exercise['updated_at'])
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        return response
     
     except Exception as e:
+        log_exception(logger, f"Error in get_exercise endpoint: {str(e)}")
         return jsonify({
             "success": False,
             "error": str(e)
         }), 500
 
 
-@app.route("/exercises/add", methods=["POST"])
+@api.route("/exercises/add", methods=["POST"])
 def add_exercise():
     """Add a new exercise to the database"""
     try:
@@ -810,27 +1111,40 @@ def add_exercise():
                     "error": f"Missing required field: {field}"
                 }), 400
         
-        execute_query('''
-            INSERT INTO exercises (title, text, language, difficulty, topic, questions)
-            VALUES (%s, %s, %s, %s, %s, %s)
+        try:
+            questions = questions_param(data['questions'])
+        except ValueError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e)
+            }), 400
+        
+        # Idempotent insert: an existing copy of the passage is returned instead of duplicated.
+        # The no-op DO UPDATE returns the existing row even when a concurrent insert of the
+        # same passage committed after this statement's snapshot (xmax = 0: freshly inserted).
+        result = execute_query('''
+            INSERT INTO exercises (title, text, language_id, difficulty_id, topic_id, questions)
+            VALUES (%s, %s, exercise_language_id(%s), exercise_difficulty_id(%s), exercise_topic_id(%s), %s)
+            ON CONFLICT (content_hash) DO UPDATE SET content_hash = EXCLUDED.content_hash
+            RETURNING id, (xmax = 0) AS created
         ''', (
             data['title'],
             data['text'],
             data.get('language', 'en'),
             data.get('difficulty', 'intermediate'),
             data.get('topic', 'general'),
-            json.dumps(data['questions'])
-        ))
+            questions
+        ), fetch=True)
         
-        # Get the new exercise ID
-        new_exercise = execute_query('SELECT id FROM exercises WHERE title = %s AND text = %s', 
-                                   (data['title'], data['text']), fetch=True)
-        exercise_id = new_exercise[0]['id'] if new_exercise else None
+        created = bool(result and result[0]['created'])
+        if created:
+            catalog_stats.invalidate()
         
         return jsonify({
             "success": True,
-            "exercise_id": exercise_id,
-            "message": "Exercise added successfully"
+            "exercise_id": result[0]['id'] if result else None,
+            "created": created,
+            "message": "Exercise added successfully" if created else "Exercise already exists"
         })
     
     except Exception as e:
@@ -839,8 +1153,44 @@ def add_exercise():
             "error": str(e)
         }), 500
 
+@api.route("/exercises/bulk", methods=["POST"])
+def bulk_import_exercises():
+    """
+    Import many exercises from a streamed JSONL (default) or CSV request body.
+    Responds with one NDJSON progress line per committed batch, including the
+    inserted ids; resend with ?skip=<processed> to resume an interrupted import.
+    """
+    fmt = request.args.get('format') or ('csv' if 'csv' in (request.content_type or '') else 'jsonl')
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({
+            "success": False,
+            "error": f"Unsupported format: {fmt}"
+        }), 400
+    
+    skip = request.args.get('skip', 0, type=int)
+    importer = ExerciseImporter(request.args.get('batch_size', IMPORT_BATCH_SIZE, type=int))
+    stream = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+    
+    def generate():
+        progress = None
+        try:
+            for progress in importer.iter_import(read_records(stream, fmt), skip=skip):
+                yield dumps(dict(progress, success=True, done=False)) + b"\n"
+            yield dumps(dict(progress, ids=[], success=True, done=True)) + b"\n"
+        except Exception as e:
+            log_exception(logger, f"Error in bulk_import_exercises endpoint: {str(e)}")
+            yield dumps({
+                "success": False,
+                "error": str(e),
+                "processed": progress['processed'] if progress else skip
+            }) + b"\n"
+        finally:
+            catalog_stats.invalidate()
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
-@app.route("/auth/register", methods=["POST"])
+
+@api.route("/auth/register", methods=["POST"])
 def register():
     """Register a new user"""
     try:
@@ -879,7 +1229,7 @@ def register():
             }), 400
         
         # Check if user already exists
-        existing_user = execute_query('SELECT id FROM users WHERE username = %s OR email = %s', (username, email), fetch=True)
+        existing_user = execute_prepared('user_by_login', (username, email), fetch=True)
         if existing_user:
             return jsonify({
                 "success": False,
@@ -894,20 +1244,14 @@ def register():
         ''', (username, email, password_hash, preferred_language))
         
         # Get the new user ID
-        new_user = execute_query('SELECT id FROM users WHERE email = %s', (email,), fetch=True)
+        new_user = execute_prepared('user_id_by_email', (email,), fetch=True)
         user_id = new_user[0]['id'] if new_user else None
         
         if user_id:
             # Initialize user queue
             initialize_user_queue(user_id, preferred_language)
         
-        # Generate session token
-        session_token = generate_session_token()
-        user_sessions[session_token] = {
-            "user_id": user_id,
-            "username": username,
-            "email": email
-        }
+        session_token = sessions.create(user_id)
         
         return jsonify({
             "success": True,
@@ -927,7 +1271,7 @@ def register():
             "error": str(e)
         }), 500
 
-@app.route("/auth/login", methods=["POST"])
+@api.route("/auth/login", methods=["POST"])
 def login():
     """Login user"""
     try:
@@ -945,11 +1289,7 @@ def login():
         password = data['password']
         
         # Find user by username or email
-        user_result = execute_query('''
-            SELECT id, username, email, password_hash, preferred_language 
-            FROM users 
-            WHERE username = %s OR email = %s
-        ''', (username, username.lower()), fetch=True)
+        user_result = execute_prepared('user_by_login', (username, username.lower()), fetch=True)
         
         if not user_result:
             return jsonify({
@@ -970,16 +1310,10 @@ def login():
                 "error": "Invalid username or password"
             }), 401
         
-        # Generate session token
-        session_token = generate_session_token()
-        user_sessions[session_token] = {
-            "user_id": user_id,
-            "username": db_username,
-            "email": email
-        }
+        session_token = sessions.create(user_id)
         
         # Update last login
-        execute_query('UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = %s', (user_id,))
+        execute_prepared('touch_last_login', (user_id,))
         
         return jsonify({
             "success": True,
@@ -999,13 +1333,11 @@ def login():
             "error": str(e)
         }), 500
 
-@app.route("/auth/logout", methods=["POST"])
+@api.route("/auth/logout", methods=["POST"])
 def logout():
     """Logout user"""
     try:
-        token = request.headers.get('Authorization', '').replace('Bearer ', '')
-        if token in user_sessions:
-            del user_sessions[token]
+        sessions.delete(request_session_token())
         
         return jsonify({
             "success": True,
@@ -1018,7 +1350,7 @@ def logout():
             "error": str(e)
         }), 500
 
-@app.route("/auth/me", methods=["GET"])
+@api.route("/auth/me", methods=["GET"])
 def get_current_user_info():
     """Get current user information"""
     try:
@@ -1041,7 +1373,7 @@ def get_current_user_info():
         }), 500
 
 # OAuth endpoints
-@app.route("/auth/oauth/<provider>", methods=["GET"])
+@api.route("/auth/oauth/<provider>", methods=["GET"])
 def oauth_login(provider):
     """Initiate OAuth login with specified provider"""
     try:
@@ -1068,11 +1400,11 @@ def oauth_login(provider):
                 }), 500
             
             # Use Authlib's Apple client
-            client = oauth.apple
+            client = get_oauth().apple
             return client.authorize_redirect(redirect_uri, client_secret=client_secret)
         else:
             # Standard OAuth flow for Google and Microsoft
-            client = oauth.__getattr__(provider)
+            client = get_oauth().__getattr__(provider)
             return client.authorize_redirect(redirect_uri)
     
     except Exception as e:
@@ -1081,7 +1413,7 @@ def oauth_login(provider):
             "error": str(e)
         }), 500
 
-@app.route("/auth/callback", methods=["GET"])
+@api.route("/auth/callback", methods=["GET"])
 def oauth_callback():
     """Handle OAuth callback from providers"""
     try:
@@ -1096,9 +1428,9 @@ def oauth_callback():
         else:
             # Try to determine from the authorization response
             for p in ['google', 'microsoft', 'apple']:
-                if hasattr(oauth, p):
+                if hasattr(get_oauth(), p):
                     try:
-                        client = oauth.__getattr__(p)
+                        client = get_oauth().__getattr__(p)
                         token = client.authorize_access_token()
                         if token:
                             provider = p
@@ -1113,7 +1445,7 @@ def oauth_callback():
             }), 400
         
         # Get user info from provider
-        client = oauth.__getattr__(provider)
+        client = get_oauth().__getattr__(provider)
         
         if provider == 'apple':
             # Apple requires special handling
@@ -1133,9 +1465,7 @@ def oauth_callback():
         preferred_language = session.get('preferred_language', 'en')
         user_data = create_or_get_oauth_user(provider, user_info, preferred_language)
         
-        # Generate session token
-        session_token = generate_session_token()
-        user_sessions[session_token] = user_data
+        session_token = sessions.create(user_data["user_id"])
         
         # Redirect to frontend with token
         frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:3000')
@@ -1146,7 +1476,8 @@ def oauth_callback():
         frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:3000')
         return redirect(f"{frontend_url}/auth/callback?success=false&error={str(e)}")
 
-@app.route("/auth/oauth/providers", methods=["GET"])
+@api.route("/auth/oauth/providers", methods=["GET"])
+@cache_policy(max_age=300)
 def get_oauth_providers():
     """Get available OAuth providers"""
     providers = []
@@ -1180,7 +1511,8 @@ def get_oauth_providers():
         "providers": providers
     })
 
-@app.route("/", methods=["GET"])
+@api.route("/", methods=["GET"])
+@cache_policy(max_age=3600)
 def home():
     return jsonify({
         "service": "NoSubvo API",
@@ -1193,34 +1525,80 @@ def home():
             "/auth/oauth/<provider>": "GET - OAuth login (google, microsoft, apple)",
             "/auth/oauth/providers": "GET - Get available OAuth providers",
             "/auth/callback": "GET - OAuth callback handler",
-            "/chunk": "POST - Process text into reading chunks",
+            "/chunk": "POST - Process text into reading chunks (format, profile, language)",
+            "/rsvp": "POST - Word-by-word display schedule for a reading speed (wpm, language, format)",
             "/questions": "POST - Generate comprehension questions from text",
             "/exercises": "GET - Get random exercise (supports ?language=, ?difficulty=, ?topic=)",
+            "/exercises/<id>": "GET - Get exercise by id (supports ETag/If-None-Match)",
+            "/exercises/list": "GET - Browse exercises (supports ?cursor=, ?limit=, ?fields=text,questions and filters)",
+            "/exercises/search": "GET - Search exercises (?q=, ranked with snippets, supports ?cursor= and filters)",
             "/exercises/user": "GET - Get next exercise for authenticated user",
             "/exercises/stats": "GET - Get exercise statistics",
             "/exercises/add": "POST - Add new exercise to database",
+            "/exercises/bulk": "POST - Bulk import exercises from JSONL/CSV (streams progress, ?skip= to resume)",
             "/progress": "POST - Submit reading progress",
-            "/health": "GET - Check service health"
+            "/health": "GET - Check service health (503 while warming up)",
+            "/ready": "GET - Readiness probe (503 until warm-up is done and the database is ready)"
         }
     })
 
 
-@app.route("/health", methods=["GET"])
+@api.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "healthy", "message": "Service is running"})
+    """Health check: 503 until warm-up is done, so load balancers skip cold workers"""
+    is_ready = readiness_status()
+    return jsonify({
+        "status": "healthy" if is_ready else "warming_up",
+        "message": "Service is running" if is_ready else "Service is warming up",
+        "ready": is_ready,
+        "apple_client_secret": apple_secret_signer.status() if apple_secret_signer else {"configured": False}
+    }), 200 if is_ready else 503
 
 
-@app.route("/chunk", methods=["POST"])
+@api.route("/ready", methods=["GET"])
+def ready():
+    """Readiness probe: 200 once warm-up is done and the database is usable, 503 before"""
+    is_ready = readiness_status()
+    payload = {
+        "ready": is_ready,
+        "subsystems": readiness,
+        "chunk_cache": chunk_cache.stats()
+    }
+    if nlp_workers.enabled:
+        payload["nlp_workers"] = nlp_workers.status()
+    return jsonify(payload), 200 if is_ready else 503
+
+
+@api.route("/chunk", methods=["POST"])
 def chunk():
     """
     Endpoint to chunk text for subvocalization reduction.
     Accepts JSON with 'text' field or file upload.
+
+    The 'format' field (JSON) or query parameter picks the representation:
+    'strings' (default) lists the chunk texts; 'offsets' a flat list of
+    character offsets into the text [start0, end0, start1, end1, ...];
+    'base64' the same offsets packed as little-endian uint32; 'binary' the
+    packed bytes themselves (application/octet-stream, chunk count in the
+    X-Chunk-Count header).
+
+    'profile' picks the chunking profile ('phrases', 'compact', 'modifiers',
+    'words'; default CHUNKING_PROFILE, or the user's CHUNKING_EXPERIMENT
+    group when signed in) and 'language' the text's language (default 'en').
+    Stage timings come back in 'timings_ms' and the Server-Timing header,
+    or 'cached' when the chunks came from the chunk cache.
+
+    Chunks are sized for the reader's pace: 'wpm' when given, else the
+    signed-in user's recent reading speed and comprehension. The pace
+    comes back in 'pace' and each chunk's display time in 'durations_ms'
+    (JSON formats; 'binary' sends the pace's wpm in X-Reading-WPM).
     """
     try:
         if request.content_type and 'application/json' in request.content_type:
             data = request.json
             text = data.get("text", "")
         elif 'file' in request.files:
+            data = request.form
             text = request.files['file'].read().decode("utf-8")
         else:
             return jsonify({
@@ -1230,15 +1608,66 @@ def chunk():
         if not text or not text.strip():
             return jsonify({"error": "Text cannot be empty"}), 400
 
-        chunks = chunk_text_smart(text)
-        
-        return jsonify({
+        chunk_format = request.args.get("format") or data.get("format") or "strings"
+        if chunk_format not in CHUNK_FORMATS:
+            return jsonify({"error": f"format must be one of: {', '.join(CHUNK_FORMATS)}"}), 400
+
+        user = get_current_user(optional=True)
+        profile = request.args.get("profile") or data.get("profile") or chunking_profile_for(user)
+        if profile not in chunking_profiles():
+            return jsonify({"error": f"profile must be one of: {', '.join(chunking_profiles())}"}), 400
+
+        language = request.args.get("language") or data.get("language") or "en"
+        if base_language(language) not in supported_languages():
+            return jsonify({"error": f"language must be one of: {', '.join(supported_languages())}"}), 400
+
+        try:
+            pace = request_reading_pace(data, user)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        packed, timings = chunk_packed(text, profile, language, pace if pace.source != "default" else None)
+        chunk_count = len(packed) // 8
+        headers = {"X-Chunk-Profile": profile, "X-Reading-WPM": f"{pace.wpm:g}"}
+        if timings:
+            headers["Server-Timing"] = ", ".join(f"{stage};dur={ms}" for stage, ms in timings.items())
+
+        if chunk_format == "binary":
+            headers["X-Chunk-Count"] = str(chunk_count)
+            return Response(packed, mimetype="application/octet-stream", headers=headers)
+
+        payload = {
             "success": True,
-            "chunks": chunks,
-            "chunk_count": len(chunks),
+            "format": chunk_format,
+            "profile": profile,
+            "language": language,
+            "chunk_count": chunk_count,
             "original_length": len(text)
-        })
+        }
+        if timings is None:
+            payload["cached"] = True
+        else:
+            payload["timings_ms"] = timings
+
+        offsets = unpack_offsets(packed)
+        durations = chunk_durations(text, offsets, pace.wpm, language)
+        payload["pace"] = pace.to_dict()
+        payload["durations_ms"] = durations.tolist()
+        payload["total_duration_ms"] = int(durations.sum())
+        if chunk_format == "strings":
+            payload["chunks"] = offsets_to_chunks(text, offsets)
+        elif chunk_format == "offsets":
+            payload["offsets"] = offsets.tolist()
+        else:
+            payload["offsets"] = base64.b64encode(packed).decode("ascii")
+        return jsonify(payload), 200, headers
     
+    except NLPOverloaded as e:
+        return jsonify({"success": False, "error": str(e)}), 503, {"Retry-After": "1"}
+
+    except NLPDeadlineExceeded as e:
+        return jsonify({"success": False, "error": str(e)}), 504
+
     except Exception as e:
         return jsonify({
             "success": False,
@@ -1246,7 +1675,86 @@ def chunk():
         }), 500
 
 
-@app.route("/questions", methods=["POST"])
+@api.route("/rsvp", methods=["POST"])
+def rsvp():
+    """
+    Word-at-a-time (RSVP) display schedule for a text.
+    Accepts JSON with 'text' field or file upload.
+
+    Each word gets a display time at the reader's pace ('wpm', else the
+    signed-in user's measured pace) weighted by its length, longer after
+    clause and sentence punctuation, and its optimal recognition point:
+    the offset within the word of the character to align and highlight.
+    'durations_ms' and 'orp' hold one entry per word.
+
+    The 'format' field (JSON) or query parameter picks how words are
+    given: 'strings' (default) the word texts; 'offsets' a flat list of
+    character offsets into the text [start0, end0, start1, end1, ...];
+    'base64' the offsets as little-endian uint32, the durations as
+    little-endian uint16 and the recognition points as uint8, each
+    base64-encoded.
+    """
+    try:
+        if request.content_type and 'application/json' in request.content_type:
+            data = request.json
+            text = data.get("text", "")
+        elif 'file' in request.files:
+            data = request.form
+            text = request.files['file'].read().decode("utf-8")
+        else:
+            return jsonify({
+                "error": "Send 'text' as JSON or 'file' as txt upload"
+            }), 400
+
+        if not text or not text.strip():
+            return jsonify({"error": "Text cannot be empty"}), 400
+
+        rsvp_format = request.args.get("format") or data.get("format") or "strings"
+        if rsvp_format not in RSVP_FORMATS:
+            return jsonify({"error": f"format must be one of: {', '.join(RSVP_FORMATS)}"}), 400
+
+        language = request.args.get("language") or data.get("language") or "en"
+        if base_language(language) not in supported_languages():
+            return jsonify({"error": f"language must be one of: {', '.join(supported_languages())}"}), 400
+
+        try:
+            pace = request_reading_pace(data, get_current_user(optional=True))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        offsets = rsvp_word_offsets(text, language)
+        durations, orp = rsvp_schedule(text, offsets, pace.wpm, language)
+
+        payload = {
+            "success": True,
+            "format": rsvp_format,
+            "language": language,
+            "wpm": pace.wpm,
+            "pace": pace.to_dict(),
+            "word_count": len(durations),
+            "total_duration_ms": int(durations.sum())
+        }
+        if rsvp_format == "base64":
+            payload["offsets"] = base64.b64encode(pack_offsets(offsets)).decode("ascii")
+            payload["durations_ms"] = base64.b64encode(pack_durations(durations)).decode("ascii")
+            payload["orp"] = base64.b64encode(orp.tobytes()).decode("ascii")
+        else:
+            if rsvp_format == "strings":
+                payload["words"] = offsets_to_chunks(text, offsets)
+            else:
+                payload["offsets"] = offsets.tolist()
+            payload["durations_ms"] = durations.tolist()
+            payload["orp"] = orp.tolist()
+        return jsonify(payload)
+
+    except Exception as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+
+@api.route("/questions", methods=["POST"])
 def generate_questions():
     """
     Generate comprehension questions from the provided text.
@@ -1279,10 +1787,50 @@ def generate_questions():
         }), 500
 
 
+def create_app() -> Flask:
+    """
+    Build the Flask application
+
+    Does no I/O: the schema is created by `python backend.py migrate`,
+    sample exercises by `python backend.py seed`, and the spaCy model,
+    OAuth providers and connection pools load on first use (or in warm_up).
+    """
+    app = Flask(__name__)
+    CORS(app)  # Enable CORS for frontend
+    init_serialization(app)  # Fast JSON + gzip/brotli (registered first so it compresses last)
+    init_http_cache(app)  # ETag/Cache-Control for read endpoints
+
+    # Set up session secret for OAuth
+    app.secret_key = os.getenv('FLASK_SECRET_KEY', secrets.token_hex(32))
+
+    oauth.init_app(app)
+    app.register_blueprint(api)
+    return app
+
+
+app = create_app()
+
+
 if __name__ == "__main__":
-    print("🚀 NoSubvo Backend API starting...")
-    print("📚 Loading spaCy model...")
-    print("✅ Ready! Access at http://localhost:5001")
-    app.run(debug=True, host='0.0.0.0', port=5001)
+    parser = argparse.ArgumentParser(description="NoSubvo backend API")
+    parser.add_argument('command', nargs='?', default='serve', choices=('serve', 'migrate', 'seed'),
+                        help="serve (default), migrate (create/upgrade the schema) or seed (sample exercises)")
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        init_database()
+        print("✅ Database schema is up to date")
+    elif args.command == 'seed':
+        insert_sample_exercises()
+        print("✅ Sample exercises present")
+    else:
+        # debug=True runs this script twice: a reloader process that only watches
+        # files, and the server it restarts (WERKZEUG_RUN_MAIN); only the server warms up
+        if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+            print("🚀 NoSubvo Backend API starting...")
+            print("📚 Warming up in the background (GET /health turns 200 when done)...")
+            start_warm_up()
+            print("✅ Accepting connections at http://localhost:5001")
+        app.run(debug=True, host='0.0.0.0', port=5001)
 
 
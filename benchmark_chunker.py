@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Chunker micro-benchmark for NoSubvo
+Compares the former string-joining chunker with the offsets-based one, per 1,000 tokens
+
+The text is parsed once; only chunking is measured. For each variant this
+reports the time, the peak memory allocated while chunking (tracemalloc),
+the memory blocks still allocated afterwards (the result's objects) and
+the size of the result, all per 1,000 tokens. CPython keeps no count of
+allocations outside debug builds; transient per-chunk objects show up in
+the time and, while alive, in the peak.
+
+    joined    the former chunker: a token list and a " ".join() string per chunk
+    offsets   chunker.chunk_offsets: flat offset array, no per-chunk objects
+    strings   offsets plus one slice of the original text per chunk (/chunk default)
+
+Usage:
+    python benchmark_chunker.py
+    python benchmark_chunker.py --file reading1.txt --tokens 50000 --repeat 20
+"""
+
+import sys
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from chunker import get_nlp, chunk_offsets, offsets_to_chunks
+
+
+def joined_chunks(doc) -> List[str]:
+    """The chunker as it was before offsets: tokens collected per chunk and re-joined with spaces"""
+    chunks = []
+    for sent in doc.sents:
+        sent_chunks = []
+        i = 0
+        sent_tokens = list(sent)
+        while i < len(sent_tokens):
+            token = sent_tokens[i]
+            chunk_tokens = []
+            if token.pos_ in ("NOUN", "PROPN", "PRON"):
+                for np in doc.noun_chunks:
+                    if token in np:
+                        chunk_tokens = [t.text for t in np]
+                        i += len(chunk_tokens)
+                        break
+                if not chunk_tokens:
+                    chunk_tokens = [token.text]
+                    i += 1
+            elif token.pos_ == "VERB":
+                for child in token.lefts:
+                    if child.dep_ in ("aux", "auxpass", "neg"):
+                        chunk_tokens.append(child.text)
+                chunk_tokens.append(token.text)
+                for child in token.rights:
+                    if child.dep_ in ("dobj", "prt", "advmod") and len(chunk_tokens) < 4:
+                        chunk_tokens.append(child.text)
+                i += 1
+            elif token.pos_ == "ADP":
+                chunk_tokens = [token.text]
+                for child in token.children:
+                    if child.dep_ == "pobj":
+                        for np in doc.noun_chunks:
+                            if child in np:
+                                chunk_tokens.extend([t.text for t in np])
+                                break
+                        else:
+                            chunk_tokens.append(child.text)
+                        break
+                i += 1
+            else:
+                chunk_tokens = [token.text]
+                i += 1
+            if chunk_tokens:
+                chunk = " ".join(chunk_tokens).strip()
+                if chunk and not all(c in ".,!?;:" for c in chunk):
+                    sent_chunks.append(chunk)
+        chunks.extend(sent_chunks)
+
+    cleaned_chunks = []
+    for chunk in chunks:
+        chunk = chunk.strip()
+        if chunk and len(chunk) > 0:
+            cleaned_chunks.append(chunk)
+    return cleaned_chunks
+
+
+VARIANTS: Dict[str, Callable[[Any, str], Any]] = {
+    'joined': lambda doc, text: joined_chunks(doc),
+    'offsets': lambda doc, text: chunk_offsets(doc),
+    'strings': lambda doc, text: offsets_to_chunks(text, chunk_offsets(doc)),
+}
+
+
+def result_bytes(result) -> int:
+    """Memory held by a chunker result (the list and its strings, or the array)"""
+    if isinstance(result, list):
+        return sys.getsizeof(result) + sum(sys.getsizeof(chunk) for chunk in result)
+    return sys.getsizeof(result)
+
+
+def measure(chunk: Callable[[Any, str], Any], doc, text: str, repeat: int) -> Dict[str, float]:
+    """Time, peak allocation and result size for one variant, per 1,000 tokens"""
+    per_1k = 1000 / len(doc)
+
+    chunk(doc, text)  # first call outside the measurement
+    started = time.perf_counter()
+    for _ in range(repeat):
+        chunk(doc, text)
+    elapsed = (time.perf_counter() - started) / repeat
+
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    result = chunk(doc, text)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sys.getallocatedblocks() - blocks
+
+    return {
+        'ms': elapsed * 1000 * per_1k,
+        'peak_kib': peak / 1024 * per_1k,
+        'blocks': blocks * per_1k,
+        'result_kib': result_bytes(result) / 1024 * per_1k,
+        'chunks': (len(result) if isinstance(result, list) else len(result) // 2) * per_1k,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark chunking variants per 1,000 tokens")
+    parser.add_argument('--file', default=str(Path(__file__).parent / 'reading1.txt'), help="Text to chunk")
+    parser.add_argument('--tokens', type=int, default=20000, help="Repeat the text up to about this many tokens")
+    parser.add_argument('--repeat', type=int, default=10, help="Timed runs per variant")
+    args = parser.parse_args()
+
+    text = Path(args.file).read_text(encoding='utf-8')
+    nlp = get_nlp()
+    copies = max(args.tokens // max(len(nlp.tokenizer(text)), 1), 1)
+    text = "\n\n".join([text] * copies)
+    doc = nlp(text)
+
+    print(f"\n⏱️  {len(doc)} tokens, per 1,000 tokens\n")
+    print(f"{'variant':<10} {'ms':>8} {'peak KiB':>10} {'blocks':>8} {'result KiB':>11} {'chunks':>8}")
+    results = {name: measure(chunk, doc, text, max(args.repeat, 1)) for name, chunk in VARIANTS.items()}
+    for name, result in results.items():
+        print(f"{name:<10} {result['ms']:>8.3f} {result['peak_kib']:>10.1f} {result['blocks']:>8.0f} "
+              f"{result['result_kib']:>11.1f} {result['chunks']:>8.0f}")
+
+    before, after = results['joined'], results['offsets']
+    print(f"\n✅ offsets vs joined: {before['ms'] / after['ms']:.1f}x faster, "
+          f"{before['peak_kib'] / after['peak_kib']:.1f}x less peak memory")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
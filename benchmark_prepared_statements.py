@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Prepared statement benchmark for NoSubvo
+Compares the hot queries run as plain SQL and as prepared statements
+
+For every statement registered by backend.py (next exercise, progress
+upsert, user lookups) this reports the mean round trip and the planning
+time PostgreSQL reports in EXPLAIN ANALYZE, once for plain SQL and once
+for EXECUTE of the prepared statement. Everything runs in one transaction
+that is rolled back, so the progress upsert leaves no trace.
+
+With --clients, that many threads run the read statements through
+execute_prepared and the connection pool instead, as the app's request
+threads do (pausing up to --pause-ms between request cycles, so the pool
+sees bursts rather than a steady queue), and the throughput and the
+connections the pool had to open are reported. Connections that are reopened prepare their statements
+again, so the opened count should stay at most DB_POOL_MAX_SIZE.
+
+Usage:
+    python benchmark_prepared_statements.py
+    python benchmark_prepared_statements.py --iterations 2000
+    python benchmark_prepared_statements.py --clients 8 --iterations 2000
+"""
+
+import re
+import sys
+import time
+import random
+import argparse
+import threading
+from typing import Any, Dict, Tuple
+
+from database import db_router, execute_prepared, get_db_connection, registered_statements
+import backend  # noqa: F401 - registers the hot statements
+
+
+def plain_sql(query: str) -> str:
+    """The statement with psycopg2 placeholders (registered SQL uses $1, $2, ... in order)"""
+    return re.sub(r'\$\d+', '%s', query)
+
+
+def sample_params(cursor) -> Dict[str, Tuple]:
+    """Parameters for each hot statement, taken from a user with a queued exercise"""
+    cursor.execute("""
+        SELECT u.id, u.username, u.email, uq.exercise_id
+        FROM users u
+        JOIN user_queue uq ON uq.user_id = u.id AND uq.queue_position = 1
+        LIMIT 1
+    """)
+    row = cursor.fetchone()
+    if not row:
+        return {}
+
+    return {
+        'user_id_by_email': (row['email'],),
+        'user_by_login': (row['username'], row['email']),
+        'next_exercise_for_user': (row['id'],),
+        'upsert_user_progress': (row['id'], row['exercise_id'], 'failed', 0.5, 3, 1, 250.0, 60),
+    }
+
+
+def run(cursor, sql: str, params: Tuple, iterations: int) -> float:
+    """Mean milliseconds per execution"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        cursor.execute(sql, params)
+        if cursor.description:
+            cursor.fetchall()
+    return (time.perf_counter() - started) * 1000 / iterations
+
+
+def planning_ms(cursor, sql: str, params: Tuple) -> float:
+    cursor.execute(f"EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) {sql}", params)
+    return cursor.fetchone()['QUERY PLAN'][0]['Planning Time']
+
+
+def benchmark(iterations: int) -> Dict[str, Dict[str, Any]]:
+    """
+    Time every hot statement as plain SQL and as a prepared statement
+
+    Returns:
+        Per statement: mean round trip and planning time in ms for both forms
+    """
+    statements = registered_statements()
+    results = {}
+
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            params_by_name = sample_params(cursor)
+            for name, params in params_by_name.items():
+                query = statements[name]
+                cursor.execute(f"PREPARE bench_{name} AS {query}")
+                execute_sql = f"EXECUTE bench_{name} ({', '.join(['%s'] * len(params))})"
+
+                results[name] = {
+                    'plain_ms': run(cursor, plain_sql(query), params, iterations),
+                    'prepared_ms': run(cursor, execute_sql, params, iterations),
+                    'plain_planning_ms': planning_ms(cursor, plain_sql(query), params),
+                    'prepared_planning_ms': planning_ms(cursor, execute_sql, params),
+                }
+                cursor.execute(f"DEALLOCATE bench_{name}")
+        finally:
+            conn.rollback()
+            cursor.close()
+
+    return results
+
+
+def benchmark_concurrent(clients: int, iterations: int, pause_ms: float = 2.0) -> Dict[str, Any]:
+    """
+    Run the read statements from concurrent threads through the pool
+
+    Args:
+        clients: Threads, each running every read statement iterations times
+        iterations: Executions per statement and thread
+        pause_ms: Longest random pause between a thread's request cycles
+
+    Returns:
+        Executions, seconds, executions per second and the pools' connection counts
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            params_by_name = sample_params(cursor)
+        finally:
+            conn.rollback()
+            cursor.close()
+    reads = [(name, params) for name, params in params_by_name.items() if name != 'upsert_user_progress']
+    if not reads:
+        return {}
+
+    opened_before = {name: status['opened'] for name, status in db_router.pool_status().items()}
+    errors = []
+
+    def client():
+        try:
+            for _ in range(iterations):
+                for name, params in reads:
+                    execute_prepared(name, params, fetch=True)
+                time.sleep(random.random() * pause_ms / 1000)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+    if errors:
+        raise errors[0]
+
+    executions = clients * iterations * len(reads)
+    return {
+        'executions': executions,
+        'seconds': seconds,
+        'per_second': executions / seconds,
+        'pools': {name: dict(status, opened=status['opened'] - opened_before.get(name, 0))
+                  for name, status in db_router.pool_status().items()},
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the hot queries with and without prepared statements")
+    parser.add_argument('--iterations', type=int, default=500, help="Executions per statement and form")
+    parser.add_argument('--clients', type=int, default=0,
+                        help="Run the read statements from this many threads through the pool")
+    parser.add_argument('--pause-ms', type=float, default=2.0,
+                        help="With --clients: longest pause between a client's request cycles")
+    args = parser.parse_args()
+
+    if args.clients > 0:
+        result = benchmark_concurrent(args.clients, max(args.iterations, 1), max(args.pause_ms, 0.0))
+        if not result:
+            print("❌ Needs a user with a queued exercise (register one through the API first)")
+            return 1
+        print(f"\n⏱️  {args.clients} clients, {result['executions']} prepared executions "
+              f"in {result['seconds']:.2f}s: {result['per_second']:.0f}/s")
+        for name, status in result['pools'].items():
+            print(f"   {name}: {status['opened']} connections opened, {status['idle']} idle")
+        return 0
+
+    results = benchmark(max(args.iterations, 1))
+    if not results:
+        print("❌ Needs a user with a queued exercise (register one through the API first)")
+        return 1
+
+    print(f"\n⏱️  {args.iterations} executions per form (ms)\n")
+    print(f"{'statement':<24} {'plain':>8} {'prepared':>9} {'plan plain':>11} {'plan prep.':>11}")
+    for name, timing in results.items():
+        print(f"{name:<24} {timing['plain_ms']:>8.3f} {timing['prepared_ms']:>9.3f} "
+              f"{timing['plain_planning_ms']:>11.3f} {timing['prepared_planning_ms']:>11.3f}")
+
+    saved = sum(t['plain_planning_ms'] - t['prepared_planning_ms'] for t in results.values())
+    print(f"\n✅ Planning time saved per request cycle (all statements once): {saved:.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
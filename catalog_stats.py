@@ -0,0 +1,103 @@
+"""
+In-memory catalog statistics for NoSubvo
+Serves /exercises/stats from a snapshot of the trigger-maintained exercise_stats table
+"""
+
+import os
+import json
+import hashlib
+import threading
+import time
+import logging
+from typing import Dict, Any, NamedTuple, Optional
+
+from database import execute_query
+from serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+# How long a snapshot is served before it is reloaded from exercise_stats
+CATALOG_STATS_TTL_SECONDS = int(os.getenv('CATALOG_STATS_TTL_SECONDS', 60))
+
+# exercise_stats dimension -> key in the /exercises/stats payload
+STATS_DIMENSIONS = {
+    'language': 'by_language',
+    'difficulty': 'by_difficulty',
+    'topic': 'by_topic',
+}
+
+
+class CatalogStatsSnapshot(NamedTuple):
+    """Immutable statistics snapshot with its serialized response body and strong ETag"""
+    stats: Dict[str, Any]
+    body: bytes
+    etag: str
+    loaded_at: float
+
+
+class CatalogStatsCache:
+    """
+    Process-wide cache of catalog statistics
+
+    The database keeps exercise_stats current on every write, so loading a
+    snapshot reads one row per distinct language/difficulty/topic value and
+    never scans exercises. Snapshots are replaced whole, so readers never
+    need the lock.
+    """
+
+    def __init__(self, ttl_seconds: int = CATALOG_STATS_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._snapshot: Optional[CatalogStatsSnapshot] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> CatalogStatsSnapshot:
+        rows = execute_query(
+            "SELECT dimension, value, count FROM exercise_stats WHERE count > 0",
+            fetch=True
+        )
+
+        stats = {'total': 0}
+        for key in STATS_DIMENSIONS.values():
+            stats[key] = {}
+
+        for row in rows or []:
+            if row['dimension'] == 'total':
+                stats['total'] = row['count']
+            elif row['dimension'] in STATS_DIMENSIONS:
+                stats[STATS_DIMENSIONS[row['dimension']]][row['value']] = row['count']
+
+        canonical = json.dumps(stats, sort_keys=True, separators=(',', ':'))
+        etag = hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+        body = dumps({"success": True, "stats": stats})
+        return CatalogStatsSnapshot(stats, body, etag, time.monotonic())
+
+    def _is_fresh(self, snapshot: Optional[CatalogStatsSnapshot]) -> bool:
+        return snapshot is not None and time.monotonic() - snapshot.loaded_at < self.ttl_seconds
+
+    def get(self) -> CatalogStatsSnapshot:
+        """
+        Get the current snapshot, reloading it once the TTL has passed
+
+        Returns:
+            CatalogStatsSnapshot
+        """
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+
+        with self._lock:
+            # Another thread may have reloaded while we waited for the lock
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                return snapshot
+
+            self._snapshot = self._load()
+            return self._snapshot
+
+    def invalidate(self) -> None:
+        """Drop the snapshot so the next request reloads it (e.g. after an insert)"""
+        self._snapshot = None
+
+
+# Global catalog statistics cache
+catalog_stats = CatalogStatsCache()
@@ -0,0 +1,73 @@
+"""
+Chunk cache for NoSubvo
+Keeps packed chunk offsets of recently chunked texts so repeated texts skip spaCy
+
+Entries are the 8-bytes-per-chunk packed offsets from chunker.pack_offsets,
+keyed by a digest of the text, so an entry costs a small fraction of the
+list of chunk strings it stands for (and of the text itself). The cache is
+per process and bounded by total size.
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+# Upper bound on the packed offsets held (keys and bookkeeping not included)
+CHUNK_CACHE_MAX_BYTES = int(os.getenv('CHUNK_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+
+
+def text_key(text: str, variant: str = '') -> bytes:
+    """Cache key for a text chunked a given way (profile and language)"""
+    digest = hashlib.blake2b(variant.encode('utf-8') + b'\0', digest_size=16)
+    digest.update(text.encode('utf-8'))
+    return digest.digest()
+
+
+class ChunkCache:
+    """LRU of packed chunk offsets keyed by text digest"""
+
+    def __init__(self, max_bytes: int = CHUNK_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[bytes, bytes]' = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        with self._lock:
+            packed = self._entries.get(key)
+            if packed is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._entries.move_to_end(key)
+            return packed
+
+    def put(self, key: bytes, packed: bytes) -> None:
+        if len(packed) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = packed
+            self._size += len(packed)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self) -> dict:
+        """Entry count, bytes held and hit ratio"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hit_ratio": round(self._hits / lookups, 3) if lookups else None,
+            }
+
+
+chunk_cache = ChunkCache()
@@ -0,0 +1,665 @@
+"""
+Phrase chunking for NoSubvo
+Splits text into short meaningful units (noun, verb and prepositional phrases) with spaCy
+
+Chunking runs as a pipeline of timed stages over a parsed document:
+
+    index     per-token tables: noun phrase bounds, word weights, attaching words
+    segment   walk the tokens; at each one the profile's strategies are asked
+              in order and the first match forms the chunk (one token if none does)
+    merge     join neighbouring chunks of a sentence up to the target size
+    split     cut chunks longer than the maximum size
+    offsets   character offsets of the chunks
+
+Strategies are plugins (ChunkStrategy subclasses) combined, in order, into
+named profiles (register_profile) that also set the target and maximum
+chunk size in words. Language rules (LANGUAGE_RULES) tell merge and split
+which words lean on the next one and how to count words in scripts written
+without spaces.
+
+Chunks are represented as character offsets into the original text rather
+than as strings: a flat array of (start, end) pairs, packed into 8 bytes
+per chunk for caching and transfer (pack_offsets). Offsets count Unicode
+code points, like Python string indexes. word_offsets gives the words of
+a text the same way, for one-word-at-a-time (RSVP) display.
+
+Used in the web process directly, or inside the NLP worker processes of
+nlp_pool.py when NLP_WORKERS is set.
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+import numpy
+import spacy
+from spacy.attrs import IDX, IS_LEFT_PUNCT, IS_PUNCT, IS_SPACE, LENGTH, LOWER, POS
+from spacy.strings import hash_string
+from spacy.tokens import Doc
+from spacy.util import get_words_and_spaces
+from spacy.symbols import (NOUN, PROPN, PRON, VERB, ADP, DET, CCONJ, SCONJ,
+                           aux, auxpass, neg, dobj, prt, advmod, pobj, amod, det)
+
+logger = logging.getLogger(__name__)
+
+# spaCy pipeline for English: an installed package name or a path to a saved pipeline
+SPACY_MODEL = os.getenv('SPACY_MODEL', 'en_core_web_sm')
+
+# Pipelines for other languages ("es=es_core_news_sm,de=/models/de"); languages
+# without one are only tokenized and split into sentences
+SPACY_MODELS = dict(
+    entry.strip().split('=', 1) for entry in os.getenv('SPACY_MODELS', '').split(',') if '=' in entry
+)
+
+# Profile used when a request or user does not pick one
+DEFAULT_CHUNKING_PROFILE = os.getenv('CHUNKING_PROFILE', 'phrases')
+
+# Chunks are (start, end) character offsets into the text, held as unsigned
+# 32-bit integers; packed, a chunk takes 8 bytes
+OFFSET_TYPECODE = 'I' if array('I').itemsize == 4 else 'L'
+
+# Part-of-speech and dependency labels the strategies look for (ids: no
+# string lookups per token; labels without a spaCy symbol by string hash)
+NOUN_POS = (NOUN, PROPN, PRON)
+# Opening brackets and quotes spaCy does not mark as IS_LEFT_PUNCT
+OPENING_PUNCT = numpy.array([hash_string(c) for c in '「『（【〈《〔'], dtype=numpy.uint64)
+AUXILIARY_DEPS = (aux, auxpass, neg)
+COMPLEMENT_DEPS = (dobj, prt, advmod)
+MODIFIER_DEPS = (amod, advmod, det, hash_string('compound'), aux, auxpass)
+
+
+class LanguageRules(NamedTuple):
+    """How the merge and split stages treat a language"""
+    # Parts of speech and words that lean on the next word (articles,
+    # prepositions, conjunctions): a chunk never ends on them. Words also
+    # work with pipelines that have no tagger.
+    attach_pos: Tuple[int, ...] = ()
+    attach_words: Tuple[str, ...] = ()
+    # Scripts written without spaces: characters counted as one word (0: one word per token)
+    chars_per_word: float = 0
+
+
+LANGUAGE_RULES: Dict[str, LanguageRules] = {
+    'en': LanguageRules(attach_pos=(DET, ADP, CCONJ, SCONJ),
+                        attach_words=('the', 'a', 'an', 'of', 'to', 'in', 'on', 'at', 'and', 'or')),
+    'es': LanguageRules(attach_words=('el', 'la', 'los', 'las', 'un', 'una', 'de', 'del', 'en', 'a', 'al', 'y', 'o', 'que')),
+    'fr': LanguageRules(attach_words=('le', 'la', 'les', 'l', 'un', 'une', 'des', 'de', 'du', 'd', 'en', 'à', 'au', 'aux', 'et', 'ou')),
+    'de': LanguageRules(attach_words=('der', 'die', 'das', 'den', 'dem', 'des', 'ein', 'eine', 'einen', 'einem',
+                                      'und', 'oder', 'in', 'im', 'zu', 'zum', 'von', 'mit', 'auf')),
+    'pt': LanguageRules(attach_words=('o', 'a', 'os', 'as', 'um', 'uma', 'de', 'do', 'da', 'em', 'no', 'na', 'e', 'ou')),
+    'vi': LanguageRules(),
+    'zh': LanguageRules(chars_per_word=1.5),
+    'ja': LanguageRules(chars_per_word=2.5),
+}
+
+
+def base_language(language: str) -> str:
+    """'zh-tw' -> 'zh'"""
+    return language.split('-', 1)[0].lower()
+
+
+def supported_languages() -> List[str]:
+    """Languages chunk requests may ask for"""
+    return sorted(set(LANGUAGE_RULES) | set(SPACY_MODELS))
+
+
+# Loaded on first use (see get_nlp and get_tokenizer)
+_pipelines: Dict[str, 'spacy.language.Language'] = {}
+_tokenizers: Dict[str, 'spacy.tokenizer.Tokenizer'] = {}
+_nlp_lock = threading.Lock()
+
+
+class CharacterTokenizer:
+    """
+    One token per character, for scripts written without spaces whose word
+    segmenter (SudachiPy for Japanese, ...) is not installed; merge and
+    split then size chunks by LanguageRules.chars_per_word
+    """
+
+    def __init__(self, vocab):
+        self.vocab = vocab
+
+    def __call__(self, text: str) -> Doc:
+        words, spaces = get_words_and_spaces([c for c in text if not c.isspace()], text)
+        return Doc(self.vocab, words=words, spaces=spaces)
+
+
+def _blank_language(language: str):
+    """
+    Blank spaCy pipeline for a language. When its tokenizer needs packages
+    that are not installed the generic one is used, which splits on spaces
+    and punctuation; scripts written without spaces get one token per
+    character instead.
+    """
+    try:
+        return spacy.blank(language)
+    except ImportError as e:
+        logger.warning(f"No {language} tokenizer, using a generic one: {e}")
+    nlp = spacy.blank('xx')
+    if LANGUAGE_RULES.get(language, LanguageRules()).chars_per_word:
+        nlp.tokenizer = CharacterTokenizer(nlp.vocab)
+    return nlp
+
+
+def _blank_pipeline(language: str):
+    """Tokenizer and sentence splitter only (see _blank_language)"""
+    nlp = _blank_language(language)
+    nlp.add_pipe('sentencizer')
+    return nlp
+
+
+def get_nlp(language: str = 'en'):
+    """Get the spaCy pipeline for a language, loading it on first use"""
+    language = base_language(language)
+    nlp = _pipelines.get(language)
+    if nlp is None:
+        with _nlp_lock:
+            nlp = _pipelines.get(language)
+            if nlp is None:
+                if language == 'en':
+                    nlp = spacy.load(SPACY_MODEL)
+                elif language in SPACY_MODELS:
+                    nlp = spacy.load(SPACY_MODELS[language])
+                else:
+                    nlp = _blank_pipeline(language)
+                _pipelines[language] = nlp
+    return nlp
+
+
+def get_tokenizer(language: str = 'en'):
+    """
+    Get a tokenizer for a language: the loaded pipeline's, else the
+    language's default rules (no model is loaded, e.g. in web processes
+    that leave parsing to the NLP workers; see _blank_language)
+    """
+    language = base_language(language)
+    nlp = _pipelines.get(language)
+    if nlp is not None:
+        return nlp.tokenizer
+    tokenizer = _tokenizers.get(language)
+    if tokenizer is None:
+        with _nlp_lock:
+            tokenizer = _tokenizers.get(language)
+            if tokenizer is None:
+                tokenizer = _blank_language(language).tokenizer
+                _tokenizers[language] = tokenizer
+    return tokenizer
+
+
+def _character_word_joins(starts: numpy.ndarray, ends: numpy.ndarray, punct: numpy.ndarray,
+                          chars_per_word: float) -> numpy.ndarray:
+    """
+    For scripts written without spaces: whether each token continues the
+    word of the token before it. Runs of adjacent one-character tokens
+    (character segmentation, see CharacterTokenizer) are grouped into words
+    of about chars_per_word characters (2.5: 3, 2, 3, 2, ...); longer
+    tokens are words of their own.
+    """
+    single = ~punct & (ends - starts == 1)
+    joins = numpy.zeros(len(starts), dtype=bool)
+    joins[1:] = single[1:] & single[:-1] & (starts[1:] == ends[:-1])
+    # Position of each token in its run of one-character tokens; a new word every chars_per_word
+    index = numpy.arange(len(starts))
+    position = index - numpy.maximum.accumulate(numpy.where(joins, 0, index))
+    joins &= numpy.floor(position / chars_per_word) == numpy.floor((position - 1) / chars_per_word)
+    return joins
+
+
+class ChunkContext:
+    """
+    A parsed document and the per-token tables every stage uses
+
+    phrase_of[i] is the noun phrase containing token i (-1 for none), whose
+    token bounds are phrase_bounds[2p], phrase_bounds[2p + 1]. Word counts of
+    token ranges come from prefix sums, so words(start, end) is O(1);
+    punctuation and whitespace weigh nothing. word_end[i] is the token after
+    the word token i belongs to: in scripts written without spaces a word
+    may span several character tokens, which share its weight of one.
+    """
+
+    def __init__(self, doc, language: str = 'en'):
+        self.doc = doc
+        self.language = base_language(language)
+        self.rules = LANGUAGE_RULES.get(self.language, LanguageRules())
+        # An empty doc reports every annotation as present
+        self.parsed = len(doc) > 0 and doc.has_annotation("DEP")
+
+        self.phrase_of = array('i', [-1]) * len(doc)
+        self.phrase_bounds = array('I')
+        if self.parsed:
+            for np in doc.noun_chunks:
+                phrase = len(self.phrase_bounds) // 2
+                for k in range(np.start, np.end):
+                    if self.phrase_of[k] < 0:
+                        self.phrase_of[k] = phrase
+                self.phrase_bounds.append(np.start)
+                self.phrase_bounds.append(np.end)
+
+        attrs = doc.to_array([IS_PUNCT, IS_SPACE, LENGTH, POS, LOWER, IDX]).reshape(-1, 6)
+        is_word = 1 - (attrs[:, 0] | attrs[:, 1]).astype(numpy.int64)
+        if self.rules.chars_per_word:
+            starts = attrs[:, 5].astype(numpy.int64)
+            joins = _character_word_joins(starts, starts + attrs[:, 2].astype(numpy.int64), is_word == 0,
+                                          self.rules.chars_per_word)
+            word = numpy.cumsum(~joins) - 1
+            tokens_per_word = numpy.bincount(word)
+            weights = is_word / tokens_per_word[word]
+            word_end = numpy.cumsum(tokens_per_word)[word]
+        else:
+            weights = is_word
+            word_end = numpy.arange(1, len(doc) + 1)
+        self.word_end = array('I', word_end.tolist())
+        self._weights = array('d', numpy.concatenate(([0.0], numpy.cumsum(weights, dtype=numpy.float64))).tobytes())
+
+        attaching = numpy.isin(attrs[:, 3], numpy.array(self.rules.attach_pos, dtype=numpy.uint64))
+        if self.rules.attach_words:
+            words = numpy.array([hash_string(word) for word in self.rules.attach_words], dtype=numpy.uint64)
+            attaching |= numpy.isin(attrs[:, 4], words)
+        self.attaches = bytearray((attaching & (is_word > 0)).astype(numpy.uint8).tobytes())
+
+    def words(self, start: int, end: int) -> float:
+        """Words in tokens [start, end)"""
+        return self._weights[end] - self._weights[start]
+
+
+class ChunkStrategy:
+    """
+    A plugin that forms a chunk starting at a token
+
+    The strategies of a profile are asked in order at every token not yet
+    covered by a chunk; the first that matches forms the chunk.
+    """
+    name = ''
+    # Needs the dependency parse (skipped for pipelines without a parser)
+    requires_parse = True
+    # Languages the strategy applies to (None: all)
+    languages: Optional[Tuple[str, ...]] = None
+
+    def applies_to(self, ctx: ChunkContext) -> bool:
+        return (ctx.parsed or not self.requires_parse) and (self.languages is None or ctx.language in self.languages)
+
+    def match(self, ctx: ChunkContext, token) -> int:
+        """End token index (exclusive) of the chunk starting at token, or 0 when the strategy does not apply"""
+        raise NotImplementedError
+
+
+class NounPhrase(ChunkStrategy):
+    """The rest of the noun phrase (spaCy noun_chunks) containing the token"""
+    name = 'noun_phrase'
+
+    def match(self, ctx: ChunkContext, token) -> int:
+        phrase = ctx.phrase_of[token.i]
+        return ctx.phrase_bounds[2 * phrase + 1] if phrase >= 0 else 0
+
+
+class VerbPhrase(ChunkStrategy):
+    """A verb with the auxiliaries before it and the objects, particles or adverbs right after it"""
+    name = 'verb_phrase'
+
+    def __init__(self, max_words: int = 4):
+        self.max_words = max_words
+
+    def match(self, ctx: ChunkContext, token) -> int:
+        doc = ctx.doc
+        i = token.i
+        if token.pos == VERB:
+            verb = token
+        elif token.dep in AUXILIARY_DEPS and token.head.pos == VERB and token.head.i > i:
+            verb = token.head
+            # Only auxiliaries between this token and the verb ("has not been eaten")
+            for k in range(i + 1, verb.i):
+                if doc[k].dep not in AUXILIARY_DEPS:
+                    return 0
+        else:
+            return 0
+
+        end = verb.i + 1
+        for child in verb.rights:
+            if child.left_edge.i != end or child.dep not in COMPLEMENT_DEPS:
+                break
+            child_end = child.right_edge.i + 1
+            if ctx.words(i, child_end) > self.max_words:
+                break
+            end = child_end
+        return end
+
+
+class PrepositionalPhrase(ChunkStrategy):
+    """A preposition with the noun phrase (or word) that is its object"""
+    name = 'prepositional_phrase'
+
+    def match(self, ctx: ChunkContext, token) -> int:
+        if token.pos != ADP:
+            return 0
+        end = token.i + 1
+        for child in token.children:
+            if child.dep == pobj:
+                phrase = ctx.phrase_of[child.i]
+                if phrase >= 0 and ctx.phrase_bounds[2 * phrase] == end:
+                    return ctx.phrase_bounds[2 * phrase + 1]
+                if child.i == end:
+                    return end + 1
+                break
+        return 0
+
+
+class Modifiers(ChunkStrategy):
+    """A modifier (article, adjective, adverb, auxiliary) up to the word it modifies ("quickly ran")"""
+    name = 'modifiers'
+
+    def __init__(self, deps: Tuple[int, ...] = MODIFIER_DEPS):
+        self.deps = deps
+
+    def match(self, ctx: ChunkContext, token) -> int:
+        head = token.head
+        if token.dep in self.deps and head.i > token.i and head.left_edge.i <= token.i:
+            return head.i + 1
+        return 0
+
+
+class ChunkingProfile(NamedTuple):
+    """Ordered strategies and the chunk size limits applied after them"""
+    strategies: Tuple[ChunkStrategy, ...]
+    # Merge neighbouring chunks of a sentence up to this many words (0: no merging)
+    target_words: float = 0
+    # Split chunks longer than this many words (0: no limit)
+    max_words: float = 0
+    # Whether a reader's pace may set the sizes (see sized())
+    adaptive: bool = True
+
+    def sized(self, target_words: float, max_words: float) -> 'ChunkingProfile':
+        """The profile with chunk sizes for a reader (unchanged if not adaptive)"""
+        if not self.adaptive:
+            return self
+        return self._replace(target_words=target_words, max_words=max_words)
+
+
+_profiles: Dict[str, ChunkingProfile] = {}
+
+
+def register_profile(name: str, profile: ChunkingProfile) -> None:
+    """Make a profile selectable by name (per request or per user)"""
+    _profiles[name] = profile
+
+
+def get_profile(name: Union[str, ChunkingProfile, None] = None) -> ChunkingProfile:
+    """
+    Args:
+        name: Registered profile name (default CHUNKING_PROFILE), or a profile itself
+
+    Raises:
+        ValueError: Unknown profile
+    """
+    if isinstance(name, ChunkingProfile):
+        return name
+    profile = _profiles.get(name or DEFAULT_CHUNKING_PROFILE)
+    if profile is None:
+        raise ValueError(f"Unknown chunking profile: {name}")
+    return profile
+
+
+def chunking_profiles() -> Dict[str, ChunkingProfile]:
+    """Registered profiles by name"""
+    return dict(_profiles)
+
+
+# Noun, verb and prepositional phrases as they come
+register_profile('phrases', ChunkingProfile((NounPhrase(), VerbPhrase(), PrepositionalPhrase())))
+# The same, with short neighbours merged and long phrases split: 2-5 words per chunk
+register_profile('compact', ChunkingProfile((NounPhrase(), VerbPhrase(), PrepositionalPhrase()), target_words=3, max_words=5))
+# Noun phrases, then words grouped with their modifiers
+register_profile('modifiers', ChunkingProfile((NounPhrase(), Modifiers())))
+# One word per chunk
+register_profile('words', ChunkingProfile((), max_words=1, adaptive=False))
+
+
+def _stage(timings: Optional[Dict[str, float]], name: str, started: float) -> float:
+    """Record a stage's duration in ms; returns the start of the next stage"""
+    now = time.perf_counter()
+    if timings is not None:
+        timings[name] = round((now - started) * 1000, 3)
+    return now
+
+
+def segment(ctx: ChunkContext, profile: ChunkingProfile) -> Tuple[array, array]:
+    """
+    Segment stage: chunks as token ranges, with the sentence of each
+
+    Returns:
+        Flat [start0, end0, ...] token ranges and per chunk its sentence
+        number. Chunks without words (punctuation, whitespace) are left out.
+    """
+    doc = ctx.doc
+    strategies = [strategy for strategy in profile.strategies if strategy.applies_to(ctx)]
+    ranges = array('I')
+    sentences = array('I')
+
+    for sentence, sent in enumerate(doc.sents):
+        i, sent_end = sent.start, sent.end
+        while i < sent_end:
+            end = 0
+            if strategies:
+                token = doc[i]
+                for strategy in strategies:
+                    end = strategy.match(ctx, token)
+                    if end:
+                        break
+            # Chunks stay within their sentence; without a match the chunk is the token's word
+            end = min(end if end > i else ctx.word_end[i], sent_end)
+            if ctx.words(i, end):
+                ranges.append(i)
+                ranges.append(end)
+                sentences.append(sentence)
+            i = end
+
+    return ranges, sentences
+
+
+def merge(ctx: ChunkContext, ranges: array, sentences: array, target_words: float, max_words: float) -> Tuple[array, array]:
+    """
+    Merge stage: join a chunk to the one before it (same sentence) while
+    together they stay within target_words, or when the one before ends on
+    a word that leans on the next and they stay within max_words
+    """
+    merged = array('I')
+    merged_sentences = array('I')
+
+    for k in range(len(sentences)):
+        start, end = ranges[2 * k], ranges[2 * k + 1]
+        if merged_sentences and merged_sentences[-1] == sentences[k]:
+            words = ctx.words(merged[-2], end)
+            if words <= target_words or (ctx.attaches[merged[-1] - 1] and (not max_words or words <= max_words)):
+                merged[-1] = end
+                continue
+        merged.append(start)
+        merged.append(end)
+        merged_sentences.append(sentences[k])
+
+    return merged, merged_sentences
+
+
+def split(ctx: ChunkContext, ranges: array, max_words: float) -> array:
+    """
+    Split stage: cut chunks of more than max_words into pieces of at most
+    max_words, moving a cut back when a piece would end on a word that
+    leans on the next or inside a word
+    """
+    pieces = array('I')
+
+    for k in range(0, len(ranges), 2):
+        start, end = ranges[k], ranges[k + 1]
+        if ctx.words(start, end) <= max_words:
+            pieces.append(start)
+            pieces.append(end)
+            continue
+
+        while start < end:
+            cut = start + 1
+            while cut < end and ctx.words(start, cut + 1) <= max_words:
+                cut += 1
+            while cut < end and cut - 1 > start and (ctx.attaches[cut - 1] or ctx.word_end[cut - 1] > cut):
+                cut -= 1
+            if ctx.words(start, cut):
+                pieces.append(start)
+                pieces.append(cut)
+            start = cut
+
+    return pieces
+
+
+def to_offsets(ctx: ChunkContext, ranges: array) -> array:
+    """Offsets stage: character offsets of the chunks, without leading or trailing punctuation"""
+    doc = ctx.doc
+    offsets = array(OFFSET_TYPECODE)
+
+    for k in range(0, len(ranges), 2):
+        start, end = ranges[k], ranges[k + 1]
+        while ctx.words(start, start + 1) == 0:
+            start += 1
+        while ctx.words(end - 1, end) == 0:
+            end -= 1
+        last = doc[end - 1]
+        offsets.append(doc[start].idx)
+        offsets.append(last.idx + len(last))
+
+    return offsets
+
+
+def chunk_offsets(doc, profile: Union[str, ChunkingProfile, None] = None, language: str = 'en',
+                  timings: Optional[Dict[str, float]] = None) -> array:
+    """
+    Intelligently chunk a parsed document into meaningful phrase-level units
+    optimized for reducing subvocalization.
+
+    Chunks are tracked as token ranges through the stages; no token lists
+    or strings are built.
+
+    Args:
+        doc: Parsed document
+        profile: Chunking profile or its name (default CHUNKING_PROFILE)
+        language: Language of the text (selects LANGUAGE_RULES)
+        timings: Filled with the duration of each stage in ms
+
+    Returns:
+        Flat array of character offsets into the text, start and end of
+        each chunk in turn: [start0, end0, start1, end1, ...]
+
+    Raises:
+        ValueError: Unknown profile
+    """
+    chunking = get_profile(profile)
+    started = time.perf_counter()
+
+    ctx = ChunkContext(doc, language)
+    started = _stage(timings, 'index', started)
+
+    ranges, sentences = segment(ctx, chunking)
+    started = _stage(timings, 'segment', started)
+
+    if chunking.target_words:
+        ranges, sentences = merge(ctx, ranges, sentences, chunking.target_words, chunking.max_words)
+        started = _stage(timings, 'merge', started)
+
+    if chunking.max_words:
+        ranges = split(ctx, ranges, chunking.max_words)
+        started = _stage(timings, 'split', started)
+
+    offsets = to_offsets(ctx, ranges)
+    _stage(timings, 'offsets', started)
+    return offsets
+
+
+def offsets_to_chunks(text: str, offsets: array) -> List[str]:
+    """Chunk strings for offsets from chunk_offsets (slices of the original text)"""
+    return [text[offsets[k]:offsets[k + 1]] for k in range(0, len(offsets), 2)]
+
+
+def pack_offsets(offsets: array) -> bytes:
+    """Offsets as little-endian uint32 bytes (8 bytes per chunk)"""
+    if sys.byteorder == 'big':
+        offsets = array(OFFSET_TYPECODE, offsets)
+        offsets.byteswap()
+    return offsets.tobytes()
+
+
+def unpack_offsets(data: bytes) -> array:
+    """Inverse of pack_offsets"""
+    offsets = array(OFFSET_TYPECODE)
+    offsets.frombytes(data)
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+    return offsets
+
+
+def word_offsets(doc, language: str = 'en') -> array:
+    """
+    Character offsets of the words of a tokenized document, for showing
+    one word at a time
+
+    Tokens written without whitespace between them form one word, so
+    punctuation stays with its word ("easy?", "sea-shore"); in scripts
+    written without spaces every token is a word, with the punctuation
+    after it (or, for opening brackets and quotes, before it). Runs of
+    one-character tokens there (character segmentation, see
+    CharacterTokenizer) are grouped into words of about chars_per_word
+    characters.
+
+    Returns:
+        Flat array of (start, end) pairs, as chunk_offsets
+    """
+    attrs = doc.to_array([IDX, LENGTH, IS_PUNCT, IS_LEFT_PUNCT, LOWER, IS_SPACE]).reshape(-1, 6)
+    attrs = attrs[attrs[:, 5] == 0]
+    starts = attrs[:, 0].astype(numpy.int64)
+    ends = starts + attrs[:, 1].astype(numpy.int64)
+    punct = attrs[:, 2] > 0
+    left_punct = (attrs[:, 3] > 0) | numpy.isin(attrs[:, 4], OPENING_PUNCT)
+    if not len(starts):
+        return array(OFFSET_TYPECODE)
+
+    new_word = numpy.ones(len(starts), dtype=bool)
+    new_word[1:] = starts[1:] > ends[:-1]
+    chars_per_word = LANGUAGE_RULES.get(base_language(language), LanguageRules()).chars_per_word
+    if chars_per_word:
+        joins = _character_word_joins(starts, ends, punct, chars_per_word)
+        new_word[1:] |= left_punct[1:] | (~punct[1:] & ~left_punct[:-1] & ~joins[1:])
+
+    first = numpy.flatnonzero(new_word)
+    last = numpy.append(first[1:] - 1, len(starts) - 1)
+    offsets = numpy.empty(2 * len(first), dtype=numpy.uint32)
+    offsets[0::2] = starts[first]
+    offsets[1::2] = ends[last]
+    return array(OFFSET_TYPECODE, offsets.tobytes())
+
+
+def chunk_doc(doc, profile: Optional[str] = None, language: str = 'en') -> List[str]:
+    """Chunk strings for a parsed document (see chunk_offsets)"""
+    return offsets_to_chunks(doc.text, chunk_offsets(doc, profile, language))
+
+
+def chunk_text_smart(text: str, profile: Optional[str] = None, language: str = 'en') -> List[str]:
+    """Chunk one text (see chunk_offsets)"""
+    return offsets_to_chunks(text, chunk_offsets(get_nlp(language)(text), profile, language))
+
+
+def chunk_texts_packed(texts: Iterable[str], profile: Union[str, ChunkingProfile, None] = None,
+                       language: str = 'en') -> List[Tuple[bytes, Dict[str, float]]]:
+    """
+    Packed chunk offsets and stage timings (ms) for several texts, parsed
+    in one nlp.pipe() pass (cheaper than one call per text); the parse
+    time of the batch is shared out by text length
+    """
+    texts = list(texts)
+    started = time.perf_counter()
+    docs = list(get_nlp(language).pipe(texts))
+    parse_ms = (time.perf_counter() - started) * 1000
+    total_chars = sum(len(text) for text in texts) or 1
+
+    results = []
+    for doc, text in zip(docs, texts):
+        timings = {'parse': round(parse_ms * len(text) / total_chars, 3)}
+        results.append((pack_offsets(chunk_offsets(doc, profile, language, timings)), timings))
+    return results
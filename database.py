@@ -4,16 +4,32 @@ PostgreSQL only - Production-ready configuration
 """
 
 import os
+import re
+import json
+import time
+import itertools
+import threading
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2 import errors as pg_errors, pool as pg_pool
+from psycopg2.extras import RealDictCursor, register_default_jsonb
 from contextlib import contextmanager
+from contextvars import ContextVar, Token
 from dotenv import load_dotenv
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Tuple, Callable
 import logging
 from pathlib import Path
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # pragma: no cover - optional dependency
+    _json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+# Decode JSONB columns (exercises.questions) with the fastest available parser
+register_default_jsonb(globally=True, loads=_json_loads)
+
 # Load environment variables
 # Load .env.local first (takes precedence), then .env
 env_local_path = Path('.env.local')
@@ -42,6 +58,19 @@ class DatabaseConfig:
         
         # Connection string (optional, for compatibility)
         self.database_url = os.getenv('DATABASE_URL')
+
+        # Read replicas: comma-separated connection strings (optional)
+        self.replica_urls = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+
+        # Connection pools (one for the primary and one per replica)
+        self.pool_min_size = int(os.getenv('DB_POOL_MIN_SIZE', 2))
+        self.pool_max_size = int(os.getenv('DB_POOL_MAX_SIZE', 20))
+        self.pool_timeout = float(os.getenv('DB_POOL_TIMEOUT', 30))
+
+        # Seconds a client keeps reading from the primary after its own write
+        self.replica_sticky_seconds = float(os.getenv('REPLICA_STICKY_SECONDS', 5))
+        # Seconds a failed replica is left out before it is tried again
+        self.replica_retry_seconds = float(os.getenv('REPLICA_RETRY_SECONDS', 30))
         
     def get_connection_params(self) -> Dict[str, Any]:
         """Get PostgreSQL connection parameters"""
@@ -60,38 +89,355 @@ class DatabaseConfig:
 # Global database configuration
 db_config = DatabaseConfig()
 
-@contextmanager
-def get_db_connection():
+def is_connection_failure(error: Exception, connection=None) -> bool:
     """
-    Context manager for PostgreSQL database connections
-    Automatically handles connection and cleanup
+    Whether an error means the server (or the network to it) is unavailable
+
+    Only these eject a replica and move a read to the next server.
+    Statement-level errors (statement_timeout cancellations, recovery
+    conflicts on a replica) carry a SQLSTATE and mean the server is up;
+    a PoolError means the pool is busy, not that the server is down.
+
+    Args:
+        error: Raised exception
+        connection: Connection the error was raised on, if any
+    """
+    if isinstance(error, psycopg2.InterfaceError):
+        return True
+    if isinstance(error, psycopg2.OperationalError) and error.pgcode is None:
+        return True
+    return connection is not None and bool(connection.closed)
+
+# Statements that may read from a replica: SELECT/WITH without data changes or row locks
+_READ_STATEMENT = re.compile(r'^\s*(SELECT|WITH)\b', re.IGNORECASE)
+_WRITE_KEYWORD = re.compile(
+    r'\b(INSERT|UPDATE|DELETE|MERGE|CREATE|ALTER|DROP|TRUNCATE|COPY|LOCK|NEXTVAL|SETVAL|FOR\s+SHARE|FOR\s+KEY\s+SHARE)\b',
+    re.IGNORECASE
+)
+
+
+
+class ReadConsistency:
+    """
+    Read-your-writes state of one request
+
+    The request's reads go to the primary until pinned_until
+    (time.monotonic()): after it writes, and while its client's previous
+    write (recorded by the app, see session_store) may not have reached
+    the replicas yet.
+    """
+
+    def __init__(self):
+        self.pinned_until = float('-inf')
+        self.wrote = False
+
+    def pin(self, seconds: float) -> None:
+        """Read from the primary for at least the next `seconds`"""
+        self.pinned_until = max(self.pinned_until, time.monotonic() + seconds)
+
+    def pinned(self) -> bool:
+        return time.monotonic() < self.pinned_until
+
+    def take_write(self) -> bool:
+        """Whether the request wrote since the last call (the app then records the write once)"""
+        wrote, self.wrote = self.wrote, False
+        return wrote
+
+
+# State of the request on whose behalf queries run (set per request by the app)
+_read_consistency: ContextVar[Optional[ReadConsistency]] = ContextVar('read_consistency', default=None)
+
+
+def is_read_query(query: str) -> bool:
+    """Whether a statement only reads and can therefore run on a replica"""
+    return bool(_READ_STATEMENT.match(query)) and not _WRITE_KEYWORD.search(query)
+
+
+def set_read_consistency(state: Optional[ReadConsistency]) -> Token:
+    """
+    Attribute the following queries to a request
+
+    After the request writes, its reads go to the primary so it always
+    sees its own changes.
+
+    Returns:
+        Token for reset_read_consistency
+    """
+    return _read_consistency.set(state)
+
+
+def reset_read_consistency(token: Token) -> None:
+    """Undo set_read_consistency"""
+    _read_consistency.reset(token)
+
+
+def pin_reads_to_primary(seconds: float) -> None:
+    """Send the current request's reads to the primary for the next `seconds` (no request: no effect)"""
+    state = _read_consistency.get()
+    if state is not None:
+        state.pin(seconds)
+
+
+class PreparingConnection(psycopg2.extensions.connection):
+    """Connection that remembers which registered statements it has PREPAREd"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of connections to one PostgreSQL server
+
+    Callers wait up to DB_POOL_TIMEOUT for a free connection instead of
+    failing when all DB_POOL_MAX_SIZE are in use. DB_POOL_MIN_SIZE
+    connections are opened up front; connections are opened on demand up
+    to DB_POOL_MAX_SIZE and stay open once returned, so each keeps the
+    statements it has PREPAREd. Idle connections are reused most recent
+    first. Connections returned mid-transaction are rolled back, broken
+    ones are discarded.
+    """
+
+    def __init__(self, name: str, connection_params: Dict[str, Any], min_size: int, max_size: int, timeout: float):
+        self.name = name
+        self.timeout = timeout
+        self._connection_params = connection_params
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+        self._idle: List[PreparingConnection] = []
+        self._closed = False
+        self.opened = 0
+        for _ in range(min(min_size, max_size)):
+            self._idle.append(self._connect())
+
+    def _connect(self) -> PreparingConnection:
+        connection = psycopg2.connect(connection_factory=PreparingConnection, cursor_factory=RealDictCursor,
+                                      **self._connection_params)
+        with self._lock:
+            self.opened += 1
+        return connection
+
+    def getconn(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise pg_pool.PoolError(f"Timed out waiting for a {self.name} connection")
+        try:
+            connection = None
+            with self._lock:
+                while self._idle and connection is None:
+                    connection = self._idle.pop()
+                    if connection.closed:
+                        connection = None
+            if connection is None:
+                connection = self._connect()
+            connection.autocommit = False
+            return connection
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, connection, close: bool = False) -> None:
+        try:
+            if not (close or connection.closed or self._closed):
+                status = connection.info.transaction_status
+                if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                    close = True
+                elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    try:
+                        connection.rollback()
+                    except psycopg2.Error as e:
+                        logger.warning(f"Discarding {self.name} connection that failed to roll back: {e}")
+                        close = True
+            if not (close or connection.closed):
+                with self._lock:
+                    if not self._closed:
+                        self._idle.append(connection)
+                        return
+            if not connection.closed:
+                connection.close()
+        finally:
+            self._slots.release()
+
+    def closeall(self) -> None:
+        """Close the idle connections; borrowed ones are closed when returned"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            if not connection.closed:
+                connection.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Idle connections and connections opened so far"""
+        return {'idle': len(self._idle), 'opened': self.opened}
+
+
+class ReplicaRouter:
+    """
+    Chooses the server each statement runs on
+
+    Writes always go to the primary. Reads are spread round-robin over the
+    healthy replicas, except for requests pinned to the primary (see
+    ReadConsistency): those that wrote, and those whose client wrote
+    within the last REPLICA_STICKY_SECONDS, so replication lag never hides
+    a client's own changes. A replica that fails is ejected for
+    REPLICA_RETRY_SECONDS and then tried again; the primary is always the
+    last resort for reads. Pools are created on first use.
+    """
+
+    def __init__(self, config: DatabaseConfig):
+        self.config = config
+        self._lock = threading.Lock()
+        self._pools: Dict[str, ConnectionPool] = {}
+        self._ejected_until: Dict[str, float] = {}
+        self._turn = itertools.count()
+
+    def get_pool(self, name: str, connection_params: Dict[str, Any]) -> ConnectionPool:
+        """Pool for a server, created (and connected) on first use"""
+        pool = self._pools.get(name)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(name)
+                if pool is None:
+                    pool = ConnectionPool(name, connection_params, self.config.pool_min_size,
+                                          self.config.pool_max_size, self.config.pool_timeout)
+                    self._pools[name] = pool
+        return pool
+
+    def _replica_name(self, index: int) -> str:
+        return f"replica{index + 1}"
+
+    def read_targets(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Servers to try for a read, in order
+
+        Returns:
+            (name, connection params) pairs: healthy replicas first, primary last
+        """
+        primary = ('primary', self.config.get_connection_params())
+        replicas = self.config.replica_urls
+        if not replicas:
+            return [primary]
+
+        state = _read_consistency.get()
+        if state is not None and state.pinned():
+            return [primary]
+
+        now = time.monotonic()
+
+        start = next(self._turn)
+        targets = []
+        for offset in range(len(replicas)):
+            index = (start + offset) % len(replicas)
+            name = self._replica_name(index)
+            if self._ejected_until.get(name, 0) <= now:
+                targets.append((name, {'dsn': replicas[index]}))
+        return targets + [primary]
+
+    def eject(self, name: str, error: Exception) -> None:
+        """Leave a failed replica out for REPLICA_RETRY_SECONDS"""
+        logger.warning(f"Read replica {name} failed, retrying in {self.config.replica_retry_seconds:g}s: {error}")
+        self._ejected_until[name] = time.monotonic() + self.config.replica_retry_seconds
+
+    def record_write(self) -> None:
+        """Pin the current request's reads to the primary for a while"""
+        state = _read_consistency.get()
+        if state is not None:
+            state.wrote = True
+            state.pin(self.config.replica_sticky_seconds)
+
+    def replica_status(self) -> List[Dict[str, Any]]:
+        """Name and health of each configured replica"""
+        now = time.monotonic()
+        return [
+            {'name': self._replica_name(index), 'healthy': self._ejected_until.get(self._replica_name(index), 0) <= now}
+            for index in range(len(self.config.replica_urls))
+        ]
+
+    def pool_status(self) -> Dict[str, Dict[str, int]]:
+        """Idle and opened connection counts of each pool created so far"""
+        return {name: pool.stats() for name, pool in list(self._pools.items())}
+
+    def close(self) -> None:
+        """Close every pooled connection (e.g. before forking)"""
+        with self._lock:
+            for pool in self._pools.values():
+                pool.closeall()
+            self._pools.clear()
+
+
+# Global connection router
+db_router = ReplicaRouter(db_config)
+
+def close_pools() -> None:
+    """Close all pooled connections; pools are recreated on next use"""
+    db_router.close()
+
+def _acquire_connection(read_only: bool):
     """
-    connection = None
+    Borrow a connection: from the primary, or for reads from the first
+    reachable server in routing order (unreachable replicas are ejected)
+
+    Returns:
+        (pool name, pool, connection)
+    """
+    targets = db_router.read_targets() if read_only else [('primary', db_config.get_connection_params())]
+    for position, (name, params) in enumerate(targets):
+        try:
+            pool = db_router.get_pool(name, params)
+            return name, pool, pool.getconn()
+        except psycopg2.Error as e:
+            if position == len(targets) - 1 or not is_connection_failure(e):
+                raise
+            db_router.eject(name, e)
+
+@contextmanager
+def _pooled_connection(name: str, pool: ConnectionPool, connection):
+    """Return a borrowed connection to its pool, discarding it if it broke"""
+    broken = False
     try:
-        connection = psycopg2.connect(
-            **db_config.get_connection_params(),
-            cursor_factory=RealDictCursor
-        )
-        connection.autocommit = False
-        
         yield connection
-        
     except Exception as e:
-        logger.error(f"Database connection error: {e}")
-        if connection:
+        logger.error(f"Database connection error ({name}): {e}")
+        broken = is_connection_failure(e, connection)
+        if not broken:
             connection.rollback()
         raise
     finally:
-        if connection:
-            connection.close()
+        pool.putconn(connection, close=broken)
+
+@contextmanager
+def get_db_connection(read_only: bool = False):
+    """
+    Context manager for PostgreSQL database connections
+    Borrows a pooled connection and returns it to the pool afterwards
+
+    Args:
+        read_only: Whether the connection is only used for reads; it may
+            then come from a read replica
+    """
+    try:
+        name, pool, connection = _acquire_connection(read_only)
+    except Exception as e:
+        logger.error(f"Database connection error: {e}")
+        raise
+
+    with _pooled_connection(name, pool, connection):
+        yield connection
+
+    if not read_only:
+        db_router.record_write()
 
 @contextmanager
-def get_db_cursor():
+def get_db_cursor(read_only: bool = False):
     """
     Context manager for database cursors
     Automatically handles connection and cursor lifecycle
+
+    Args:
+        read_only: Allow the connection to come from a read replica
     """
-    with get_db_connection() as conn:
+    with get_db_connection(read_only) as conn:
         cursor = conn.cursor()
         try:
             yield cursor, conn
@@ -102,10 +448,66 @@ def get_db_cursor():
         finally:
             cursor.close()
 
+def _run_query(cursor, conn, query: str, params: Optional[Tuple], fetch: bool) -> Optional[List[Dict[str, Any]]]:
+    try:
+        if params:
+            cursor.execute(query, params)
+        else:
+            cursor.execute(query)
+
+        results = cursor.fetchall() if fetch else None
+        # Commit even when fetching so INSERT/UPDATE ... RETURNING is persisted
+        conn.commit()
+
+        if fetch:
+            # RealDictCursor returns dict-like objects
+            return [dict(row) for row in results]
+        return None
+
+    except Exception as e:
+        logger.error(f"Query execution error: {e}")
+        logger.error(f"Query: {query}")
+        logger.error(f"Params: {params}")
+        conn.rollback()
+        raise
+
+def _route(read_only: bool, run: Callable[[Any, Any], Any], primary: bool = False) -> Any:
+    """
+    Call run(cursor, connection) on the primary, or for reads on the first
+    server in routing order that responds (the primary last)
+
+    primary: Run reads on the primary too, without counting them as writes
+    """
+    if not read_only:
+        with get_db_cursor() as (cursor, conn):
+            return run(cursor, conn)
+
+    targets = [('primary', db_config.get_connection_params())] if primary else db_router.read_targets()
+    for position, (name, connection_params) in enumerate(targets):
+        connection = None
+        try:
+            pool = db_router.get_pool(name, connection_params)
+            connection = pool.getconn()
+            with _pooled_connection(name, pool, connection):
+                cursor = connection.cursor()
+                try:
+                    return run(cursor, connection)
+                finally:
+                    cursor.close()
+        except psycopg2.Error as e:
+            # Stale or unreachable server: try the next one; anything else is the statement's own error
+            if position == len(targets) - 1 or not is_connection_failure(e, connection):
+                raise
+            db_router.eject(name, e)
+
 def execute_query(query: str, params: Optional[Tuple] = None, fetch: bool = False) -> Optional[List[Dict[str, Any]]]:
     """
     Execute a PostgreSQL query with automatic connection management
-    
+
+    Read-only queries with fetch=True are served by a read replica when
+    replicas are configured (falling back to the next replica, then the
+    primary, if one is unreachable); everything else runs on the primary.
+
     Args:
         query: SQL query string (using %s for parameters)
         params: Query parameters tuple
@@ -114,27 +516,82 @@ def execute_query(query: str, params: Optional[Tuple] = None, fetch: bool = Fals
     Returns:
         Query results if fetch=True, otherwise None
     """
-    with get_db_cursor() as (cursor, conn):
+    return _route(fetch and is_read_query(query),
+                  lambda cursor, conn: _run_query(cursor, conn, query, params, fetch))
+
+# Statements run through execute_prepared: name -> SQL with $1, $2, ... placeholders
+_registered_statements: Dict[str, str] = {}
+
+_STATEMENT_NAME = re.compile(r'[a-z_][a-z0-9_]*')
+
+def register_statement(name: str, query: str) -> None:
+    """
+    Register a hot statement to be PREPAREd once per pooled connection
+
+    PostgreSQL then parses it once per connection and, after a few
+    executions, reuses a generic plan instead of planning every call.
+
+    Args:
+        name: Statement name (lowercase SQL identifier)
+        query: SQL using $1, $2, ... placeholders
+
+    Raises:
+        ValueError: If the name is invalid or already registered with different SQL
+    """
+    if not _STATEMENT_NAME.fullmatch(name):
+        raise ValueError(f"Invalid statement name: {name}")
+    if _registered_statements.get(name, query) != query:
+        raise ValueError(f"Statement {name} is already registered with different SQL")
+    _registered_statements[name] = query
+
+def registered_statements() -> Dict[str, str]:
+    """Registered statement names and their SQL"""
+    return dict(_registered_statements)
+
+def _run_prepared(cursor, conn, name: str, params: Tuple, fetch: bool) -> Optional[List[Dict[str, Any]]]:
+    """EXECUTE a registered statement, PREPAREing it first on connections that lack it"""
+    execute_sql = f"EXECUTE {name} ({', '.join(['%s'] * len(params))})" if params else f"EXECUTE {name}"
+
+    for attempt in range(2):
         try:
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            
-            if fetch:
-                results = cursor.fetchall()
-                # RealDictCursor returns dict-like objects
-                return [dict(row) for row in results]
-            else:
-                conn.commit()
-                return None
-                
-        except Exception as e:
-            logger.error(f"Query execution error: {e}")
-            logger.error(f"Query: {query}")
-            logger.error(f"Params: {params}")
+            if name not in conn.prepared_statements:
+                cursor.execute(f"PREPARE {name} AS {_registered_statements[name]}")
+                conn.prepared_statements.add(name)
+            return _run_query(cursor, conn, execute_sql, params, fetch)
+        except (pg_errors.InvalidSqlStatementName, pg_errors.DuplicatePreparedStatement,
+                pg_errors.FeatureNotSupported) as e:
+            # The session lost or already has the statement (e.g. reset by a proxy),
+            # or a schema change altered its result type: prepare it afresh
+            if attempt:
+                raise
+            logger.warning(f"Re-preparing statement {name}: {e}")
             conn.rollback()
-            raise
+            cursor.execute("DEALLOCATE ALL")
+            conn.prepared_statements.clear()
+
+def execute_prepared(name: str, params: Tuple = (), fetch: bool = False,
+                     primary: bool = False) -> Optional[List[Dict[str, Any]]]:
+    """
+    Execute a statement registered with register_statement
+
+    Routed like execute_query. Connections opened after a pool recycles
+    one start without prepared statements and prepare them on first use.
+
+    Args:
+        name: Registered statement name
+        params: Values for $1, $2, ...
+        fetch: Whether to fetch results
+        primary: Read from the primary even with replicas (rows another
+            process may have written a moment ago)
+
+    Returns:
+        Query results if fetch=True, otherwise None
+    """
+    if name not in _registered_statements:
+        raise ValueError(f"Unknown prepared statement: {name}")
+
+    read_only = fetch and is_read_query(_registered_statements[name])
+    return _route(read_only, lambda cursor, conn: _run_prepared(cursor, conn, name, params, fetch), primary)
 
 def execute_many(query: str, params_list: List[Tuple]) -> None:
     """
@@ -185,7 +642,8 @@ def get_database_info() -> Dict[str, Any]:
         'port': db_config.db_port,
         'database': db_config.db_name,
         'user': db_config.db_user,
-        'connection_params': db_config.get_connection_params()
+        'connection_params': db_config.get_connection_params(),
+        'replicas': db_router.replica_status()
     }
 
 def init_database_schema():
@@ -195,21 +653,52 @@ def init_database_schema():
     """
     with get_db_cursor() as (cursor, conn):
         try:
+            # Lookup tables for exercise language, difficulty and topic
+            create_exercise_lookup_schema(cursor)
+            
             # Create exercises table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS exercises (
                     id SERIAL PRIMARY KEY,
                     title TEXT NOT NULL,
                     text TEXT NOT NULL,
-                    language TEXT DEFAULT 'en',
-                    difficulty TEXT DEFAULT 'intermediate',
-                    topic TEXT DEFAULT 'general',
-                    questions TEXT NOT NULL,
+                    language_id SMALLINT NOT NULL REFERENCES exercise_languages (id),
+                    difficulty_id SMALLINT NOT NULL REFERENCES exercise_difficulties (id),
+                    topic_id SMALLINT NOT NULL REFERENCES exercise_topics (id),
+                    questions JSONB NOT NULL,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
             
+            # Convert questions stored as TEXT by older schemas to JSONB
+            cursor.execute("""
+                SELECT data_type FROM information_schema.columns
+                WHERE table_name = 'exercises' AND column_name = 'questions'
+            """)
+            if cursor.fetchone()['data_type'] != 'jsonb':
+                logger.info("Migrating exercises.questions from TEXT to JSONB")
+                cursor.execute("ALTER TABLE exercises ALTER COLUMN questions TYPE JSONB USING questions::jsonb")
+            
+            # Replace free-text language/difficulty/topic columns from older schemas
+            migrate_exercise_metadata(cursor)
+
+            
+            # Exercises with their metadata codes resolved, for read paths
+            cursor.execute("""
+                CREATE OR REPLACE VIEW exercise_details AS
+                SELECT
+                    e.id, e.title, e.text,
+                    l.code AS language,
+                    d.code AS difficulty,
+                    t.code AS topic,
+                    e.questions, e.created_at, e.updated_at
+                FROM exercises e
+                JOIN exercise_languages l ON l.id = e.language_id
+                JOIN exercise_difficulties d ON d.id = e.difficulty_id
+                JOIN exercise_topics t ON t.id = e.topic_id
+            """)
+            
             # Create users table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS users (
@@ -259,9 +748,9 @@ def init_database_schema():
             
             # Create indexes for better performance
             indexes = [
-                "CREATE INDEX IF NOT EXISTS idx_exercises_language ON exercises(language)",
-                "CREATE INDEX IF NOT EXISTS idx_exercises_difficulty ON exercises(difficulty)",
-                "CREATE INDEX IF NOT EXISTS idx_exercises_topic ON exercises(topic)",
+                "CREATE INDEX IF NOT EXISTS idx_exercises_filter ON exercises(language_id, difficulty_id, topic_id, id)",
+                "CREATE INDEX IF NOT EXISTS idx_exercises_language_id ON exercises(language_id, id)",
+                "CREATE INDEX IF NOT EXISTS idx_exercises_questions ON exercises USING GIN (questions jsonb_path_ops)",
                 "CREATE INDEX IF NOT EXISTS idx_user_progress_user_id ON user_progress(user_id)",
                 "CREATE INDEX IF NOT EXISTS idx_user_progress_exercise_id ON user_progress(exercise_id)",
                 "CREATE INDEX IF NOT EXISTS idx_user_progress_status ON user_progress(status)",
@@ -272,6 +761,39 @@ def init_database_schema():
             for index_sql in indexes:
                 cursor.execute(index_sql)
             
+            # Keep exercises.updated_at current (used for HTTP validators)
+            cursor.execute("""
+                CREATE OR REPLACE FUNCTION exercises_touch_updated_at() RETURNS TRIGGER AS $$
+                BEGIN
+                    IF NEW IS DISTINCT FROM OLD THEN
+                        NEW.updated_at = CURRENT_TIMESTAMP;
+                    END IF;
+                    RETURN NEW;
+                END;
+                $$ LANGUAGE plpgsql
+            """)
+            cursor.execute("DROP TRIGGER IF EXISTS trg_exercises_updated_at ON exercises")
+            cursor.execute("""
+                CREATE TRIGGER trg_exercises_updated_at
+                BEFORE UPDATE ON exercises
+                FOR EACH ROW EXECUTE PROCEDURE exercises_touch_updated_at()
+            """)
+            
+            # Passage fingerprints for duplicate detection and idempotent inserts
+            create_exercise_content_hash_schema(cursor)
+            
+            # Full-text and trigram search over exercises
+            create_exercise_search_schema(cursor)
+            
+            # Per-user summary statistics
+            create_user_stats_schema(cursor)
+            
+            # Catalog statistics for /exercises/stats
+            create_exercise_stats_schema(cursor)
+            
+            # Login sessions shared by all web processes
+            create_user_session_schema(cursor)
+            
             conn.commit()
             logger.info("Database schema initialized successfully")
             
@@ -280,6 +802,598 @@ def init_database_schema():
             conn.rollback()
             raise
 
+# Exercise metadata lookup tables: metadata column -> (lookup table, default code)
+EXERCISE_LOOKUPS = {
+    'language': ('exercise_languages', 'en'),
+    'difficulty': ('exercise_difficulties', 'intermediate'),
+    'topic': ('exercise_topics', 'general'),
+}
+
+# Text search configuration per exercise language; other languages use 'simple'
+SEARCH_CONFIGS = {
+    'en': 'english',
+    'es': 'spanish',
+    'fr': 'french',
+    'de': 'german',
+    'it': 'italian',
+    'pt': 'portuguese',
+    'nl': 'dutch',
+    'ru': 'russian',
+}
+
+# Languages without usable word stemming/segmentation, searched by trigram substring match
+TRIGRAM_SEARCH_LANGUAGES = ('ja', 'zh', 'zh-tw', 'ko', 'vi', 'th')
+
+# Weight of the latest attempt in user_stats' recent reading speed and comprehension
+RECENT_PROGRESS_WEIGHT = 0.3
+
+def create_exercise_lookup_schema(cursor):
+    """
+    Create the exercise metadata lookup tables and their get-or-create functions
+    
+    Each exercise stores SMALLINT keys into exercise_languages,
+    exercise_difficulties and exercise_topics instead of free text, which
+    keeps rows narrow and lets (language_id, difficulty_id, topic_id, id)
+    serve filtered selection as an index-only scan. exercise_<name>_id(code)
+    returns the key for a code, adding the code on first use.
+    
+    Args:
+        cursor: Cursor inside the schema initialization transaction
+    """
+    for column, (table, default_code) in EXERCISE_LOOKUPS.items():
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id SMALLSERIAL PRIMARY KEY,
+                code TEXT UNIQUE NOT NULL
+            )
+        """)
+        
+        cursor.execute(f"""
+            CREATE OR REPLACE FUNCTION exercise_{column}_id(p_code TEXT) RETURNS SMALLINT AS $$
+            DECLARE
+                v_id SMALLINT;
+                v_code TEXT := COALESCE(NULLIF(p_code, ''), '{default_code}');
+            BEGIN
+                SELECT id INTO v_id FROM {table} WHERE code = v_code;
+                IF v_id IS NULL THEN
+                    INSERT INTO {table} (code) VALUES (v_code)
+                    ON CONFLICT (code) DO NOTHING
+                    RETURNING id INTO v_id;
+                    IF v_id IS NULL THEN
+                        SELECT id INTO v_id FROM {table} WHERE code = v_code;
+                    END IF;
+                END IF;
+                RETURN v_id;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+
+def migrate_exercise_metadata(cursor):
+    """
+    Move free-text language/difficulty/topic columns into lookup keys
+    
+    Runs only on databases created before the lookup tables existed. The
+    text columns (and their single-column indexes) are dropped once every
+    row has its keys.
+    
+    Args:
+        cursor: Cursor inside the schema initialization transaction
+    """
+    cursor.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_name = 'exercises' AND column_name IN ('language', 'difficulty', 'topic')
+    """)
+    text_columns = [row['column_name'] for row in cursor.fetchall()]
+    if not text_columns:
+        return
+    
+    logger.info(f"Migrating exercises.{', '.join(text_columns)} to lookup tables")
+    
+    # Triggers are recreated later in init; the backfill must not bump
+    # updated_at or run the old stats trigger written against text columns
+    cursor.execute("DROP TRIGGER IF EXISTS trg_exercise_stats_update ON exercises")
+    cursor.execute("DROP TRIGGER IF EXISTS trg_exercises_updated_at ON exercises")
+    
+    for column in text_columns:
+        table, default_code = EXERCISE_LOOKUPS[column]
+        cursor.execute(f"""
+            INSERT INTO {table} (code)
+            SELECT DISTINCT COALESCE(NULLIF({column}, ''), '{default_code}') FROM exercises
+            ON CONFLICT (code) DO NOTHING
+        """)
+        cursor.execute(f"ALTER TABLE exercises ADD COLUMN IF NOT EXISTS {column}_id SMALLINT REFERENCES {table} (id)")
+        cursor.execute(f"""
+            UPDATE exercises e SET {column}_id = lookup.id
+            FROM {table} lookup
+            WHERE lookup.code = COALESCE(NULLIF(e.{column}, ''), '{default_code}')
+        """)
+        cursor.execute(f"ALTER TABLE exercises ALTER COLUMN {column}_id SET NOT NULL")
+        cursor.execute(f"ALTER TABLE exercises DROP COLUMN {column}")
+
+def create_user_session_schema(cursor):
+    """
+    Create the user_sessions table (see session_store.py)
+
+    Sessions are keyed by the SHA-256 digest of their token. Expiry is a
+    TIMESTAMPTZ so it compares correctly whatever the connection's TimeZone.
+    last_write_at is when the client last wrote through the session, for
+    read-your-writes across web processes.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_sessions (
+            token_hash TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMPTZ NOT NULL,
+            last_write_at TIMESTAMPTZ
+        )
+    """)
+    cursor.execute("ALTER TABLE user_sessions ADD COLUMN IF NOT EXISTS last_write_at TIMESTAMPTZ")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_sessions_user_id ON user_sessions(user_id)")
+
+def create_user_stats_schema(cursor):
+    """
+    Create the user_stats summary table and the triggers that keep it current
+    
+    Every insert, update or delete on user_progress and user_queue applies
+    its delta to the user's single user_stats row, so reading a user's
+    statistics is a primary-key lookup no matter how long their history is.
+    recent_wpm and recent_comprehension are exponentially weighted averages
+    of the user's attempts (RECENT_PROGRESS_WEIGHT for the latest one),
+    updated on every progress write. The table is backfilled from existing
+    rows the first time it is created, and the averages from each user's
+    latest attempts the first time their columns are.
+    
+    Args:
+        cursor: Cursor inside the schema initialization transaction
+    """
+    cursor.execute("SELECT to_regclass('user_stats') IS NULL AS missing")
+    needs_backfill = cursor.fetchone()['missing']
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_stats (
+            user_id INTEGER PRIMARY KEY,
+            total_exercises INTEGER NOT NULL DEFAULT 0,
+            completed_exercises INTEGER NOT NULL DEFAULT 0,
+            failed_exercises INTEGER NOT NULL DEFAULT 0,
+            completed_comprehension_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+            reading_speed_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+            total_reading_time BIGINT NOT NULL DEFAULT 0,
+            queue_count INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        )
+    """)
+    
+    cursor.execute("""
+        SELECT COUNT(*) = 0 AS missing FROM information_schema.columns
+        WHERE table_name = 'user_stats' AND column_name = 'recent_wpm'
+    """)
+    needs_recent_backfill = cursor.fetchone()['missing']
+    cursor.execute("ALTER TABLE user_stats ADD COLUMN IF NOT EXISTS recent_wpm DOUBLE PRECISION")
+    cursor.execute("ALTER TABLE user_stats ADD COLUMN IF NOT EXISTS recent_comprehension DOUBLE PRECISION")
+    
+    # Reading speeds that count: finite and positive (0 for anything else, e.g. NaN)
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION user_stats_wpm(wpm DOUBLE PRECISION) RETURNS DOUBLE PRECISION AS $$
+            SELECT CASE WHEN wpm > 0 AND wpm < 'Infinity' THEN wpm ELSE 0 END
+        $$ LANGUAGE sql IMMUTABLE
+    """)
+    
+    # Apply the old row's contribution negatively and the new row's positively;
+    # the recent averages move towards the new row (an attempt is not undone)
+    cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION user_stats_apply_progress() RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE user_stats SET
+                    total_exercises = total_exercises - 1,
+                    completed_exercises = completed_exercises - (OLD.status = 'completed')::int,
+                    failed_exercises = failed_exercises - (OLD.status = 'failed')::int,
+                    completed_comprehension_sum = completed_comprehension_sum
+                        - CASE WHEN OLD.status = 'completed' THEN COALESCE(OLD.comprehension_score, 0) ELSE 0 END,
+                    reading_speed_sum = reading_speed_sum - COALESCE(user_stats_wpm(OLD.reading_speed_wpm), 0),
+                    total_reading_time = total_reading_time - COALESCE(OLD.session_duration_seconds, 0),
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE user_id = OLD.user_id;
+            END IF;
+            
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO user_stats (user_id, total_exercises, completed_exercises, failed_exercises,
+                                        completed_comprehension_sum, reading_speed_sum, total_reading_time,
+                                        recent_wpm, recent_comprehension)
+                VALUES (
+                    NEW.user_id,
+                    1,
+                    (NEW.status = 'completed')::int,
+                    (NEW.status = 'failed')::int,
+                    CASE WHEN NEW.status = 'completed' THEN COALESCE(NEW.comprehension_score, 0) ELSE 0 END,
+                    COALESCE(user_stats_wpm(NEW.reading_speed_wpm), 0),
+                    COALESCE(NEW.session_duration_seconds, 0),
+                    NULLIF(user_stats_wpm(NEW.reading_speed_wpm), 0),
+                    NEW.comprehension_score
+                )
+                ON CONFLICT (user_id) DO UPDATE SET
+                    total_exercises = user_stats.total_exercises + EXCLUDED.total_exercises,
+                    completed_exercises = user_stats.completed_exercises + EXCLUDED.completed_exercises,
+                    failed_exercises = user_stats.failed_exercises + EXCLUDED.failed_exercises,
+                    completed_comprehension_sum = user_stats.completed_comprehension_sum + EXCLUDED.completed_comprehension_sum,
+                    reading_speed_sum = user_stats.reading_speed_sum + EXCLUDED.reading_speed_sum,
+                    total_reading_time = user_stats.total_reading_time + EXCLUDED.total_reading_time,
+                    recent_wpm = COALESCE(
+                        user_stats.recent_wpm + {RECENT_PROGRESS_WEIGHT} * (EXCLUDED.recent_wpm - user_stats.recent_wpm),
+                        EXCLUDED.recent_wpm, user_stats.recent_wpm),
+                    recent_comprehension = COALESCE(
+                        user_stats.recent_comprehension
+                            + {RECENT_PROGRESS_WEIGHT} * (EXCLUDED.recent_comprehension - user_stats.recent_comprehension),
+                        EXCLUDED.recent_comprehension, user_stats.recent_comprehension),
+                    updated_at = CURRENT_TIMESTAMP;
+            END IF;
+            
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION user_stats_apply_queue() RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO user_stats (user_id, queue_count) VALUES (NEW.user_id, 1)
+                ON CONFLICT (user_id) DO UPDATE SET
+                    queue_count = user_stats.queue_count + 1,
+                    updated_at = CURRENT_TIMESTAMP;
+            ELSE
+                UPDATE user_stats SET
+                    queue_count = queue_count - 1,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE user_id = OLD.user_id;
+            END IF;
+            
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    
+    cursor.execute("DROP TRIGGER IF EXISTS trg_user_stats_progress ON user_progress")
+    cursor.execute("""
+        CREATE TRIGGER trg_user_stats_progress
+        AFTER INSERT OR UPDATE OR DELETE ON user_progress
+        FOR EACH ROW EXECUTE PROCEDURE user_stats_apply_progress()
+    """)
+    
+    cursor.execute("DROP TRIGGER IF EXISTS trg_user_stats_queue ON user_queue")
+    cursor.execute("""
+        CREATE TRIGGER trg_user_stats_queue
+        AFTER INSERT OR DELETE ON user_queue
+        FOR EACH ROW EXECUTE PROCEDURE user_stats_apply_queue()
+    """)
+    
+    if needs_backfill:
+        cursor.execute("""
+            INSERT INTO user_stats (user_id, total_exercises, completed_exercises, failed_exercises,
+                                    completed_comprehension_sum, reading_speed_sum, total_reading_time,
+                                    queue_count)
+            SELECT
+                u.id,
+                COALESCE(p.total_exercises, 0),
+                COALESCE(p.completed_exercises, 0),
+                COALESCE(p.failed_exercises, 0),
+                COALESCE(p.completed_comprehension_sum, 0),
+                COALESCE(p.reading_speed_sum, 0),
+                COALESCE(p.total_reading_time, 0),
+                COALESCE(q.queue_count, 0)
+            FROM users u
+            LEFT JOIN (
+                SELECT
+                    user_id,
+                    COUNT(*) AS total_exercises,
+                    SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) AS completed_exercises,
+                    SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) AS failed_exercises,
+                    SUM(CASE WHEN status = 'completed' THEN COALESCE(comprehension_score, 0) ELSE 0 END) AS completed_comprehension_sum,
+                    SUM(COALESCE(user_stats_wpm(reading_speed_wpm), 0)) AS reading_speed_sum,
+                    SUM(COALESCE(session_duration_seconds, 0)) AS total_reading_time
+                FROM user_progress
+                GROUP BY user_id
+            ) p ON p.user_id = u.id
+            LEFT JOIN (
+                SELECT user_id, COUNT(*) AS queue_count FROM user_queue GROUP BY user_id
+            ) q ON q.user_id = u.id
+            ON CONFLICT (user_id) DO NOTHING
+        """)
+        logger.info(f"Backfilled user_stats for {cursor.rowcount} users")
+    
+    if needs_recent_backfill:
+        # Plain averages of each user's five latest attempts
+        cursor.execute("""
+            UPDATE user_stats s SET
+                recent_wpm = recent.wpm,
+                recent_comprehension = recent.comprehension
+            FROM (
+                SELECT user_id,
+                       AVG(NULLIF(user_stats_wpm(reading_speed_wpm), 0)) AS wpm,
+                       AVG(comprehension_score) AS comprehension
+                FROM (
+                    SELECT user_id, reading_speed_wpm, comprehension_score,
+                           ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY completed_at DESC NULLS LAST, id DESC) AS n
+                    FROM user_progress
+                ) attempts
+                WHERE n <= 5
+                GROUP BY user_id
+            ) recent
+            WHERE s.user_id = recent.user_id
+        """)
+        logger.info(f"Backfilled recent reading pace for {cursor.rowcount} users")
+    
+    # Repair statistics poisoned by NaN/infinite speeds recorded before user_stats_wpm
+    cursor.execute("""
+        UPDATE user_stats s SET
+            reading_speed_sum = COALESCE((
+                SELECT SUM(user_stats_wpm(p.reading_speed_wpm)) FROM user_progress p WHERE p.user_id = s.user_id
+            ), 0),
+            recent_wpm = CASE WHEN recent_wpm IN ('NaN', 'Infinity', '-Infinity') THEN NULL ELSE recent_wpm END
+        WHERE reading_speed_sum IN ('NaN', 'Infinity', '-Infinity') OR recent_wpm IN ('NaN', 'Infinity', '-Infinity')
+    """)
+    if cursor.rowcount:
+        logger.info(f"Repaired reading speed statistics of {cursor.rowcount} users")
+
+def create_exercise_stats_schema(cursor):
+    """
+    Create the exercise_stats counts table and the triggers that keep it current
+    
+    Counts are kept per (dimension, value) for the total and for each
+    language, difficulty and topic. Statement-level triggers with transition
+    tables (PostgreSQL 10+) aggregate all rows touched by one statement
+    before applying them, so bulk inserts pay one small upsert per distinct
+    value rather than one per row. The table is backfilled from existing
+    exercises the first time it is created.
+    
+    Args:
+        cursor: Cursor inside the schema initialization transaction
+    """
+    cursor.execute("SELECT to_regclass('exercise_stats') IS NULL AS missing")
+    needs_backfill = cursor.fetchone()['missing']
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS exercise_stats (
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dimension, value)
+        )
+    """)
+    
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION exercise_stats_apply() RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP = 'TRUNCATE' THEN
+                DELETE FROM exercise_stats;
+                RETURN NULL;
+            END IF;
+            
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                INSERT INTO exercise_stats (dimension, value, count)
+                SELECT d.dimension, d.value, -COUNT(*)
+                FROM old_rows o
+                CROSS JOIN LATERAL (VALUES
+                    ('total', ''),
+                    ('language', (SELECT code FROM exercise_languages WHERE id = o.language_id)),
+                    ('difficulty', (SELECT code FROM exercise_difficulties WHERE id = o.difficulty_id)),
+                    ('topic', (SELECT code FROM exercise_topics WHERE id = o.topic_id))
+                ) AS d(dimension, value)
+                GROUP BY d.dimension, d.value
+                ON CONFLICT (dimension, value) DO UPDATE SET count = exercise_stats.count + EXCLUDED.count;
+            END IF;
+            
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO exercise_stats (dimension, value, count)
+                SELECT d.dimension, d.value, COUNT(*)
+                FROM new_rows n
+                CROSS JOIN LATERAL (VALUES
+                    ('total', ''),
+                    ('language', (SELECT code FROM exercise_languages WHERE id = n.language_id)),
+                    ('difficulty', (SELECT code FROM exercise_difficulties WHERE id = n.difficulty_id)),
+                    ('topic', (SELECT code FROM exercise_topics WHERE id = n.topic_id))
+                ) AS d(dimension, value)
+                GROUP BY d.dimension, d.value
+                ON CONFLICT (dimension, value) DO UPDATE SET count = exercise_stats.count + EXCLUDED.count;
+            END IF;
+            
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    
+    triggers = [
+        ("trg_exercise_stats_insert", "AFTER INSERT ON exercises REFERENCING NEW TABLE AS new_rows"),
+        ("trg_exercise_stats_update", "AFTER UPDATE ON exercises REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+        ("trg_exercise_stats_delete", "AFTER DELETE ON exercises REFERENCING OLD TABLE AS old_rows"),
+        ("trg_exercise_stats_truncate", "AFTER TRUNCATE ON exercises"),
+    ]
+    
+    for trigger_name, trigger_event in triggers:
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger_name} ON exercises")
+        cursor.execute(f"""
+            CREATE TRIGGER {trigger_name}
+            {trigger_event}
+            FOR EACH STATEMENT EXECUTE PROCEDURE exercise_stats_apply()
+        """)
+    
+    if needs_backfill:
+        cursor.execute("""
+            INSERT INTO exercise_stats (dimension, value, count)
+            SELECT d.dimension, d.value, COUNT(*)
+            FROM exercises e
+            CROSS JOIN LATERAL (VALUES
+                ('total', ''),
+                ('language', (SELECT code FROM exercise_languages WHERE id = e.language_id)),
+                ('difficulty', (SELECT code FROM exercise_difficulties WHERE id = e.difficulty_id)),
+                ('topic', (SELECT code FROM exercise_topics WHERE id = e.topic_id))
+            ) AS d(dimension, value)
+            GROUP BY d.dimension, d.value
+            ON CONFLICT (dimension, value) DO NOTHING
+        """)
+        logger.info("Backfilled exercise_stats from existing exercises")
+
+def create_exercise_content_hash_schema(cursor):
+    """
+    Create exercises.content_hash with its unique index and maintenance trigger
+    
+    content_hash fingerprints the passage text (see exercise_store.content_hash)
+    so duplicate detection is a single index probe and inserts can be made
+    idempotent with INSERT ... ON CONFLICT (content_hash). A BEFORE trigger
+    sets it on insert and whenever the text changes. When the column is
+    first added, existing rows are backfilled; if the table already holds
+    duplicate passages, only the oldest copy gets the hash and the others
+    keep NULL (which the unique index allows). Such a duplicate keeps NULL
+    when its text is edited for as long as another row holds the passage,
+    instead of failing the update.
+    
+    Args:
+        cursor: Cursor inside the schema initialization transaction
+    """
+    cursor.execute(r"""
+        CREATE OR REPLACE FUNCTION exercise_content_hash(p_text TEXT) RETURNS TEXT AS $$
+            SELECT md5(btrim(regexp_replace(p_text, '[ \t\n\r\f\v]+', ' ', 'g'), ' '))
+        $$ LANGUAGE sql IMMUTABLE STRICT
+    """)
+    
+    cursor.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'exercises' AND column_name = 'content_hash'
+    """)
+    needs_backfill = cursor.fetchone() is None
+    if needs_backfill:
+        cursor.execute("ALTER TABLE exercises ADD COLUMN content_hash TEXT")
+    
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION exercises_set_content_hash() RETURNS TRIGGER AS $$
+        BEGIN
+            NEW.content_hash := exercise_content_hash(NEW.text);
+            IF TG_OP = 'UPDATE' AND OLD.content_hash IS NULL AND EXISTS (
+                SELECT 1 FROM exercises WHERE content_hash = NEW.content_hash AND id <> NEW.id
+            ) THEN
+                NEW.content_hash := NULL;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    cursor.execute("DROP TRIGGER IF EXISTS trg_exercises_content_hash ON exercises")
+    cursor.execute("""
+        CREATE TRIGGER trg_exercises_content_hash
+        BEFORE INSERT OR UPDATE OF text ON exercises
+        FOR EACH ROW EXECUTE PROCEDURE exercises_set_content_hash()
+    """)
+    
+    if needs_backfill:
+        cursor.execute("ALTER TABLE exercises DISABLE TRIGGER trg_exercises_updated_at")
+        cursor.execute("""
+            UPDATE exercises e
+            SET content_hash = h.content_hash
+            FROM (
+                SELECT DISTINCT ON (exercise_content_hash(text)) id, exercise_content_hash(text) AS content_hash
+                FROM exercises
+                ORDER BY exercise_content_hash(text), id
+            ) h
+            WHERE e.id = h.id
+        """)
+        cursor.execute("ALTER TABLE exercises ENABLE TRIGGER trg_exercises_updated_at")
+        
+        cursor.execute("SELECT COUNT(*) AS duplicates FROM exercises WHERE content_hash IS NULL")
+        duplicates = cursor.fetchone()['duplicates']
+        logger.info("Backfilled exercises.content_hash")
+        if duplicates:
+            logger.warning(f"{duplicates} exercises duplicate an older passage and were left without a content_hash")
+    
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_exercises_content_hash ON exercises(content_hash)")
+
+def create_exercise_search_schema(cursor):
+    """
+    Create the exercise search vector, its trigger and the search indexes
+    
+    exercises.search_vector holds the title (weight A) and text (weight B)
+    parsed with the text search configuration of the exercise's language,
+    so stemming matches the language the exercise is written in. It is kept
+    current by a BEFORE trigger (the configuration lives in the language
+    lookup, so it cannot be a generated column) and backfilled when the
+    column is first added. CJK and Vietnamese text is also indexed with
+    pg_trgm for substring search when the extension is available.
+    
+    Args:
+        cursor: Cursor inside the schema initialization transaction
+    """
+    config_cases = "\n".join(
+        f"WHEN '{code}' THEN '{config}'::regconfig" for code, config in SEARCH_CONFIGS.items()
+    )
+    cursor.execute(f"""
+        CREATE OR REPLACE FUNCTION exercise_search_config(p_code TEXT) RETURNS REGCONFIG AS $$
+            SELECT CASE p_code
+                {config_cases}
+                ELSE 'simple'::regconfig
+            END
+        $$ LANGUAGE sql IMMUTABLE
+    """)
+    
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION exercise_search_vector(p_config REGCONFIG, p_title TEXT, p_text TEXT)
+        RETURNS TSVECTOR AS $$
+            SELECT setweight(to_tsvector(p_config, COALESCE(p_title, '')), 'A') ||
+                   setweight(to_tsvector(p_config, COALESCE(p_text, '')), 'B')
+        $$ LANGUAGE sql IMMUTABLE
+    """)
+    
+    cursor.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'exercises' AND column_name = 'search_vector'
+    """)
+    needs_backfill = cursor.fetchone() is None
+    if needs_backfill:
+        cursor.execute("ALTER TABLE exercises ADD COLUMN search_vector TSVECTOR")
+    
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION exercises_update_search_vector() RETURNS TRIGGER AS $$
+        BEGIN
+            NEW.search_vector := exercise_search_vector(
+                (SELECT exercise_search_config(code) FROM exercise_languages WHERE id = NEW.language_id),
+                NEW.title, NEW.text
+            );
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    cursor.execute("DROP TRIGGER IF EXISTS trg_exercises_search_vector ON exercises")
+    cursor.execute("""
+        CREATE TRIGGER trg_exercises_search_vector
+        BEFORE INSERT OR UPDATE OF title, text, language_id ON exercises
+        FOR EACH ROW EXECUTE PROCEDURE exercises_update_search_vector()
+    """)
+    
+    if needs_backfill:
+        # Filling in a derived column is not a content change, so keep updated_at (and ETags) as they are
+        cursor.execute("ALTER TABLE exercises DISABLE TRIGGER trg_exercises_updated_at")
+        cursor.execute("""
+            UPDATE exercises e
+            SET search_vector = exercise_search_vector(exercise_search_config(l.code), e.title, e.text)
+            FROM exercise_languages l
+            WHERE l.id = e.language_id
+        """)
+        cursor.execute("ALTER TABLE exercises ENABLE TRIGGER trg_exercises_updated_at")
+        logger.info("Backfilled exercises.search_vector")
+    
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_exercises_search_vector ON exercises USING GIN (search_vector)")
+    
+    # pg_trgm is a contrib extension and may be missing or need superuser rights
+    cursor.execute("SAVEPOINT exercise_trigram")
+    try:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_exercises_title_trgm ON exercises USING GIN (title gin_trgm_ops)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_exercises_text_trgm ON exercises USING GIN (text gin_trgm_ops)")
+        cursor.execute("RELEASE SAVEPOINT exercise_trigram")
+    except Exception as e:
+        cursor.execute("ROLLBACK TO SAVEPOINT exercise_trigram")
+        logger.warning(f"pg_trgm unavailable, CJK/Vietnamese search will scan without an index: {e}")
+
 if __name__ == "__main__":
     # Test the database configuration
     logging.basicConfig(level=logging.INFO)
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Bulk exercise import for NoSubvo
+Streams JSONL/CSV exercises through validation into PostgreSQL with COPY
+
+Usage:
+    python exercise_import.py exercises.jsonl
+    python exercise_import.py exercises.csv --batch-size 10000
+    python exercise_import.py exercises.jsonl --resume
+"""
+
+import io
+import os
+import csv
+import sys
+import json
+import time
+import logging
+import argparse
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from database import get_db_cursor
+from exercise_store import validate_questions, content_hash
+
+logger = logging.getLogger(__name__)
+
+# Records loaded per COPY + merge transaction
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 5000))
+
+# Invalid records reported individually; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+IMPORT_FORMATS = ('jsonl', 'csv')
+
+# Columns copied into the staging table, in order
+STAGING_COLUMNS = ('record_no', 'title', 'text', 'language', 'difficulty', 'topic', 'questions')
+
+# Merge staged rows into exercises, skipping passages that are already stored
+MERGE_STAGED_EXERCISES = """
+    INSERT INTO exercises (title, text, language_id, difficulty_id, topic_id, questions)
+    SELECT s.title, s.text, exercise_language_id(s.language), exercise_difficulty_id(s.difficulty),
+           exercise_topic_id(s.topic), s.questions::jsonb
+    FROM exercise_import_staging s
+    ORDER BY s.record_no
+    ON CONFLICT (content_hash) DO NOTHING
+    RETURNING id
+"""
+
+
+def read_records(stream: TextIO, fmt: str = 'jsonl') -> Iterator[Tuple[int, Any]]:
+    """
+    Read raw records from a JSONL or CSV text stream without loading it whole
+
+    Args:
+        stream: Text stream (file or request body)
+        fmt: 'jsonl' (one JSON object per line) or 'csv' (header row with
+            title,text,language,difficulty,topic,questions; questions as JSON)
+
+    Yields:
+        (record_no, record) with record numbers starting at 1. JSONL records
+        are yielded as unparsed lines; validate_record parses them.
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+    if fmt == 'csv':
+        yield from enumerate(csv.DictReader(stream), 1)
+        return
+
+    record_no = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        record_no += 1
+        yield record_no, line
+
+
+def validate_record(record: Any) -> Tuple[str, str, Optional[str], Optional[str], Optional[str], str]:
+    """
+    Validate one imported exercise
+
+    Args:
+        record: Dictionary, or a JSON string encoding one
+
+    Returns:
+        Tuple of (title, text, language, difficulty, topic, questions JSON)
+
+    Raises:
+        ValueError: If the record is malformed
+    """
+    if isinstance(record, str):
+        try:
+            record = json.loads(record)
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+
+    if not isinstance(record, dict):
+        raise ValueError("Record must be an object")
+
+    for field in ('title', 'text'):
+        if not isinstance(record.get(field), str) or not record[field].strip():
+            raise ValueError(f"Missing required field: {field}")
+
+    if 'questions' not in record:
+        raise ValueError("Missing required field: questions")
+
+    questions = validate_questions(record['questions'])
+
+    return (
+        record['title'],
+        record['text'],
+        record.get('language') or None,
+        record.get('difficulty') or None,
+        record.get('topic') or None,
+        json.dumps(questions, ensure_ascii=False)
+    )
+
+
+class ExerciseImporter:
+    """
+    Loads validated exercises in batches: COPY into a temporary staging
+    table, then one INSERT ... SELECT merge that skips duplicate passages.
+
+    Each batch is its own transaction, so after an interruption the import
+    can continue from the last committed record (progress 'processed').
+    Passages repeated within the input are dropped by content hash before
+    they reach the database; re-running an import inserts nothing twice.
+    """
+
+    def __init__(self, batch_size: int = IMPORT_BATCH_SIZE):
+        self.batch_size = max(int(batch_size), 1)
+
+    def _load_batch(self, rows: List[Tuple]) -> List[int]:
+        """COPY one batch into staging and merge it, returning the new exercise ids"""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+
+        with get_db_cursor() as (cursor, conn):
+            cursor.execute("""
+                CREATE TEMP TABLE exercise_import_staging (
+                    record_no INTEGER NOT NULL,
+                    title TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    language TEXT,
+                    difficulty TEXT,
+                    topic TEXT,
+                    questions TEXT NOT NULL
+                ) ON COMMIT DROP
+            """)
+            cursor.copy_expert(
+                f"COPY exercise_import_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+            cursor.execute(MERGE_STAGED_EXERCISES)
+            ids = [row['id'] for row in cursor.fetchall()]
+            conn.commit()
+            return ids
+
+    def iter_import(self, records: Iterable[Tuple[int, Any]], skip: int = 0) -> Iterator[Dict[str, Any]]:
+        """
+        Import records, yielding progress after every committed batch
+
+        Args:
+            records: (record_no, record) pairs, e.g. from read_records
+            skip: Number of leading records already imported (to resume)
+
+        Yields:
+            Progress dictionaries; 'ids' holds the ids inserted by that batch
+            and 'processed' the last record number that is safely committed
+        """
+        started = time.monotonic()
+        progress = {
+            'processed': skip,
+            'inserted': 0,
+            'duplicates': 0,
+            'invalid': 0,
+            'errors': [],
+        }
+        seen_hashes = set()
+        batch: List[Tuple] = []
+        last_record_no = skip
+
+        def flush() -> Dict[str, Any]:
+            ids = self._load_batch(batch) if batch else []
+            progress['inserted'] += len(ids)
+            progress['duplicates'] += len(batch) - len(ids)
+            progress['processed'] = last_record_no
+            batch.clear()
+
+            elapsed = time.monotonic() - started
+            return dict(progress, ids=ids, elapsed_seconds=round(elapsed, 3),
+                        records_per_second=round((last_record_no - skip) / elapsed, 1) if elapsed else None)
+
+        for record_no, record in records:
+            if record_no <= skip:
+                continue
+            last_record_no = record_no
+
+            try:
+                row = validate_record(record)
+            except ValueError as e:
+                progress['invalid'] += 1
+                if len(progress['errors']) < MAX_REPORTED_ERRORS:
+                    progress['errors'].append({'record': record_no, 'error': str(e)})
+                continue
+
+            digest = content_hash(row[1])
+            if digest in seen_hashes:
+                progress['duplicates'] += 1
+                continue
+            seen_hashes.add(digest)
+
+            batch.append((record_no,) + row)
+            if len(batch) >= self.batch_size:
+                yield flush()
+
+        yield flush()
+
+    def run(self, records: Iterable[Tuple[int, Any]], skip: int = 0,
+            on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """
+        Import records and return the final summary
+
+        Args:
+            records: (record_no, record) pairs, e.g. from read_records
+            skip: Number of leading records already imported (to resume)
+            on_progress: Called with the progress dictionary after each batch
+
+        Returns:
+            Summary with counts and all inserted 'ids'
+        """
+        ids: List[int] = []
+        summary: Dict[str, Any] = {}
+        for summary in self.iter_import(records, skip):
+            ids.extend(summary['ids'])
+            if on_progress:
+                on_progress(summary)
+        return dict(summary, ids=ids)
+
+
+def _checkpoint_path(path: str) -> str:
+    return f"{path}.import-checkpoint"
+
+
+def _load_checkpoint(path: str) -> int:
+    """Return the number of records a previous run of this file committed"""
+    try:
+        with open(_checkpoint_path(path)) as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return 0
+
+    if checkpoint.get('size') != os.path.getsize(path):
+        logger.warning("Source file changed since the checkpoint was written; starting over")
+        return 0
+    return int(checkpoint.get('processed', 0))
+
+
+def _save_checkpoint(path: str, processed: int) -> None:
+    tmp_path = _checkpoint_path(path) + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'size': os.path.getsize(path), 'processed': processed}, f)
+    os.replace(tmp_path, _checkpoint_path(path))
+
+
+def import_file(path: str, fmt: Optional[str] = None, batch_size: int = IMPORT_BATCH_SIZE,
+                resume: bool = False) -> Dict[str, Any]:
+    """
+    Import exercises from a JSONL or CSV file, checkpointing after each batch
+
+    Args:
+        path: Source file
+        fmt: 'jsonl' or 'csv' (default: from the file extension)
+        batch_size: Records per COPY batch
+        resume: Continue after the records committed by a previous run
+
+    Returns:
+        Import summary
+    """
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    skip = _load_checkpoint(path) if resume else 0
+    if skip:
+        print(f"↩️  Resuming after record {skip}")
+
+    def report(progress: Dict[str, Any]) -> None:
+        _save_checkpoint(path, progress['processed'])
+        print(f"📦 {progress['processed']} records: {progress['inserted']} inserted, "
+              f"{progress['duplicates']} duplicates, {progress['invalid']} invalid "
+              f"({progress['records_per_second'] or 0:.0f} records/s)")
+
+    with open(path, newline='', encoding='utf-8') as stream:
+        summary = ExerciseImporter(batch_size).run(read_records(stream, fmt), skip=skip, on_progress=report)
+
+    os.remove(_checkpoint_path(path))
+    return summary
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Bulk import exercises into PostgreSQL")
+    parser.add_argument('path', help="JSONL or CSV file")
+    parser.add_argument('--format', choices=IMPORT_FORMATS, help="Input format (default: from extension)")
+    parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE, help="Records per COPY batch")
+    parser.add_argument('--resume', action='store_true', help="Continue from the last checkpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    summary = import_file(args.path, args.format, args.batch_size, args.resume)
+
+    print(f"\n✅ Imported {summary['inserted']} exercises "
+          f"({summary['duplicates']} duplicates, {summary['invalid']} invalid) "
+          f"in {summary['elapsed_seconds']:.1f}s")
+    for error in summary['errors']:
+        print(f"❌ Record {error['record']}: {error['error']}")
+    return 0 if not summary['invalid'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,341 @@
+"""
+Exercise catalog helpers for NoSubvo
+Validation of exercises on write and filtered/paginated catalog queries
+"""
+
+import re
+import json
+import base64
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from psycopg2.extras import Json
+
+from database import execute_query, SEARCH_CONFIGS, TRIGRAM_SEARCH_LANGUAGES
+
+logger = logging.getLogger(__name__)
+
+# Page size limits for catalog listings
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Large columns that listings only return when asked for with ?fields=
+OPTIONAL_LIST_FIELDS = ('text', 'questions')
+
+# Longest accepted search query
+MAX_SEARCH_QUERY_LENGTH = 200
+
+# ts_headline options for search result snippets
+SNIPPET_OPTIONS = 'MaxFragments=2, MaxWords=20, MinWords=8, StartSel=<mark>, StopSel=</mark>'
+
+# Characters of context around a substring match in trigram search snippets
+SNIPPET_CONTEXT_CHARS = 60
+
+# Whitespace collapsed before hashing passage text (ASCII only, as in SQL)
+_WHITESPACE_RUN = re.compile(r'[ \t\n\r\f\v]+')
+
+# Scripts written without spaces between words (Han, kana, Hangul, Thai)
+_UNSEGMENTED_SCRIPT = re.compile(r'[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af\u0e00-\u0e7f]')
+
+
+def validate_questions(questions: Any) -> List[Dict[str, Any]]:
+    """
+    Validate comprehension questions before they are stored
+
+    Questions are validated once here, at write time; reads hand the stored
+    JSONB straight back to the client without re-checking it.
+
+    Args:
+        questions: List of question objects, or a JSON string encoding one
+
+    Returns:
+        The validated list of questions
+
+    Raises:
+        ValueError: If the questions are malformed
+    """
+    if isinstance(questions, (str, bytes)):
+        try:
+            questions = json.loads(questions)
+        except ValueError as e:
+            raise ValueError(f"Questions are not valid JSON: {e}")
+
+    if not isinstance(questions, list) or not questions:
+        raise ValueError("Questions must be a non-empty list")
+
+    for index, question in enumerate(questions, 1):
+        if not isinstance(question, dict):
+            raise ValueError(f"Question {index} must be an object")
+
+        if not isinstance(question.get('question'), str) or not question['question'].strip():
+            raise ValueError(f"Question {index} is missing its 'question' text")
+
+        options = question.get('options')
+        if not isinstance(options, (list, dict)) or not options:
+            raise ValueError(f"Question {index} must have a non-empty 'options' list or object")
+
+        if 'answer' not in question and 'correct_answer' not in question:
+            raise ValueError(f"Question {index} is missing its 'answer'")
+
+    return questions
+
+
+def questions_param(questions: Any) -> Json:
+    """
+    Validate questions and adapt them for a JSONB query parameter
+
+    Args:
+        questions: List of question objects, or a JSON string encoding one
+
+    Returns:
+        psycopg2 Json adapter
+    """
+    return Json(validate_questions(questions))
+
+
+def content_hash(text: str) -> str:
+    """
+    Fingerprint a passage for duplicate detection
+
+    Runs of ASCII whitespace are collapsed so reformatted copies of a passage
+    hash the same. Must match the exercise_content_hash() SQL function.
+
+    Args:
+        text: Exercise text
+
+    Returns:
+        Hex MD5 digest
+    """
+    normalized = _WHITESPACE_RUN.sub(' ', text).strip(' ')
+    return hashlib.md5(normalized.encode('utf-8')).hexdigest()
+
+
+def exercise_filter_conditions(language: Optional[str] = None, difficulty: Optional[str] = None,
+                               topic: Optional[str] = None, alias: str = 'exercises') -> Tuple[List[str], List[Any]]:
+    """
+    Build WHERE conditions that filter exercises by metadata code
+
+    Codes are resolved to lookup keys inside the query so the conditions can
+    use the (language_id, difficulty_id, topic_id, id) index.
+
+    Args:
+        language: Language code filter
+        difficulty: Difficulty code filter
+        topic: Topic code filter
+        alias: Table alias the conditions refer to
+
+    Returns:
+        Tuple of (conditions, params)
+    """
+    conditions = []
+    params = []
+
+    if language:
+        conditions.append(f"{alias}.language_id = (SELECT id FROM exercise_languages WHERE code = %s)")
+        params.append(language)
+
+    if difficulty:
+        conditions.append(f"{alias}.difficulty_id = (SELECT id FROM exercise_difficulties WHERE code = %s)")
+        params.append(difficulty)
+
+    if topic:
+        conditions.append(f"{alias}.topic_id = (SELECT id FROM exercise_topics WHERE code = %s)")
+        params.append(topic)
+
+    return conditions, params
+
+
+def encode_cursor(**position: Any) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    return base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str], **types: type) -> Optional[Dict[str, Any]]:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Args:
+        cursor: Cursor string from a previous page
+        **types: Expected keys and their types, e.g. id=int
+
+    Returns:
+        The decoded position, or None for the first page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return {key: cast(position[key]) for key, cast in types.items()}
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def list_exercises(language: Optional[str] = None, difficulty: Optional[str] = None,
+                   topic: Optional[str] = None, cursor: Optional[str] = None,
+                   limit: int = DEFAULT_PAGE_SIZE, fields: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """
+    List exercises in id order with keyset pagination
+
+    Each page continues from the last id of the previous one (WHERE id > last),
+    so the cost depends on the page size rather than the page's position, and
+    cursors stay valid while exercises are added.
+
+    Args:
+        language: Language code filter
+        difficulty: Difficulty code filter
+        topic: Topic code filter
+        cursor: Cursor from the previous page's next_cursor
+        limit: Page size (capped at MAX_PAGE_SIZE)
+        fields: Optional large fields to include ('text', 'questions')
+
+    Returns:
+        Dictionary with 'exercises' and 'next_cursor' (None on the last page)
+
+    Raises:
+        ValueError: If the cursor or fields are invalid
+    """
+    unknown_fields = set(fields) - set(OPTIONAL_LIST_FIELDS)
+    if unknown_fields:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown_fields))}")
+
+    limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+    position = decode_cursor(cursor, id=int)
+    after_id = position['id'] if position else 0
+
+    conditions, params = exercise_filter_conditions(language, difficulty, topic, alias='e')
+    conditions.append("e.id > %s")
+    params.append(after_id)
+
+    columns = ["e.id", "e.title", "l.code AS language", "d.code AS difficulty", "t.code AS topic"]
+    columns += [f"e.{field}" for field in OPTIONAL_LIST_FIELDS if field in fields]
+
+    # Fetch one extra row to learn whether another page follows
+    rows = execute_query(f"""
+        SELECT {', '.join(columns)}
+        FROM exercises e
+        JOIN exercise_languages l ON l.id = e.language_id
+        JOIN exercise_difficulties d ON d.id = e.difficulty_id
+        JOIN exercise_topics t ON t.id = e.topic_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY e.id
+        LIMIT %s
+    """, tuple(params) + (limit + 1,), fetch=True) or []
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        'exercises': rows,
+        'next_cursor': encode_cursor(id=rows[-1]['id']) if has_more else None
+    }
+
+
+def _search_strategy(query: str, language: Optional[str]) -> Tuple[str, List[Any], str, List[Any], str, List[Any]]:
+    """
+    Build the match, rank and snippet SQL for a search
+
+    Returns:
+        Tuple of (match_sql, match_params, rank_sql, rank_params, snippet_sql, snippet_params)
+    """
+    if language in TRIGRAM_SEARCH_LANGUAGES or (not language and _UNSEGMENTED_SCRIPT.search(query)):
+        # Substring match served by the pg_trgm indexes; earlier matches and title matches rank higher
+        pattern = '%' + re.sub(r'([\\%_])', r'\\\1', query) + '%'
+        return (
+            "(e.title ILIKE %s OR e.text ILIKE %s)", [pattern, pattern],
+            "((e.title ILIKE %s)::int + CASE WHEN strpos(lower(e.text), lower(%s)) > 0 "
+            "THEN 1.0 / (1 + strpos(lower(e.text), lower(%s))) ELSE 0 END)::real", [pattern, query, query],
+            "substr(e.text, greatest(strpos(lower(e.text), lower(%s)) - %s, 1), %s)",
+            [query, SNIPPET_CONTEXT_CHARS, 2 * SNIPPET_CONTEXT_CHARS + len(query)]
+        )
+
+    if language:
+        tsquery_sql = "websearch_to_tsquery(exercise_search_config(%s), %s)"
+        tsquery_params = [language, query]
+    else:
+        # One tsquery per configuration in use, OR-ed together so a single GIN scan covers every language
+        configs = sorted(set(SEARCH_CONFIGS.values()) | {'simple'})
+        tsquery_sql = "(" + " || ".join("websearch_to_tsquery(%s::regconfig, %s)" for _ in configs) + ")"
+        tsquery_params = [value for config in configs for value in (config, query)]
+
+    return (
+        f"e.search_vector @@ {tsquery_sql}", tsquery_params,
+        f"ts_rank(e.search_vector, {tsquery_sql})", tsquery_params,
+        f"ts_headline(exercise_search_config(l.code), e.text, {tsquery_sql}, %s)", tsquery_params + [SNIPPET_OPTIONS]
+    )
+
+
+def search_exercises(query: str, language: Optional[str] = None, difficulty: Optional[str] = None,
+                     topic: Optional[str] = None, cursor: Optional[str] = None,
+                     limit: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+    """
+    Search exercise titles and text, best matches first
+
+    Languages with a PostgreSQL text search configuration are matched on
+    the stemmed search_vector (GIN index); CJK and Vietnamese are matched by
+    substring through the pg_trgm indexes. Results are ordered by
+    (rank DESC, id) and paginated on that key, and snippets are only built
+    for the rows on the returned page.
+
+    Args:
+        query: Search terms (web search syntax: quotes, OR, -exclusions)
+        language: Language code filter, also selecting the text search configuration
+        difficulty: Difficulty code filter
+        topic: Topic code filter
+        cursor: Cursor from the previous page's next_cursor
+        limit: Page size (capped at MAX_PAGE_SIZE)
+
+    Returns:
+        Dictionary with 'exercises' (id, title, metadata, rank, snippet) and 'next_cursor'
+
+    Raises:
+        ValueError: If the query or cursor is invalid
+    """
+    query = (query or '').strip()
+    if not query:
+        raise ValueError("Search query is required")
+    if len(query) > MAX_SEARCH_QUERY_LENGTH:
+        raise ValueError(f"Search query must be at most {MAX_SEARCH_QUERY_LENGTH} characters")
+
+    limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+    position = decode_cursor(cursor, rank=float, id=int)
+
+    match_sql, match_params, rank_sql, rank_params, snippet_sql, snippet_params = _search_strategy(query, language)
+
+    conditions, params = exercise_filter_conditions(language, difficulty, topic, alias='e')
+    conditions.append(match_sql)
+    params += match_params
+
+    if position:
+        conditions.append(f"({rank_sql} < %s::real OR ({rank_sql} = %s::real AND e.id > %s))")
+        params += rank_params + [position['rank']] + rank_params + [position['rank'], position['id']]
+
+    rows = execute_query(f"""
+        WITH page AS (
+            SELECT e.id, {rank_sql} AS rank
+            FROM exercises e
+            WHERE {' AND '.join(conditions)}
+            ORDER BY rank DESC, e.id
+            LIMIT %s
+        )
+        SELECT p.id, e.title, l.code AS language, d.code AS difficulty, t.code AS topic,
+               p.rank, {snippet_sql} AS snippet
+        FROM page p
+        JOIN exercises e ON e.id = p.id
+        JOIN exercise_languages l ON l.id = e.language_id
+        JOIN exercise_difficulties d ON d.id = e.difficulty_id
+        JOIN exercise_topics t ON t.id = e.topic_id
+        ORDER BY p.rank DESC, p.id
+    """, tuple(rank_params + params + [limit + 1] + snippet_params), fetch=True) or []
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        'exercises': rows,
+        'next_cursor': encode_cursor(rank=rows[-1]['rank'], id=rows[-1]['id']) if has_more else None
+    }
@@ -0,0 +1,79 @@
+"""
+Production server configuration for NoSubvo
+gunicorn pre-fork settings: the app is loaded once in the master and shared copy-on-write by the workers
+
+The master imports the app, runs backend.warm_up() (spaCy model,
+catalog statistics cache) and freezes the garbage collector before it
+forks, so every worker starts from those pages instead of loading its
+own copy. Workers are recycled after GUNICORN_MAX_REQUESTS requests;
+replacements fork from the warm master and are ready immediately.
+
+With NLP_WORKERS set, chunking runs in NLP worker processes owned by each
+web worker (see nlp_pool.py). Processes cannot be shared across fork, so
+the master skips the model and every web worker starts and warms its own
+pool after it is forked; size WEB_CONCURRENCY x NLP_WORKERS to the CPUs.
+
+Usage:
+    gunicorn -c gunicorn.conf.py backend:app                      # Flask (threaded workers)
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker \\
+        gunicorn -c gunicorn.conf.py asgi:app                     # ASGI mode
+
+    kill -HUP <master pid>     # graceful restart of all workers (new settings)
+    kill -USR2 <master pid>    # start a new master with new code, then QUIT the old one
+"""
+
+import gc
+import os
+import multiprocessing
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5001')
+
+# Worker processes: parse text in parallel (spaCy holds the GIL); threads: overlap DB/OpenAI waits.
+# Any worker can serve any client: login sessions are kept in PostgreSQL (session_store.py)
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+# Load the app in the master so workers share it copy-on-write
+preload_app = True
+
+# Recycle workers to bound memory growth (spaCy's string store only grows)
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10))
+
+# OpenAI question generation can take tens of seconds
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Heartbeat files in memory rather than on disk
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+
+
+def when_ready(server):
+    """Runs in the master after the app is loaded, before the first worker is forked"""
+    from database import close_pools
+    from backend import warm_up, readiness
+
+    # Load the model and catalog caches once, here; forked workers start ready
+    warm_up(start_nlp_workers=False)
+    if not readiness["database"]:
+        server.log.warning("Database not ready; workers will retry on first use (see GET /ready)")
+
+    # Connections must not be shared across fork; each worker opens its own
+    close_pools()
+
+    # Keep the collector from writing to (and so copying) the preloaded objects' pages
+    gc.freeze()
+    server.log.info("App preloaded; forking workers")
+
+
+def post_worker_init(worker):
+    """Runs in each worker after it is forked: start its NLP worker processes (NLP_WORKERS)"""
+    from nlp_pool import nlp_workers
+    from backend import start_warm_up
+
+    if nlp_workers.enabled:
+        start_warm_up()
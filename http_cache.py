@@ -0,0 +1,128 @@
+"""
+HTTP caching for NoSubvo read endpoints
+Adds strong ETags, Last-Modified handling, 304 responses and Cache-Control headers
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Optional, Tuple, NamedTuple
+
+from flask import Flask, Response, current_app, request
+
+logger = logging.getLogger(__name__)
+
+
+class CachePolicy(NamedTuple):
+    """Cache-Control settings attached to a view with @cache_policy"""
+    max_age: int
+    public: bool
+    must_revalidate: bool
+
+
+def cache_policy(max_age: int = 0, public: bool = True, must_revalidate: bool = False):
+    """
+    Mark a GET view as cacheable
+
+    Responses from the view get Cache-Control from the policy, a strong
+    content-hash ETag unless the view already set one, and are turned into
+    304 Not Modified when the request's validators match.
+
+    Args:
+        max_age: Seconds browsers and CDNs may reuse the response without revalidating
+        public: Whether shared caches (CDNs, proxies) may store the response
+        must_revalidate: Forbid serving the response stale once max_age has passed
+    """
+    def decorator(view):
+        view.cache_policy = CachePolicy(max_age, public, must_revalidate)
+        return view
+    return decorator
+
+
+def to_utc(moment: datetime) -> datetime:
+    """An aware datetime in UTC; naive datetimes are taken to be UTC already"""
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def validators_from_timestamp(key, updated_at: Optional[datetime]) -> Tuple[str, Optional[datetime]]:
+    """
+    Build a strong ETag and Last-Modified value for a row
+
+    Args:
+        key: Row identifier (e.g. exercise id)
+        updated_at: The row's updated_at timestamp, time zone aware (select
+            TIMESTAMP columns AT TIME ZONE current_setting('TimeZone')) or UTC
+
+    Returns:
+        Tuple of (etag, last_modified in UTC)
+    """
+    if updated_at is None:
+        return f"{key}-0", None
+    updated_at = to_utc(updated_at)
+    return f"{key}-{int(updated_at.timestamp() * 1000000)}", updated_at.replace(microsecond=0)
+
+
+def not_modified(etag: Optional[str] = None, last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """
+    Short-circuit a view when the client's cached copy is still current
+
+    Use this when validators are cheaper to compute than the response body.
+
+    Args:
+        etag: Strong ETag of the current representation
+        last_modified: Last modification time of the current representation
+
+    Returns:
+        A 304 response if the request's validators match, otherwise None
+    """
+    if etag and request.if_none_match:
+        matched = request.if_none_match.contains(etag)
+    elif last_modified and request.if_modified_since:
+        matched = to_utc(last_modified).replace(microsecond=0) <= to_utc(request.if_modified_since)
+    else:
+        return None
+
+    if not matched:
+        return None
+
+    response = current_app.response_class(status=304)
+    if etag:
+        response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    return response
+
+
+def apply_cache_headers(response: Response) -> Response:
+    """after_request hook that applies the view's CachePolicy"""
+    if request.method not in ('GET', 'HEAD') or response.status_code not in (200, 304):
+        return response
+
+    view = current_app.view_functions.get(request.endpoint)
+    policy = getattr(view, 'cache_policy', None)
+    if policy is None:
+        return response
+
+    if 'Cache-Control' not in response.headers:
+        response.cache_control.public = policy.public
+        response.cache_control.private = not policy.public
+        response.cache_control.max_age = policy.max_age
+        response.cache_control.must_revalidate = policy.must_revalidate
+
+    if response.status_code == 200 and not response.is_streamed:
+        if not response.get_etag()[0]:
+            response.add_etag()
+        response.make_conditional(request)
+
+    return response
+
+
+def init_http_cache(app: Flask) -> None:
+    """
+    Register the caching hook on a Flask app
+
+    Args:
+        app: Flask application
+    """
+    app.after_request(apply_cache_headers)
@@ -0,0 +1,300 @@
+"""
+NLP worker pool for NoSubvo
+Runs spaCy chunking in separate worker processes so parsing never holds a web process's GIL
+
+Each web process (gunicorn worker, python backend.py, asgi.py) owns a
+pool of NLP_WORKERS processes. Requests wait in a bounded queue: when
+NLP_QUEUE_SIZE texts are already waiting or being parsed, chunk_packed() fails
+right away with NLPOverloaded (the /chunk route answers 503) instead of
+letting work pile up behind a large upload. Every request has a deadline;
+the caller stops waiting when it passes, and workers skip texts whose
+deadline is already gone. Small texts arriving within NLP_BATCH_WAIT_MS
+of each other go to a worker together and are parsed in one nlp.pipe()
+call.
+
+NLP_WORKERS=0, the default when it is not set, chunks in the calling
+thread instead; env_template.txt sets 2, so deployments configured from
+it use worker processes.
+
+Worker processes only import this module and chunker: the parent's main
+script (python backend.py, asgi.py) is not run again in them.
+"""
+
+import os
+import sys
+import time
+import types
+import queue
+import logging
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import chunker
+
+logger = logging.getLogger(__name__)
+
+# Worker processes per web process (0 = chunk in the request thread)
+NLP_WORKERS = int(os.getenv('NLP_WORKERS', 0))
+# Texts waiting or being parsed before new requests are rejected
+NLP_QUEUE_SIZE = int(os.getenv('NLP_QUEUE_SIZE', 64))
+# Seconds a request waits for its chunks
+NLP_DEADLINE_SECONDS = float(os.getenv('NLP_DEADLINE_SECONDS', 10))
+# Batching: texts shorter than NLP_BATCH_MAX_CHARS are collected for up to
+# NLP_BATCH_WAIT_MS, up to NLP_BATCH_SIZE texts or NLP_BATCH_MAX_CHARS in total
+NLP_BATCH_WAIT_MS = float(os.getenv('NLP_BATCH_WAIT_MS', 5))
+NLP_BATCH_SIZE = int(os.getenv('NLP_BATCH_SIZE', 32))
+NLP_BATCH_MAX_CHARS = int(os.getenv('NLP_BATCH_MAX_CHARS', 5000))
+
+
+class NLPOverloaded(Exception):
+    """The NLP request queue is full; retry later"""
+
+
+class NLPDeadlineExceeded(TimeoutError):
+    """The text was not chunked before its deadline"""
+
+
+def _init_worker(warm_texts: List[str]) -> None:
+    """Load the pipeline in a new worker process and pay spaCy's first-call costs"""
+    chunker.get_nlp()
+    if warm_texts:
+        chunker.chunk_texts_packed(warm_texts)
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+@contextmanager
+def _main_script_hidden():
+    """
+    Spawn processes without the parent's main script
+
+    A spawned process runs the parent's __main__ script again (as
+    __mp_main__) before it takes work. Started from python backend.py that
+    would build the whole web app in every worker; the workers only need
+    this module and chunker, which unpickling their work imports.
+    """
+    main = sys.modules['__main__']
+    sys.modules['__main__'] = types.ModuleType('__main__')
+    try:
+        yield
+    finally:
+        sys.modules['__main__'] = main
+
+
+def _chunk_batch(texts: List[str], deadlines: List[float], profile: Union[str, chunker.ChunkingProfile, None],
+                 language: str) -> List[Optional[Tuple[bytes, Dict[str, float]]]]:
+    """Worker side: packed chunk offsets and stage timings of the texts whose deadline has not passed (None for the others)"""
+    now = time.time()
+    live = [i for i, deadline in enumerate(deadlines) if deadline > now]
+    results: List[Optional[Tuple[bytes, Dict[str, float]]]] = [None] * len(texts)
+    for i, result in zip(live, chunker.chunk_texts_packed((texts[i] for i in live), profile, language)):
+        results[i] = result
+    return results
+
+
+class _Job:
+    """One chunk_packed() call: its text, how to chunk it, absolute deadline (time.time()) and result"""
+    __slots__ = ('text', 'profile', 'language', 'deadline', 'future')
+
+    def __init__(self, text: str, profile: Union[str, chunker.ChunkingProfile, None], language: str, deadline: float):
+        self.text = text
+        self.profile = profile
+        self.language = language
+        self.deadline = deadline
+        self.future: Future = Future()
+
+
+class NLPWorkerPool:
+    """
+    Chunking in a pool of worker processes, with a bounded queue
+
+    Worker processes are spawned (not forked) so they never inherit the
+    web process's threads or locks, and are started on first use or by
+    start(). A pool created before a fork is not carried over: the child
+    starts its own on first use. A worker process that dies takes its
+    batch down with it (those requests fail) and the pool is replaced.
+    """
+
+    def __init__(self, workers: int = NLP_WORKERS, queue_size: int = NLP_QUEUE_SIZE,
+                 deadline_seconds: float = NLP_DEADLINE_SECONDS, batch_wait_ms: float = NLP_BATCH_WAIT_MS,
+                 batch_size: int = NLP_BATCH_SIZE, batch_max_chars: int = NLP_BATCH_MAX_CHARS):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.deadline_seconds = deadline_seconds
+        self.batch_wait = batch_wait_ms / 1000
+        self.batch_size = batch_size
+        self.batch_max_chars = batch_max_chars
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._spawned: List[Future] = []
+        self._pending: Optional[queue.SimpleQueue] = None
+        self._queued = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def _ensure_started(self, warm_texts: Iterable[str] = ()) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pid != os.getpid():
+                # Threads and worker processes do not survive fork: start over in this process
+                self._pid = os.getpid()
+                self._executor = None
+                self._queued = 0
+                self._pending = queue.SimpleQueue()
+                threading.Thread(target=self._run_batcher, args=(self._pending,), name='nlp-batcher', daemon=True).start()
+
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(list(warm_texts),)
+                )
+                # Each submit to a pool without an idle process spawns one: spawn them all now
+                with _main_script_hidden():
+                    self._spawned = [self._executor.submit(_ping) for _ in range(self.workers)]
+            return self._executor
+
+    def start(self, warm_texts: Iterable[str] = ()) -> None:
+        """
+        Start the worker processes and wait until they can take work
+
+        Args:
+            warm_texts: Texts every worker process chunks once after loading the model
+        """
+        started = time.monotonic()
+        self._ensure_started(warm_texts)
+        wait(self._spawned)
+        logger.info(f"NLP worker pool ready ({self.workers} processes) in {time.monotonic() - started:.2f}s")
+
+    def shutdown(self) -> None:
+        """Stop the worker processes; requests still queued fail, later ones start a new pool"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def status(self) -> dict:
+        """Pool size and current queue depth (for /ready)"""
+        return {
+            "workers": self.workers,
+            "queued": self._queued if self._pid == os.getpid() else 0,
+            "queue_size": self.queue_size,
+        }
+
+    def chunk_packed(self, text: str, profile: Union[str, chunker.ChunkingProfile, None] = None, language: str = 'en',
+                     deadline_seconds: Optional[float] = None) -> Tuple[bytes, Dict[str, float]]:
+        """
+        Chunk text in a worker process
+
+        Args:
+            text: Text to chunk
+            profile: Chunking profile (see chunker.register_profile)
+            language: Language of the text
+            deadline_seconds: How long to wait for the result (default NLP_DEADLINE_SECONDS)
+
+        Returns:
+            Packed chunk offsets (see chunker.pack_offsets) and stage timings in ms
+
+        Raises:
+            NLPOverloaded: NLP_QUEUE_SIZE texts are already waiting or being parsed
+            NLPDeadlineExceeded: The text was not chunked in time
+        """
+        self._ensure_started()
+        with self._lock:
+            if self._queued >= self.queue_size:
+                raise NLPOverloaded(f"NLP queue full ({self.queue_size} requests); retry later")
+            self._queued += 1
+
+        timeout = deadline_seconds or self.deadline_seconds
+        job = _Job(text, profile, language, time.time() + timeout)
+        # The slot is held until the work is done (or dropped), not until the caller gives up
+        job.future.add_done_callback(self._release)
+
+        if len(text) >= self.batch_max_chars:
+            self._submit([job])
+        else:
+            self._pending.put(job)
+
+        try:
+            return job.future.result(timeout=max(job.deadline - time.time(), 0))
+        except FutureTimeoutError:
+            raise NLPDeadlineExceeded(f"Chunking did not finish within {timeout:g}s") from None
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self._queued -= 1
+
+    def _run_batcher(self, pending: queue.SimpleQueue) -> None:
+        """Collect small texts into batches (one thread per process)"""
+        while True:
+            batch = [pending.get()]
+            chars = len(batch[0].text)
+            closes = time.monotonic() + self.batch_wait
+
+            while len(batch) < self.batch_size and chars < self.batch_max_chars:
+                try:
+                    job = pending.get(timeout=max(closes - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                batch.append(job)
+                chars += len(job.text)
+
+            self._submit(batch)
+
+    def _submit(self, jobs: List[_Job]) -> None:
+        """Send the jobs still within their deadline to a worker process, one batch per profile and language"""
+        now = time.time()
+        batches: Dict[Tuple[Union[str, chunker.ChunkingProfile, None], str], List[_Job]] = {}
+        for job in jobs:
+            if job.deadline <= now:
+                job.future.set_exception(NLPDeadlineExceeded("Deadline passed while queued"))
+            else:
+                batches.setdefault((job.profile, job.language), []).append(job)
+
+        for (profile, language), batch in batches.items():
+            try:
+                executor = self._ensure_started()
+                future = executor.submit(_chunk_batch, [job.text for job in batch], [job.deadline for job in batch],
+                                         profile, language)
+            except Exception as e:
+                self._fail(self._executor, batch, e)
+                continue
+            future.add_done_callback(lambda done, executor=executor, batch=batch: self._deliver(executor, batch, done))
+
+    def _deliver(self, executor: ProcessPoolExecutor, jobs: List[_Job], future: Future) -> None:
+        try:
+            results = future.result()
+        except Exception as e:
+            self._fail(executor, jobs, e)
+            return
+
+        for job, result in zip(jobs, results):
+            if result is None:
+                job.future.set_exception(NLPDeadlineExceeded("Deadline passed while queued"))
+            else:
+                job.future.set_result(result)
+
+    def _fail(self, executor: Optional[ProcessPoolExecutor], jobs: List[_Job], error: Exception) -> None:
+        if isinstance(error, BrokenProcessPool):
+            logger.error(f"NLP worker process died; starting a new pool: {error}")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+        else:
+            logger.error(f"NLP batch failed: {error}")
+
+        for job in jobs:
+            job.future.set_exception(error)
+
+
+# Shared by the routes of this process
+nlp_workers = NLPWorkerPool()
@@ -0,0 +1,295 @@
+"""
+Reading pace for NoSubvo
+Chunk sizes and per-chunk display times adapted to each reader's measured speed
+
+user_stats keeps exponentially weighted averages of every user's recent
+reading speed and comprehension, updated by trigger on each progress
+write (see database.create_user_stats_schema), so a reader's pace is one
+primary-key lookup however long their history is. Paces are cached per
+process for READING_PACE_TTL_SECONDS and dropped when the user's progress
+is recorded through this process; other web processes (gunicorn workers)
+pick up the new pace when their cached one expires. When user_stats can't be read the
+default pace is used (and not cached), so chunking keeps working while the
+database is unavailable.
+
+Faster readers get longer chunks (more words per fixation); a recent
+comprehension below COMPREHENSION_TARGET slows the pace used for sizing
+and timing. Display times share the time the text's words take at that
+pace between the chunks by their words and letters, and add a pause after
+clause and sentence punctuation. rsvp_schedule times single words the
+same way and adds where in each word the eye should rest.
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+
+import numpy
+import psycopg2
+
+from chunker import LANGUAGE_RULES, LanguageRules, base_language
+from database import execute_prepared, register_statement
+
+logger = logging.getLogger(__name__)
+
+# Pace for readers without measured attempts (and anonymous requests)
+DEFAULT_READING_WPM = float(os.getenv('DEFAULT_READING_WPM', 250))
+# Measured speeds are clamped to this range (typos, abandoned sessions)
+MIN_READING_WPM = 60.0
+MAX_READING_WPM = 1200.0
+# Comprehension below this slows the pace in proportion, down to half speed
+COMPREHENSION_TARGET = 0.7
+# Words per minute per word of chunk: 250 wpm reads 2.5-word chunks
+WPM_PER_CHUNK_WORD = 100.0
+MIN_CHUNK_WORDS = 1.0
+MAX_CHUNK_WORDS = 5.0
+# How long a cached pace is used before user_stats is read again
+READING_PACE_TTL_SECONDS = int(os.getenv('READING_PACE_TTL_SECONDS', 60))
+READING_PACE_CACHE_SIZE = 10000
+
+# Share of a chunk's time that follows its letters rather than its word count
+LETTER_WEIGHT = 0.5
+# Extra time after a chunk, in words: before a comma-like or a full stop-like mark
+CLAUSE_PAUSE_WORDS = 0.5
+SENTENCE_PAUSE_WORDS = 1.0
+MIN_CHUNK_MS = 120
+# Optimal recognition point by word length in letters (index 14: 14 or more)
+ORP_BY_LETTERS = numpy.array([0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 3, 3, 3, 3, 4], dtype=numpy.int64)
+
+# Character classes, looked up by code point (everything else, beyond the BMP too, is a letter)
+_LETTER, _SPACE, _CLAUSE_MARK, _SENTENCE_MARK, _OTHER_MARK = range(5)
+_CHAR_CLASSES = numpy.zeros(0x10000, dtype=numpy.uint8)
+for _chars, _class in ((' \t\r\f\v 　', _SPACE), (',;:–—、，；：', _CLAUSE_MARK),
+                       ('.!?\n…。！？', _SENTENCE_MARK), ('"\'()[]{}-/‘’“”«»「」', _OTHER_MARK)):
+    _CHAR_CLASSES[[ord(c) for c in _chars]] = _class
+
+register_statement('user_reading_pace', '''
+    SELECT recent_wpm, recent_comprehension FROM user_stats WHERE user_id = $1
+''')
+
+
+class ReadingPace(NamedTuple):
+    """The pace chunks are sized and timed for"""
+    wpm: float
+    target_words: float
+    max_words: float
+    # What it was derived from: 'measured' (user_stats), 'request' or 'default'
+    source: str
+    measured_wpm: Optional[float] = None
+    comprehension: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return self._asdict()
+
+
+def reading_pace(wpm: Optional[float] = None, comprehension: Optional[float] = None,
+                 source: str = 'measured') -> ReadingPace:
+    """
+    Pace for a reading speed and comprehension
+
+    Args:
+        wpm: Reading speed (None: DEFAULT_READING_WPM)
+        comprehension: Recent comprehension score 0-1, if known
+        source: Recorded in the pace ('measured', 'request')
+
+    Returns:
+        ReadingPace
+    """
+    # Non-finite values (NaN from a bad progress record) count as unknown
+    if wpm is not None and not math.isfinite(wpm):
+        wpm = None
+    if comprehension is not None and not math.isfinite(comprehension):
+        comprehension = None
+    if not wpm:
+        source = 'default'
+    measured = wpm
+    wpm = min(max(wpm or DEFAULT_READING_WPM, MIN_READING_WPM), MAX_READING_WPM)
+    if comprehension is not None and comprehension < COMPREHENSION_TARGET:
+        wpm *= max(comprehension / COMPREHENSION_TARGET, 0.5)
+
+    target_words = min(max(wpm / WPM_PER_CHUNK_WORD, MIN_CHUNK_WORDS), MAX_CHUNK_WORDS)
+    return ReadingPace(
+        wpm=round(wpm, 1),
+        target_words=round(target_words, 1),
+        max_words=float(math.ceil(target_words) + 2),
+        source=source,
+        measured_wpm=round(measured, 1) if measured else None,
+        comprehension=round(comprehension, 3) if comprehension is not None else None
+    )
+
+
+class ReadingPaceCache:
+    """Per-process LRU of users' paces, loaded from user_stats"""
+
+    def __init__(self, ttl_seconds: int = READING_PACE_TTL_SECONDS, max_entries: int = READING_PACE_CACHE_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[int, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> ReadingPace:
+        """
+        A user's current pace
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            ReadingPace (the default pace until the user has attempts, or
+            when user_stats can't be read)
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl_seconds:
+                self._entries.move_to_end(user_id)
+                return entry[0]
+
+        try:
+            rows = execute_prepared('user_reading_pace', (user_id,), fetch=True)
+        except psycopg2.Error as e:
+            logger.warning(f"Reading pace of user {user_id} unavailable, using the default: {e}")
+            return reading_pace()
+        row = rows[0] if rows else {}
+        pace = reading_pace(row.get('recent_wpm'), row.get('recent_comprehension'))
+
+        with self._lock:
+            self._entries[user_id] = (pace, time.monotonic())
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return pace
+
+    def invalidate(self, user_id: int) -> None:
+        """Forget a user's pace (after recording their progress)"""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+def _prefix_counts(mask: numpy.ndarray) -> numpy.ndarray:
+    """counts[i] = number of set entries before position i"""
+    counts = numpy.zeros(len(mask) + 1, dtype=numpy.int64)
+    numpy.cumsum(mask, out=counts[1:])
+    return counts
+
+
+class _TextLayout:
+    """Character classes of a text and the (start, end) spans shown one at a time, as numpy arrays"""
+
+    def __init__(self, text: str, offsets: array):
+        bounds = numpy.frombuffer(offsets, dtype=numpy.uint32).astype(numpy.int64)
+        self.starts, self.ends = bounds[0::2], bounds[1::2]
+
+        codes = numpy.frombuffer(text.encode('utf-32-le'), dtype=numpy.uint32)
+        classes = _CHAR_CLASSES[numpy.minimum(codes, 0xFFFF)]
+        self.length = len(codes)
+        # Newlines end sentences (headings, list items) and separate words
+        self.is_sentence = classes == _SENTENCE_MARK
+        self.is_space = (classes == _SPACE) | (codes == 10)
+        self.is_clause = classes == _CLAUSE_MARK
+        is_letter = classes == _LETTER
+        self.letter_positions = numpy.flatnonzero(is_letter)
+        self.letters = _prefix_counts(is_letter)
+        self.span_letters = self.letters[self.ends] - self.letters[self.starts]
+
+    def last_letters(self) -> numpy.ndarray:
+        """Position just after each span's last letter (its start when it has none)"""
+        found = numpy.searchsorted(self.letter_positions, self.ends) - 1
+        last = numpy.where(found >= 0, numpy.append(self.letter_positions, -1)[found] + 1, 0)
+        return numpy.maximum(last, self.starts)
+
+
+def _durations(layout: _TextLayout, wpm: float, language: str) -> numpy.ndarray:
+    starts, ends = layout.starts, layout.ends
+    span_letters = layout.span_letters.astype(numpy.float64)
+
+    rules = LANGUAGE_RULES.get(base_language(language), LanguageRules())
+    if rules.chars_per_word:
+        span_words = numpy.maximum(span_letters / rules.chars_per_word, 1.0)
+    else:
+        # A word starts at each non-space character after a space; the span's first character starts one too
+        word_starts = numpy.zeros(layout.length, dtype=bool)
+        word_starts[1:] = ~layout.is_space[1:] & layout.is_space[:-1]
+        starts_before = _prefix_counts(word_starts)
+        span_words = (1 + starts_before[ends] - starts_before[numpy.minimum(starts + 1, ends)]).astype(numpy.float64)
+
+    letters_per_word = span_letters.sum() / span_words.sum() or 1.0
+    weights = (1 - LETTER_WEIGHT) * span_words + LETTER_WEIGHT * span_letters / letters_per_word
+
+    # Punctuation after the span's last letter, up to the next span
+    pause_from = layout.last_letters()
+    pause_to = numpy.empty_like(ends)
+    pause_to[:-1] = starts[1:]
+    pause_to[-1] = layout.length
+    pause_to = numpy.maximum(pause_to, pause_from)
+    sentences = _prefix_counts(layout.is_sentence)
+    clauses = _prefix_counts(layout.is_clause)
+    ends_sentence = sentences[pause_to] > sentences[pause_from]
+    ends_clause = clauses[pause_to] > clauses[pause_from]
+    weights += numpy.where(ends_sentence, SENTENCE_PAUSE_WORDS, numpy.where(ends_clause, CLAUSE_PAUSE_WORDS, 0.0))
+
+    ms_per_word = 60000.0 / wpm
+    durations = numpy.maximum(weights * ms_per_word, min(MIN_CHUNK_MS, ms_per_word))
+    return numpy.rint(durations).astype(numpy.uint32)
+
+
+def chunk_durations(text: str, offsets: array, wpm: float, language: str = 'en') -> numpy.ndarray:
+    """
+    Display time of each chunk at a reading speed
+
+    The time the text's words take at wpm is shared out by each chunk's
+    words and letters (a chunk of long words stays up longer than one of
+    short words), then a pause is added after chunks followed by clause or
+    sentence punctuation. Computed over the whole text at once.
+
+    Args:
+        text: Chunked text
+        offsets: Chunk (or word) character offsets (see chunker.chunk_offsets)
+        wpm: Reading speed
+        language: Language of the text (scripts without spaces count letters as words)
+
+    Returns:
+        Milliseconds per chunk (uint32)
+    """
+    if not len(offsets):
+        return numpy.zeros(0, dtype=numpy.uint32)
+    return _durations(_TextLayout(text, offsets), wpm, language)
+
+
+def rsvp_schedule(text: str, offsets: array, wpm: float, language: str = 'en') -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Word-at-a-time (RSVP) schedule: display times as chunk_durations, and
+    each word's optimal recognition point, the character the reader's eye
+    is held on (slightly left of the middle, after leading punctuation)
+
+    Args:
+        text: Text
+        offsets: Word character offsets (see chunker.word_offsets)
+        wpm: Reading speed
+        language: Language of the text
+
+    Returns:
+        (milliseconds per word (uint32), recognition point offset within each word (uint8))
+    """
+    if not len(offsets):
+        return numpy.zeros(0, dtype=numpy.uint32), numpy.zeros(0, dtype=numpy.uint8)
+
+    layout = _TextLayout(text, offsets)
+    # The recognition point is the word's n-th letter, n by its letter count
+    nth = ORP_BY_LETTERS[numpy.minimum(layout.span_letters, len(ORP_BY_LETTERS) - 1)]
+    letter = numpy.append(layout.letter_positions, 0)[layout.letters[layout.starts] + nth]
+    orp = numpy.where(layout.span_letters > 0, letter - layout.starts, 0)
+    return _durations(layout, wpm, language), numpy.minimum(orp, 0xFF).astype(numpy.uint8)
+
+
+def pack_durations(durations: numpy.ndarray) -> bytes:
+    """Durations as little-endian uint16 milliseconds (capped at 65535), 2 bytes each"""
+    return numpy.minimum(durations, 0xFFFF).astype('<u2').tobytes()
+
+
+# Shared by the routes of this process
+reading_paces = ReadingPaceCache()
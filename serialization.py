@@ -0,0 +1,226 @@
+"""
+Response serialization and compression for NoSubvo
+Fast JSON encoding (orjson when installed, stdlib json otherwise) and gzip/brotli negotiation
+"""
+
+import os
+import re
+import gzip
+import json
+import uuid
+import decimal
+import dataclasses
+import threading
+import logging
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Optional
+
+from flask import Flask, Response, current_app, request
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Responses smaller than this are sent uncompressed
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 5))
+
+# Number of compressed bodies kept per ETag for cached catalog responses
+COMPRESSED_CACHE_SIZE = int(os.getenv('COMPRESSED_CACHE_SIZE', 512))
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript'}
+
+# Compressed variants get "<etag>-<encoding>" so each representation keeps a strong ETag
+_ETAG_ENCODING_SUFFIX = re.compile(r'-(?:gzip|br)"')
+
+
+def _default(o: Any) -> Any:
+    """Serialize the types Flask's default provider supports, with the same output"""
+    if isinstance(o, date):
+        return http_date(o)
+
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+
+    if dataclasses.is_dataclass(o):
+        return dataclasses.asdict(o)
+
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(obj: Any) -> bytes:
+        """Serialize obj to compact UTF-8 JSON bytes"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+    def loads(data) -> Any:
+        """Parse JSON from str or bytes"""
+        return orjson.loads(data)
+else:
+    def dumps(obj: Any) -> bytes:
+        """Serialize obj to compact UTF-8 JSON bytes"""
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def loads(data) -> Any:
+        """Parse JSON from str or bytes"""
+        return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that routes jsonify() and request.json through dumps/loads"""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+
+def json_response(body: bytes, status: int = 200) -> Response:
+    """
+    Build a JSON response from already-serialized bytes
+
+    Args:
+        body: JSON bytes, e.g. precomputed for a cached catalog item
+        status: HTTP status code
+
+    Returns:
+        Flask response
+    """
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+
+class CompressedBodyCache:
+    """Small LRU of compressed bodies keyed by (ETag, encoding)"""
+
+    def __init__(self, max_entries: int = COMPRESSED_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[tuple, bytes]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key: tuple, body: bytes) -> None:
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+compressed_cache = CompressedBodyCache()
+
+
+def _negotiate_encoding() -> Optional[str]:
+    """Pick the best content coding the client accepts"""
+    accept = request.accept_encodings
+    if brotli is not None and accept['br']:
+        return 'br'
+    if accept['gzip']:
+        return 'gzip'
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _normalize_if_none_match() -> None:
+    """before_request hook: compare If-None-Match against the uncompressed ETag"""
+    header = request.environ.get('HTTP_IF_NONE_MATCH')
+    if header and _ETAG_ENCODING_SUFFIX.search(header):
+        request.environ['nosuvo.if_none_match'] = header
+        request.environ['HTTP_IF_NONE_MATCH'] = _ETAG_ENCODING_SUFFIX.sub('"', header)
+
+
+def compress_response(response: Response) -> Response:
+    """after_request hook that gzip/brotli-encodes large text responses"""
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    if response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers:
+        return response
+
+    encoding = _negotiate_encoding()
+    if encoding is None:
+        return response
+
+    etag, weak = response.get_etag()
+
+    if response.status_code == 304:
+        # Echo the encoded ETag the client revalidated with
+        original = request.environ.get('nosuvo.if_none_match')
+        if etag and original and f'"{etag}-{encoding}"' in original:
+            response.set_etag(f"{etag}-{encoding}", weak)
+        return response
+
+    if response.status_code != 200:
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_SIZE:
+        return response
+
+    cache_key = (etag, encoding) if etag else None
+    compressed = compressed_cache.get(cache_key) if cache_key else None
+    if compressed is None:
+        compressed = _compress(body, encoding)
+        if cache_key:
+            compressed_cache.put(cache_key, compressed)
+
+    if len(compressed) >= len(body):
+        return response
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+    return response
+
+
+def init_serialization(app: Flask) -> None:
+    """
+    Install the fast JSON provider and response compression on a Flask app
+
+    Call this before registering other after_request hooks (such as
+    init_http_cache): Flask runs after_request hooks in reverse order, so
+    compression then runs last, on the final uncompressed body.
+
+    Args:
+        app: Flask application
+    """
+    app.json = FastJSONProvider(app)
+    app.before_request(_normalize_if_none_match)
+    app.after_request(compress_response)
+    logger.debug(f"JSON encoder: {'orjson' if orjson is not None else 'json'}, "
+                 f"brotli: {'enabled' if brotli is not None else 'unavailable'}")
@@ -0,0 +1,133 @@
+"""
+Login sessions for NoSubvo
+Session tokens kept in PostgreSQL, so every web process knows every session
+
+gunicorn runs several worker processes (and uvicorn --workers several
+ASGI ones): a token issued by one of them has to be accepted by all the
+others, so sessions live in the user_sessions table rather than in
+process memory (see database.create_user_session_schema). Only a SHA-256
+digest of each token is stored; the token itself goes to the client.
+Sessions expire SESSION_LIFETIME_DAYS after login, and logging out
+deletes them.
+
+With read replicas, each session also records when its client last
+wrote (last_write_at). Any process serving the client's next request
+then reads from the primary while that write may still be replicating
+(REPLICA_STICKY_SECONDS), so the client sees its own changes whichever
+process served the write. Lookups are read from the primary for the same
+reason: a replica may not have the session, or its latest write, yet.
+"""
+
+import os
+import hashlib
+import secrets
+from typing import Any, Dict, List, Optional
+
+from database import db_config, execute_prepared, pin_reads_to_primary, register_statement
+
+# Days a session token stays valid after login
+SESSION_LIFETIME_DAYS = float(os.getenv('SESSION_LIFETIME_DAYS', 30))
+
+# A user's expired sessions are removed when they log in again. Logging in
+# (or registering) writes, so the session starts with a recorded write.
+register_statement('create_session', '''
+    WITH expired AS (
+        DELETE FROM user_sessions WHERE user_id = $2 AND expires_at <= CURRENT_TIMESTAMP
+    )
+    INSERT INTO user_sessions (token_hash, user_id, expires_at, last_write_at)
+    VALUES ($1, $2, CURRENT_TIMESTAMP + make_interval(secs => $3), CURRENT_TIMESTAMP)
+''')
+
+register_statement('user_by_session', '''
+    SELECT u.id AS user_id, u.username, u.email, u.preferred_language,
+           EXTRACT(EPOCH FROM CURRENT_TIMESTAMP - s.last_write_at)::float8 AS last_write_age
+    FROM user_sessions s
+    JOIN users u ON u.id = s.user_id
+    WHERE s.token_hash = $1 AND s.expires_at > CURRENT_TIMESTAMP
+''')
+
+register_statement('delete_session', 'DELETE FROM user_sessions WHERE token_hash = $1')
+
+register_statement('record_session_write', 'UPDATE user_sessions SET last_write_at = CURRENT_TIMESTAMP WHERE token_hash = $1')
+
+
+def token_digest(token: str) -> str:
+    """What user_sessions stores for a token"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class SessionStore:
+    """Create, look up and end login sessions"""
+
+    def __init__(self, lifetime_days: float = SESSION_LIFETIME_DAYS):
+        self.lifetime_seconds = lifetime_days * 86400
+
+    @staticmethod
+    def new_token() -> str:
+        """Generate a secure session token"""
+        return secrets.token_urlsafe(32)
+
+    def create(self, user_id: int) -> str:
+        """
+        Start a session for a user
+
+        Args:
+            user_id: User ID
+
+        Returns:
+            Session token for the client's Authorization: Bearer header
+        """
+        token = self.new_token()
+        execute_prepared('create_session', (token_digest(token), user_id, self.lifetime_seconds))
+        return token
+
+    def get(self, token: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        The user a session token belongs to
+
+        Args:
+            token: Session token (None or empty: no session)
+
+        Returns:
+            user_id, username, email and preferred_language, or None when
+            the token is unknown or expired
+        """
+        if not token:
+            return None
+
+        rows = execute_prepared('user_by_session', (token_digest(token),), fetch=True, primary=True)
+        return self.session_user(rows)
+
+    @staticmethod
+    def session_user(rows: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        The user of a user_by_session result, pinning the request's reads
+        to the primary while the client's last write may be replicating
+        """
+        if not rows:
+            return None
+
+        user = dict(rows[0])
+        last_write_age = user.pop('last_write_age')
+        if last_write_age is not None:
+            pin_reads_to_primary(db_config.replica_sticky_seconds - last_write_age)
+        return user
+
+    @staticmethod
+    def needs_write_recorded(token: Optional[str]) -> bool:
+        """Whether a write through this session has to be recorded (only replicas can lag)"""
+        return bool(token) and bool(db_config.replica_urls)
+
+    def record_write(self, token: Optional[str]) -> None:
+        """Note that the session's client just wrote, for the processes serving its next requests"""
+        if self.needs_write_recorded(token):
+            execute_prepared('record_session_write', (token_digest(token),))
+
+    def delete(self, token: Optional[str]) -> None:
+        """End a session (unknown tokens are ignored)"""
+        if token:
+            execute_prepared('delete_session', (token_digest(token),))
+
+
+# Shared by the routes of this process
+sessions = SessionStore()
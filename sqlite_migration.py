@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+SQLite to PostgreSQL migration engine for NoSubvo
+Streams exercises.db into PostgreSQL with COPY, in parallel, with checkpoints and checksum verification
+
+Usage:
+    python sqlite_migration.py                  # migrate exercises.db, then verify
+    python sqlite_migration.py --resume         # continue an interrupted migration
+    python sqlite_migration.py --verify-only
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from database import get_db_connection, get_db_cursor, init_database_schema
+from exercise_store import content_hash
+
+logger = logging.getLogger(__name__)
+
+# Rows read with fetchmany and loaded per COPY transaction
+MIGRATION_BATCH_SIZE = int(os.getenv('MIGRATION_BATCH_SIZE', 10000))
+
+# Tables migrated concurrently within one dependency level
+MIGRATION_WORKERS = int(os.getenv('MIGRATION_WORKERS', 2))
+
+
+class TableSpec(NamedTuple):
+    """How one SQLite table maps onto its PostgreSQL counterpart"""
+    name: str
+    # Columns read from SQLite (the first is the integer primary key)
+    source_columns: Tuple[str, ...]
+    # Target columns and the matching expressions over the TEXT staging row "s"
+    target_columns: Tuple[str, ...]
+    select_exprs: Tuple[str, ...]
+    # Identifies an already-migrated row "t" for staging row "s" (natural key)
+    match: str
+    # Source column -> parent table whose ids it references
+    references: Dict[str, str]
+    # Rows of this table are referenced by others, so id changes are recorded
+    remap: bool
+    # Tables in the same level are migrated in parallel; levels run in order
+    level: int
+
+
+TABLE_SPECS = (
+    TableSpec(
+        name='exercises',
+        source_columns=('id', 'title', 'text', 'language', 'difficulty', 'topic', 'questions',
+                        'created_at', 'updated_at'),
+        target_columns=('title', 'text', 'language_id', 'difficulty_id', 'topic_id', 'questions',
+                        'created_at', 'updated_at'),
+        select_exprs=('s.title', 's.text', 'exercise_language_id(s.language)',
+                      'exercise_difficulty_id(s.difficulty)', 'exercise_topic_id(s.topic)', 's.questions::jsonb',
+                      'COALESCE(s.created_at::timestamp, CURRENT_TIMESTAMP)',
+                      'COALESCE(s.updated_at::timestamp, CURRENT_TIMESTAMP)'),
+        match='t.content_hash = exercise_content_hash(s.text)',
+        references={},
+        remap=True,
+        level=0
+    ),
+    TableSpec(
+        name='users',
+        source_columns=('id', 'username', 'email', 'password_hash', 'preferred_language', 'created_at', 'last_login'),
+        target_columns=('username', 'email', 'password_hash', 'preferred_language', 'created_at', 'last_login'),
+        select_exprs=('s.username', 's.email', 's.password_hash', "COALESCE(s.preferred_language, 'en')",
+                      'COALESCE(s.created_at::timestamp, CURRENT_TIMESTAMP)',
+                      'COALESCE(s.last_login::timestamp, CURRENT_TIMESTAMP)'),
+        match='t.email = s.email',
+        references={},
+        remap=True,
+        level=0
+    ),
+    TableSpec(
+        name='user_progress',
+        source_columns=('id', 'user_id', 'exercise_id', 'status', 'comprehension_score', 'questions_answered',
+                        'questions_correct', 'reading_speed_wpm', 'session_duration_seconds',
+                        'created_at', 'completed_at'),
+        target_columns=('user_id', 'exercise_id', 'status', 'comprehension_score', 'questions_answered',
+                        'questions_correct', 'reading_speed_wpm', 'session_duration_seconds',
+                        'created_at', 'completed_at'),
+        select_exprs=('s.user_id::int', 's.exercise_id::int', "COALESCE(s.status, 'pending')",
+                      'COALESCE(s.comprehension_score::real, 0)', 'COALESCE(s.questions_answered::int, 0)',
+                      'COALESCE(s.questions_correct::int, 0)', 'COALESCE(s.reading_speed_wpm::real, 0)',
+                      'COALESCE(s.session_duration_seconds::int, 0)',
+                      'COALESCE(s.created_at::timestamp, CURRENT_TIMESTAMP)', 's.completed_at::timestamp'),
+        match='t.user_id = s.user_id::int AND t.exercise_id = s.exercise_id::int',
+        references={'user_id': 'users', 'exercise_id': 'exercises'},
+        remap=False,
+        level=1
+    ),
+    TableSpec(
+        name='user_queue',
+        source_columns=('id', 'user_id', 'exercise_id', 'queue_position', 'added_at'),
+        target_columns=('user_id', 'exercise_id', 'queue_position', 'added_at'),
+        select_exprs=('s.user_id::int', 's.exercise_id::int', 's.queue_position::int',
+                      'COALESCE(s.added_at::timestamp, CURRENT_TIMESTAMP)'),
+        match='t.user_id = s.user_id::int AND t.exercise_id = s.exercise_id::int',
+        references={'user_id': 'users', 'exercise_id': 'exercises'},
+        remap=False,
+        level=1
+    ),
+)
+
+# Per-row content compared by verify(): (SQLite query, PostgreSQL query); rows are
+# reduced to natural keys so the comparison holds even where ids were remapped
+CHECKSUM_QUERIES = {
+    'exercises': (
+        "SELECT text, COALESCE(NULLIF(language, ''), 'en') FROM exercises",
+        "SELECT text, language FROM exercise_details"
+    ),
+    'users': (
+        "SELECT email, username, password_hash FROM users",
+        "SELECT email, username, password_hash FROM users"
+    ),
+    'user_progress': (
+        """SELECT u.email, e.text, COALESCE(p.status, 'pending'), COALESCE(p.questions_answered, 0),
+                  COALESCE(p.questions_correct, 0)
+           FROM user_progress p JOIN users u ON u.id = p.user_id JOIN exercises e ON e.id = p.exercise_id""",
+        """SELECT u.email, e.text, p.status, p.questions_answered, p.questions_correct
+           FROM user_progress p JOIN users u ON u.id = p.user_id JOIN exercises e ON e.id = p.exercise_id"""
+    ),
+    'user_queue': (
+        """SELECT u.email, e.text, q.queue_position
+           FROM user_queue q JOIN users u ON u.id = q.user_id JOIN exercises e ON e.id = q.exercise_id""",
+        """SELECT u.email, e.text, q.queue_position
+           FROM user_queue q JOIN users u ON u.id = q.user_id JOIN exercises e ON e.id = q.exercise_id"""
+    ),
+}
+
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def copy_value(value: Any) -> str:
+    """Encode one value for COPY ... FROM STDIN in text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', 'replace')
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def copy_rows(rows: Iterable[Tuple]) -> io.StringIO:
+    """Encode rows as a COPY text-format buffer"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+
+def row_digest(values: Tuple, text_index: Optional[int] = None) -> bytes:
+    """
+    Digest one row for checksum comparison
+
+    Args:
+        values: Row values
+        text_index: Position of a passage text to reduce to its content hash
+
+    Returns:
+        16-byte MD5 digest
+    """
+    values = list(values)
+    if text_index is not None and values[text_index] is not None:
+        values[text_index] = content_hash(values[text_index])
+    canonical = '\x1f'.join('' if value is None else str(value) for value in values)
+    return hashlib.md5(canonical.encode('utf-8')).digest()
+
+
+class SQLiteMigration:
+    """
+    Copies the SQLite tables into PostgreSQL in bounded batches
+
+    Each table is read in primary-key order with fetchmany and each batch is
+    loaded with COPY into a temporary staging table and merged in its own
+    transaction, so memory stays flat and a checkpoint (last migrated id per
+    table) is written after every commit. Rows keep their SQLite id unless
+    PostgreSQL already uses it for something else; rows that already exist
+    (same passage, same email, same user/exercise pair) are matched instead
+    of duplicated, and references in child tables are rewritten accordingly.
+    """
+
+    def __init__(self, sqlite_path: str = 'exercises.db', batch_size: int = MIGRATION_BATCH_SIZE,
+                 workers: int = MIGRATION_WORKERS, checkpoint_path: Optional[str] = None):
+        self.sqlite_path = sqlite_path
+        self.batch_size = max(int(batch_size), 1)
+        self.workers = max(int(workers), 1)
+        self.checkpoint_path = checkpoint_path or f"{sqlite_path}.migration-checkpoint"
+
+        # Checkpoint state: last migrated source id per table, and for
+        # referenced tables the source ids that map elsewhere or were dropped
+        self.last_ids: Dict[str, int] = {}
+        self.id_maps: Dict[str, Dict[int, int]] = {}
+        self.dropped: Dict[str, Set[int]] = {}
+        self._lock = threading.Lock()
+
+    def _connect_sqlite(self) -> sqlite3.Connection:
+        """Open a read-only SQLite connection (one per thread)"""
+        return sqlite3.connect(f"file:{self.sqlite_path}?mode=ro", uri=True)
+
+    def _source_tables(self) -> Set[str]:
+        conn = self._connect_sqlite()
+        try:
+            return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        finally:
+            conn.close()
+
+    def load_checkpoint(self) -> None:
+        """Restore progress written by an earlier, interrupted run"""
+        try:
+            with open(self.checkpoint_path) as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        self.last_ids = {table: int(last_id) for table, last_id in checkpoint.get('last_ids', {}).items()}
+        self.id_maps = {table: {int(k): v for k, v in mapping.items()}
+                        for table, mapping in checkpoint.get('id_maps', {}).items()}
+        self.dropped = {table: set(ids) for table, ids in checkpoint.get('dropped', {}).items()}
+        logger.info(f"Resuming migration from checkpoint: {self.last_ids}")
+
+    def _save_checkpoint(self) -> None:
+        """Write the checkpoint atomically (caller holds the lock)"""
+        checkpoint = {
+            'last_ids': self.last_ids,
+            'id_maps': self.id_maps,
+            'dropped': {table: sorted(ids) for table, ids in self.dropped.items()},
+        }
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _reserve_ids(self, spec: TableSpec, source_max_id: int) -> None:
+        """Move the SERIAL sequence past every source id so new ids never collide with ones still to come"""
+        with get_db_cursor() as (cursor, conn):
+            cursor.execute(f"""
+                SELECT setval(pg_get_serial_sequence('{spec.name}', 'id'),
+                              GREATEST((SELECT COALESCE(MAX(id), 0) FROM {spec.name}), %s, 1))
+            """, (source_max_id,))
+            conn.commit()
+
+    def reset_sequences(self) -> None:
+        """Point every SERIAL sequence at its table's current MAX(id)"""
+        with get_db_cursor() as (cursor, conn):
+            for spec in TABLE_SPECS:
+                cursor.execute(f"""
+                    SELECT setval(pg_get_serial_sequence('{spec.name}', 'id'),
+                                  COALESCE(MAX(id), 1), MAX(id) IS NOT NULL)
+                    FROM {spec.name}
+                """)
+            conn.commit()
+
+    def _remap_row(self, spec: TableSpec, row: Tuple) -> Optional[Tuple]:
+        """Rewrite parent ids in a child row; None if its parent was dropped"""
+        if not spec.references:
+            return row
+
+        row = list(row)
+        for column, parent in spec.references.items():
+            index = spec.source_columns.index(column)
+            if row[index] in self.dropped.get(parent, ()):
+                return None
+            row[index] = self.id_maps.get(parent, {}).get(row[index], row[index])
+        return tuple(row)
+
+    def _merge_batch(self, spec: TableSpec, rows: List[Tuple]) -> int:
+        """COPY one batch into staging and merge it; returns rows inserted"""
+        staging = f"migration_{spec.name}"
+        columns = ', '.join(spec.target_columns)
+        exprs = ', '.join(spec.select_exprs)
+
+        conditions = [f"NOT EXISTS (SELECT 1 FROM {spec.name} t WHERE {spec.match})"]
+        for column, parent in spec.references.items():
+            conditions.append(f"EXISTS (SELECT 1 FROM {parent} p WHERE p.id = s.{column}::int)")
+        where = ' AND '.join(conditions)
+
+        with get_db_cursor() as (cursor, conn):
+            cursor.execute(f"""
+                CREATE TEMP TABLE {staging} ({', '.join(f'{c} TEXT' for c in spec.source_columns)})
+                ON COMMIT DROP
+            """)
+            cursor.copy_expert(f"COPY {staging} ({', '.join(spec.source_columns)}) FROM STDIN", copy_rows(rows))
+
+            # Keep the SQLite id where it is free...
+            cursor.execute(f"""
+                INSERT INTO {spec.name} (id, {columns})
+                SELECT s.id::int, {exprs} FROM {staging} s
+                WHERE {where}
+                ON CONFLICT DO NOTHING
+            """)
+            inserted = cursor.rowcount
+
+            # ...and give rows whose id is already taken by other data a new one
+            cursor.execute(f"""
+                INSERT INTO {spec.name} ({columns})
+                SELECT {exprs} FROM {staging} s
+                WHERE {where}
+                ON CONFLICT DO NOTHING
+            """)
+            inserted += cursor.rowcount
+
+            if spec.remap:
+                cursor.execute(f"""
+                    SELECT DISTINCT ON (s.id::int) s.id::int AS source_id, t.id AS target_id
+                    FROM {staging} s JOIN {spec.name} t ON {spec.match}
+                    ORDER BY s.id::int, t.id
+                """)
+                matched = {row['source_id']: row['target_id'] for row in cursor.fetchall()}
+                remapped = {source: target for source, target in matched.items() if source != target}
+                dropped = {row[0] for row in rows} - set(matched)
+                if dropped:
+                    logger.warning(f"{spec.name}: {len(dropped)} rows conflict with existing data and were skipped")
+
+            conn.commit()
+
+        if spec.remap:
+            with self._lock:
+                self.id_maps.setdefault(spec.name, {}).update(remapped)
+                self.dropped.setdefault(spec.name, set()).update(dropped)
+
+        return inserted
+
+    def migrate_table(self, spec: TableSpec) -> Dict[str, Any]:
+        """Stream one table from SQLite into PostgreSQL, batch by batch"""
+        started = time.monotonic()
+        result = {'read': 0, 'inserted': 0, 'skipped': 0, 'orphaned': 0}
+        last_id = self.last_ids.get(spec.name, 0)
+
+        conn = self._connect_sqlite()
+        try:
+            source_max_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {spec.name}").fetchone()[0]
+            self._reserve_ids(spec, source_max_id)
+
+            # SQLite does not enforce foreign keys; rows pointing at missing parents are left behind
+            has_parents = ' AND '.join(
+                f"EXISTS (SELECT 1 FROM {parent} p WHERE p.id = {spec.name}.{column})"
+                for column, parent in spec.references.items()
+            ) or '1'
+            result['orphaned'] = conn.execute(
+                f"SELECT COUNT(*) FROM {spec.name} WHERE id > ? AND NOT ({has_parents})", (last_id,)
+            ).fetchone()[0]
+            if result['orphaned']:
+                logger.warning(f"{spec.name}: skipping {result['orphaned']} rows that reference missing parents")
+
+            cursor = conn.execute(
+                f"SELECT {', '.join(spec.source_columns)} FROM {spec.name} "
+                f"WHERE id > ? AND {has_parents} ORDER BY id",
+                (last_id,)
+            )
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+
+                remapped_rows = [row for row in (self._remap_row(spec, row) for row in rows) if row is not None]
+                inserted = self._merge_batch(spec, remapped_rows) if remapped_rows else 0
+
+                result['read'] += len(rows)
+                result['inserted'] += inserted
+                result['skipped'] += len(rows) - inserted
+
+                with self._lock:
+                    self.last_ids[spec.name] = rows[-1][0]
+                    self._save_checkpoint()
+
+                elapsed = time.monotonic() - started
+                logger.info(f"{spec.name}: {result['read']} rows ({result['read'] / elapsed:.0f} rows/s)")
+        finally:
+            conn.close()
+
+        result['seconds'] = round(time.monotonic() - started, 3)
+        return result
+
+    def run_by_level(self, func: Callable[[TableSpec], Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Apply func to every table present in SQLite, running the tables of
+        one dependency level in parallel and the levels in order
+
+        Returns:
+            func's result per table
+        """
+        available = self._source_tables()
+        results = {}
+
+        for level in sorted({spec.level for spec in TABLE_SPECS}):
+            specs = [spec for spec in TABLE_SPECS if spec.level == level and spec.name in available]
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = {spec.name: executor.submit(func, spec) for spec in specs}
+                for name, future in futures.items():
+                    results[name] = future.result()
+
+        return results
+
+    def migrate(self, resume: bool = False) -> Dict[str, Dict[str, Any]]:
+        """
+        Migrate every table, running independent tables in parallel
+
+        Args:
+            resume: Continue from the checkpoint of an earlier run
+
+        Returns:
+            Per-table counts: rows read, inserted, skipped (already present)
+            and orphaned (referencing rows missing from SQLite)
+        """
+        if resume:
+            self.load_checkpoint()
+
+        results = self.run_by_level(self.migrate_table)
+        self.reset_sequences()
+
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        return results
+
+    def _target_digests(self, table: str, query: str, text_index: int) -> Iterable[bytes]:
+        """Stream row digests from PostgreSQL through a server-side cursor"""
+        with get_db_connection() as conn:
+            cursor = conn.cursor(name=f"verify_{table}")
+            cursor.itersize = self.batch_size
+            cursor.execute(query)
+            for row in cursor:
+                yield row_digest(tuple(row.values()), text_index)
+            cursor.close()
+
+    def verify(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Compare per-row checksums of every source table with PostgreSQL
+
+        Each source row is reduced to its natural content (passage hash,
+        email, user/exercise pair plus the migrated values) and digested;
+        every source digest must be present in PostgreSQL. Rows that exist
+        only in PostgreSQL are counted as 'extra' but are not an error.
+
+        Returns:
+            Per-table 'source', 'missing', 'extra' counts and 'ok'
+        """
+        available = self._source_tables()
+        results = {}
+
+        for table, (source_query, target_query) in CHECKSUM_QUERIES.items():
+            if table not in available:
+                continue
+
+            text_index = 0 if table == 'exercises' else (1 if table in ('user_progress', 'user_queue') else None)
+
+            conn = self._connect_sqlite()
+            try:
+                source = {row_digest(row, text_index) for row in conn.execute(source_query)}
+            finally:
+                conn.close()
+
+            extra = 0
+            remaining = set(source)
+            for digest in self._target_digests(table, target_query, text_index):
+                if digest in remaining:
+                    remaining.discard(digest)
+                elif digest not in source:
+                    extra += 1
+
+            results[table] = {'source': len(source), 'missing': len(remaining), 'extra': extra,
+                              'ok': not remaining}
+            log = logger.info if not remaining else logger.error
+            log(f"{table}: {len(source)} distinct source rows, {len(remaining)} missing, {extra} only in PostgreSQL")
+
+        return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Migrate exercises.db (SQLite) into PostgreSQL")
+    parser.add_argument('--sqlite', default='exercises.db', help="SQLite database file")
+    parser.add_argument('--batch-size', type=int, default=MIGRATION_BATCH_SIZE, help="Rows per COPY batch")
+    parser.add_argument('--workers', type=int, default=MIGRATION_WORKERS, help="Tables migrated in parallel")
+    parser.add_argument('--resume', action='store_true', help="Continue from the last checkpoint")
+    parser.add_argument('--verify-only', action='store_true', help="Only compare checksums")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if not os.path.exists(args.sqlite):
+        print(f"❌ SQLite database not found: {args.sqlite}")
+        return 1
+
+    migration = SQLiteMigration(args.sqlite, args.batch_size, args.workers)
+
+    if not args.verify_only:
+        init_database_schema()
+        for table, result in migration.migrate(resume=args.resume).items():
+            print(f"✅ {table}: {result['inserted']} inserted, {result['skipped']} skipped "
+                  f"of {result['read']} rows in {result['seconds']:.1f}s")
+
+    verification = migration.verify()
+    ok = all(result['ok'] for result in verification.values())
+    print("✅ Checksums match" if ok else "❌ Checksum verification failed")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Continuous SQLite to PostgreSQL sync for NoSubvo
+Repeatedly copies new and changed rows from exercises.db into PostgreSQL and reports lag
+
+Keeps PostgreSQL a few seconds behind the SQLite database that is still
+serving traffic. To cut over: stop writes, run one last pass until every
+table reports 0 pending rows, then point the app at PostgreSQL.
+
+Usage:
+    python sqlite_sync.py                  # sync every SYNC_INTERVAL_SECONDS until interrupted
+    python sqlite_sync.py --once           # one pass, then print lag
+    python sqlite_sync.py --status         # only print lag
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from database import execute_query, get_db_cursor, init_database_schema
+from sqlite_migration import SQLiteMigration, TableSpec, TABLE_SPECS, MIGRATION_BATCH_SIZE, copy_rows
+
+logger = logging.getLogger(__name__)
+
+# Seconds between sync passes
+SYNC_INTERVAL_SECONDS = float(os.getenv('SYNC_INTERVAL_SECONDS', 5))
+
+# Per table: SQLite expression giving the time a row last changed, and for
+# referenced tables the condition (over target row "o" and staging row "s")
+# under which applying a change would collide with a different row.
+# Tables without an expression (user_queue) only receive new rows; deletes
+# are not tracked.
+CHANGE_TRACKING = {
+    'exercises': ("updated_at", "o.content_hash = exercise_content_hash(s.text)"),
+    'users': ("last_login", "o.email = s.email"),
+    'user_progress': ("COALESCE(completed_at, created_at)", None),
+}
+
+
+class SQLiteSync(SQLiteMigration):
+    """
+    Incremental copy of SQLite tables into PostgreSQL
+
+    Every table has two high-water marks: the last copied rowid (new rows
+    are streamed exactly like the one-shot migration) and the latest change
+    timestamp already applied (rows updated in place are re-copied onto
+    their PostgreSQL counterparts). Both marks, together with the id
+    remapping of the migration, live in the sqlite_sync_state table so any
+    host can continue the sync. Applying a row twice is harmless, so a crash
+    between copying a batch and saving the marks only repeats work.
+    """
+
+    def __init__(self, sqlite_path: str = 'exercises.db', batch_size: int = MIGRATION_BATCH_SIZE):
+        super().__init__(sqlite_path, batch_size)
+        self.changed_marks: Dict[str, Optional[str]] = {}
+        self.last_synced: Dict[str, float] = {}
+
+    def ensure_state_table(self) -> None:
+        """Create sqlite_sync_state if needed"""
+        execute_query("""
+            CREATE TABLE IF NOT EXISTS sqlite_sync_state (
+                table_name TEXT PRIMARY KEY,
+                state JSONB NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+    def load_checkpoint(self) -> None:
+        """Load the high-water marks from sqlite_sync_state"""
+        for row in execute_query("SELECT table_name, state FROM sqlite_sync_state", fetch=True) or []:
+            table, state = row['table_name'], row['state']
+            self.last_ids[table] = int(state.get('last_id', 0))
+            self.changed_marks[table] = state.get('changed_at')
+            self.id_maps[table] = {int(k): v for k, v in state.get('id_map', {}).items()}
+            self.dropped[table] = set(state.get('dropped', []))
+            if state.get('synced_at'):
+                self.last_synced[table] = state['synced_at']
+
+    def _save_checkpoint(self) -> None:
+        """Persist the high-water marks (caller holds the lock)"""
+        with get_db_cursor() as (cursor, conn):
+            for table in set(self.last_ids) | set(self.changed_marks):
+                state = {
+                    'last_id': self.last_ids.get(table, 0),
+                    'changed_at': self.changed_marks.get(table),
+                    'id_map': self.id_maps.get(table, {}),
+                    'dropped': sorted(self.dropped.get(table, ())),
+                    'synced_at': self.last_synced.get(table),
+                }
+                cursor.execute("""
+                    INSERT INTO sqlite_sync_state (table_name, state, updated_at)
+                    VALUES (%s, %s, CURRENT_TIMESTAMP)
+                    ON CONFLICT (table_name) DO UPDATE SET state = EXCLUDED.state, updated_at = EXCLUDED.updated_at
+                """, (table, json.dumps(state)))
+            conn.commit()
+
+    def _apply_changes(self, spec: TableSpec, rows) -> int:
+        """Copy changed rows onto their PostgreSQL counterparts; returns rows updated"""
+        staging = f"sync_{spec.name}"
+        assignments = ', '.join(spec.target_columns)
+        exprs = ', '.join(spec.select_exprs)
+        _, collision = CHANGE_TRACKING[spec.name]
+
+        # Referenced tables are matched by (remapped) id, child tables by their natural key
+        conditions = ["t.id = s.id::int"] if spec.remap else [spec.match]
+        if collision:
+            conditions.append(f"NOT EXISTS (SELECT 1 FROM {spec.name} o WHERE {collision} AND o.id <> t.id)")
+
+        with get_db_cursor() as (cursor, conn):
+            cursor.execute(f"""
+                CREATE TEMP TABLE {staging} ({', '.join(f'{c} TEXT' for c in spec.source_columns)})
+                ON COMMIT DROP
+            """)
+            cursor.copy_expert(f"COPY {staging} ({', '.join(spec.source_columns)}) FROM STDIN", copy_rows(rows))
+            cursor.execute(f"""
+                UPDATE {spec.name} t
+                SET ({assignments}) = ({exprs})
+                FROM {staging} s
+                WHERE {' AND '.join(conditions)}
+            """)
+            updated = cursor.rowcount
+            conn.commit()
+        return updated
+
+    def sync_changes(self, spec: TableSpec) -> int:
+        """
+        Re-copy rows at or below the rowid mark whose change time reached
+        the table's change mark, then advance the mark
+
+        Returns:
+            Rows updated in PostgreSQL
+        """
+        if spec.name not in CHANGE_TRACKING:
+            return 0
+
+        change_expr, _ = CHANGE_TRACKING[spec.name]
+        last_id = self.last_ids.get(spec.name, 0)
+        since = self.changed_marks.get(spec.name)
+        updated = 0
+
+        conn = self._connect_sqlite()
+        try:
+            # Read the new mark first: changes made while this pass runs are picked up by the next one
+            mark = conn.execute(f"SELECT MAX({change_expr}) FROM {spec.name}").fetchone()[0]
+            if since is not None and last_id:
+                # Timestamps have one-second resolution, so rows from the mark's own second are re-applied
+                cursor = conn.execute(
+                    f"SELECT {', '.join(spec.source_columns)} FROM {spec.name} "
+                    f"WHERE id <= ? AND {change_expr} >= ? ORDER BY id",
+                    (last_id, since)
+                )
+                while True:
+                    rows = cursor.fetchmany(self.batch_size)
+                    if not rows:
+                        break
+
+                    own_map = self.id_maps.get(spec.name, {})
+                    own_dropped = self.dropped.get(spec.name, ())
+                    remapped = []
+                    for row in rows:
+                        if row[0] in own_dropped:
+                            continue
+                        row = self._remap_row(spec, (own_map.get(row[0], row[0]),) + tuple(row[1:]))
+                        if row is not None:
+                            remapped.append(row)
+
+                    if remapped:
+                        updated += self._apply_changes(spec, remapped)
+        finally:
+            conn.close()
+
+        with self._lock:
+            self.changed_marks[spec.name] = mark
+        return updated
+
+    def sync_table(self, spec: TableSpec) -> Dict[str, Any]:
+        """Apply in-place changes, then copy new rows, for one table"""
+        updated = self.sync_changes(spec)
+        result = self.migrate_table(spec)
+        result['updated'] = updated
+
+        with self._lock:
+            self.last_synced[spec.name] = time.time()
+            self._save_checkpoint()
+        return result
+
+    def sync_once(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Run one sync pass over every table
+
+        Returns:
+            Per-table counts (new rows inserted, rows updated, skipped, orphaned)
+        """
+        self.ensure_state_table()
+        self.load_checkpoint()
+        return self.run_by_level(self.sync_table)
+
+    def lag(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Measure how far PostgreSQL is behind SQLite
+
+        Returns:
+            Per table: rows not yet copied ('pending_rows'), age of the oldest
+            of them in seconds ('lag_seconds'), and seconds since the last pass
+        """
+        self.ensure_state_table()
+        self.load_checkpoint()
+        available = self._source_tables()
+        report = {}
+
+        conn = self._connect_sqlite()
+        try:
+            for spec in TABLE_SPECS:
+                if spec.name not in available:
+                    continue
+
+                last_id = self.last_ids.get(spec.name, 0)
+                change_expr = CHANGE_TRACKING.get(spec.name, (None,))[0]
+                since = self.changed_marks.get(spec.name)
+
+                pending_condition = "id > ?"
+                params = [last_id]
+                if change_expr and since is not None:
+                    pending_condition += f" OR {change_expr} > ?"
+                    params.append(since)
+
+                oldest_expr = change_expr or "NULL"
+                pending, oldest = conn.execute(
+                    f"SELECT COUNT(*), MIN({oldest_expr}) FROM {spec.name} WHERE {pending_condition}", params
+                ).fetchone()
+
+                lag_seconds = None
+                if pending and oldest:
+                    # SQLite CURRENT_TIMESTAMP values are UTC
+                    oldest_time = datetime.fromisoformat(str(oldest)).replace(tzinfo=timezone.utc).timestamp()
+                    lag_seconds = max(round(time.time() - oldest_time, 1), 0.0)
+
+                synced_at = self.last_synced.get(spec.name)
+                report[spec.name] = {
+                    'pending_rows': pending,
+                    'lag_seconds': lag_seconds if pending else 0.0,
+                    'seconds_since_sync': round(time.time() - synced_at, 1) if synced_at else None,
+                }
+        finally:
+            conn.close()
+
+        return report
+
+
+def print_lag(report: Dict[str, Dict[str, Any]]) -> None:
+    for table, status in report.items():
+        lag = f"{status['lag_seconds']}s" if status['lag_seconds'] is not None else "unknown"
+        since = f"{status['seconds_since_sync']}s ago" if status['seconds_since_sync'] is not None else "never"
+        print(f"📊 {table}: {status['pending_rows']} pending rows, lag {lag}, last synced {since}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Continuously sync exercises.db (SQLite) into PostgreSQL")
+    parser.add_argument('--sqlite', default='exercises.db', help="SQLite database file")
+    parser.add_argument('--batch-size', type=int, default=MIGRATION_BATCH_SIZE, help="Rows per COPY batch")
+    parser.add_argument('--interval', type=float, default=SYNC_INTERVAL_SECONDS, help="Seconds between passes")
+    parser.add_argument('--once', action='store_true', help="Run a single pass")
+    parser.add_argument('--status', action='store_true', help="Only report lag")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if not os.path.exists(args.sqlite):
+        print(f"❌ SQLite database not found: {args.sqlite}")
+        return 1
+
+    sync = SQLiteSync(args.sqlite, args.batch_size)
+
+    if args.status:
+        print_lag(sync.lag())
+        return 0
+
+    init_database_schema()
+
+    while True:
+        started = time.monotonic()
+        try:
+            results = sync.sync_once()
+            copied = sum(result['inserted'] + result['updated'] for result in results.values())
+            logger.info(f"Sync pass copied {copied} rows in {time.monotonic() - started:.1f}s")
+            print_lag(sync.lag())
+        except Exception as e:
+            logger.error(f"Sync pass failed, retrying next interval: {e}")
+            if args.once:
+                return 1
+
+        if args.once:
+            return 0
+        time.sleep(max(args.interval - (time.monotonic() - started), 0))
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        sys.exit(0)
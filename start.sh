@@ -17,6 +17,8 @@ cd ..
 # Start backend
 echo "📡 Starting Flask backend on port 5000..."
 source venv/bin/activate
+python backend.py migrate
+python backend.py seed
 python backend.py &
 BACKEND_PID=$!
 
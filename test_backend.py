@@ -20,6 +20,18 @@ def test_health():
         print(f"❌ Error: {e}")
         return False
 
+def test_ready():
+    """Test readiness endpoint (200 once the model and database are ready)"""
+    print("\n🔍 Testing /ready endpoint...")
+    try:
+        response = requests.get(f"{BASE_URL}/ready")
+        print(f"✅ Status: {response.status_code}")
+        print(f"📄 Subsystems: {response.json()['subsystems']}")
+        return response.status_code == 200
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
 def test_chunk():
     """Test chunking endpoint"""
     print("\n🔍 Testing /chunk endpoint...")
@@ -47,16 +59,85 @@ def test_chunk():
         print(f"❌ Error: {e}")
         return False
 
+def test_chunk_profiles():
+    """Test chunking profiles and stage timings"""
+    print("\n🔍 Testing /chunk profiles...")
+    test_text = "The teacher will do a head count and check the roll at the time of evacuation."
+    try:
+        for profile in ("phrases", "compact", "modifiers", "words"):
+            response = requests.post(f"{BASE_URL}/chunk", json={"text": test_text, "profile": profile})
+            data = response.json()
+            print(f"✅ {profile}: {data['chunk_count']} chunks, timings (ms): {data.get('timings_ms') or 'cached'}")
+        
+        unknown = requests.post(f"{BASE_URL}/chunk", json={"text": test_text, "profile": "unknown"})
+        print(f"✅ Unknown profile status: {unknown.status_code} (expected 400)")
+        return unknown.status_code == 400
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+def test_rsvp():
+    """Test RSVP schedule endpoint"""
+    print("\n🔍 Testing /rsvp endpoint...")
+    test_text = "Without specialised equipment, humans would be lost in these deep sea habitats."
+    try:
+        response = requests.post(f"{BASE_URL}/rsvp", json={"text": test_text, "wpm": 300})
+        data = response.json()
+        print(f"✅ Status: {response.status_code}")
+        print(f"📊 Words: {data['word_count']}, total {data['total_duration_ms']} ms at {data['wpm']} wpm")
+        for word, duration, orp in list(zip(data['words'], data['durations_ms'], data['orp']))[:5]:
+            print(f"   {word:<15} {duration:>4} ms  focus '{word[orp]}'")
+
+        rejected = [requests.post(f"{BASE_URL}/rsvp", json={"text": test_text, "wpm": wpm}).status_code
+                    for wpm in ("nan", "inf", "-300")]
+        print(f"✅ Non-finite/negative wpm status: {rejected} (expected 400)")
+
+        # Scripts without spaces are chunked into words of several characters, not one character each
+        for language, text in (("zh", "我今天很高兴。我们明天去北京看看长城吧！"), ("ja", "東京は大きい。「本当」ですか？")):
+            chunks = requests.post(f"{BASE_URL}/chunk", json={"text": text, "language": language}).json()['chunks']
+            print(f"✅ {language} chunks: {chunks}")
+            if all(len(chunk) == 1 for chunk in chunks):
+                return False
+
+        # Japanese is written without spaces: words come from segmentation, not one per sentence
+        japanese = requests.post(f"{BASE_URL}/rsvp", json={"text": "東京は大きい。「本当」ですか？", "language": "ja", "wpm": 300}).json()
+        print(f"✅ Japanese words: {japanese['words']}")
+        return (response.status_code == 200 and len(data['durations_ms']) == data['word_count']
+                and rejected == [400, 400, 400] and japanese['word_count'] > 2)
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+def test_stats_caching():
+    """Test ETag revalidation on /exercises/stats"""
+    print("\n🔍 Testing /exercises/stats caching...")
+    try:
+        response = requests.get(f"{BASE_URL}/exercises/stats")
+        etag = response.headers.get("ETag")
+        print(f"✅ Status: {response.status_code}, ETag: {etag}")
+        print(f"📦 Cache-Control: {response.headers.get('Cache-Control')}")
+        
+        revalidated = requests.get(f"{BASE_URL}/exercises/stats", headers={"If-None-Match": etag})
+        print(f"✅ Revalidation status: {revalidated.status_code} (expected 304)")
+        return revalidated.status_code == 304
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
 def main():
     print("🚀 NoSubvo Backend API Test")
     print("=" * 50)
-    print("\n⚠️  Make sure backend is running: python backend.py\n")
+    print("\n⚠️  Make sure backend is running: python backend.py (after python backend.py migrate)\n")
     
     health_ok = test_health()
+    ready_ok = test_ready()
     chunk_ok = test_chunk()
+    profiles_ok = test_chunk_profiles()
+    rsvp_ok = test_rsvp()
+    stats_ok = test_stats_caching()
     
     print("\n" + "=" * 50)
-    if health_ok and chunk_ok:
+    if health_ok and ready_ok and chunk_ok and profiles_ok and rsvp_ok and stats_ok:
         print("✅ All tests passed!")
         print("🎉 Backend is working correctly!")
     else: